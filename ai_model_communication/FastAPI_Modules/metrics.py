@@ -0,0 +1,143 @@
+"""
+Minimal in-process metrics for the vision service, rendered in the
+Prometheus text exposition format on /metrics.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# seconds; covers a fast color conversion up to a cold detector call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        with _lock:
+            self.values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, tuple(buckets)
+        # label values -> (per-bucket counts, sum, count)
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        with _lock:
+            counts, total, n = self.values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = [counts, total + value, n + 1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, n) in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, counts):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_str(self.labels, key, le)} {n}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Times the stages of one request into a histogram and keeps the per-request
+    durations (ms) for the response's ``timings`` object.
+    """
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.timings: Dict[str, float] = {}
+        self.failed = False
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.histogram.observe(elapsed, stage=name, **self.labels)
+            self.timings[name] = round(elapsed * 1000, 3)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 3)
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value, for responses that are not json."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.timings.items())
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "vision_requests_total", "Requests handled, by endpoint and status.", ("endpoint", "status")))
+IN_FLIGHT = registry.register(Gauge(
+    "vision_requests_in_flight", "Requests currently queued or running, by endpoint.", ("endpoint",)))
+QUEUE_DEPTH = registry.register(Gauge(
+    "vision_queue_depth", "Requests waiting for the detector, by endpoint.", ("endpoint",)))
+STAGE_SECONDS = registry.register(Histogram(
+    "vision_stage_seconds", "Time spent per request stage.", ("endpoint", "stage")))
+REQUEST_SECONDS = registry.register(Histogram(
+    "vision_request_seconds", "End to end request time.", ("endpoint",)))
+MODEL_LOAD_SECONDS = registry.register(Gauge(
+    "vision_model_load_seconds", "Time taken to load each model at startup.", ("model",)))
+MODEL_WARMUP_SECONDS = registry.register(Gauge(
+    "vision_model_warmup_seconds", "Time taken by the warmup inference per model and frame size.", ("model", "frame_size")))
@@ -0,0 +1,216 @@
+"""
+Wire formats for /dino_api detection results.
+
+The vision service answers with JSON by default. Clients that send an
+``Accept`` header with one of the binary media types below get the same
+detections as a fixed-layout record array plus a label table, which the
+decoders expose as NumPy views without copying the box data.
+
+Struct layout (little endian):
+    header   : magic b"DET1", image_width u32, image_height u32, n_records u32, n_labels u32
+    labels   : n_labels x (length u16, utf-8 bytes), zero padded to a 4 byte boundary
+    records  : n_records x (xmin i4, ymin i4, xmax i4, ymax i4, score f4, label_id i4)
+
+The msgpack format carries the same record bytes in a ``bin`` field next to
+the label table and image size.
+
+The vision service and the robot side are deployed apart, so this module
+exists twice, as ai_model_communication/custom_data/detection_codec.py and
+mcp-implement/vision_tools/detection_codec.py. Change both copies together;
+mcp-implement/tests/test_detection_codec.py fails when they differ.
+"""
+import json
+import struct
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, struct and json always work
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+STRUCT_MEDIA_TYPE = "application/x-detection-struct"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# preferred format for clients that can decode every format
+BINARY_ACCEPT = f"{STRUCT_MEDIA_TYPE}, {MSGPACK_MEDIA_TYPE};q=0.9, {JSON_MEDIA_TYPE};q=0.5"
+
+# unix time at which the service read the camera frame the detections come from
+FRAME_TIME_HEADER = "X-Frame-Time"
+
+MAGIC = b"DET1"
+HEADER = struct.Struct("<4sIIII")
+LABEL_LEN = struct.Struct("<H")
+
+RECORD_DTYPE = np.dtype([
+    ("box", "<i4", (4,)),   # xmin, ymin, xmax, ymax
+    ("score", "<f4"),
+    ("label_id", "<i4"),
+])
+
+
+class DetectionArrays(NamedTuple):
+    """Decoded detections; ``boxes``/``scores``/``label_ids`` are views over ``records``."""
+    records: np.ndarray
+    labels: List[str]
+    image_width: Optional[int]
+    image_height: Optional[int]
+
+    @property
+    def boxes(self) -> np.ndarray:
+        return self.records["box"]
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self.records["score"]
+
+    @property
+    def label_ids(self) -> np.ndarray:
+        return self.records["label_id"]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Same shape as the JSON ``detections`` list (for code that still wants dicts)."""
+        out = []
+        for (xmin, ymin, xmax, ymax), score, label_id in zip(
+            self.boxes.tolist(), self.scores.tolist(), self.label_ids.tolist()
+        ):
+            out.append({
+                "score": score,
+                "label": self.labels[label_id],
+                "box": {"xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax},
+            })
+        return out
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick the response media type from an ``Accept`` header (json if nothing better)."""
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    offers = []
+    for i, part in enumerate(accept.split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        media_type, q = fields[0].lower(), 1.0
+        for f in fields[1:]:
+            if f.startswith("q="):
+                try:
+                    q = float(f[2:])
+                except ValueError:
+                    q = 0.0
+        offers.append((-q, i, media_type))
+
+    for _, _, media_type in sorted(offers):
+        if media_type == STRUCT_MEDIA_TYPE:
+            return STRUCT_MEDIA_TYPE
+        if media_type == MSGPACK_MEDIA_TYPE and msgpack is not None:
+            return MSGPACK_MEDIA_TYPE
+        if media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            return JSON_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def to_records(detections: Sequence[Any]) -> tuple:
+    """Pack detection objects (``.score``, ``.label``, ``.box``) into (records, labels)."""
+    labels: List[str] = []
+    label_ids: Dict[str, int] = {}
+    records = np.empty(len(detections), dtype=RECORD_DTYPE)
+    for i, det in enumerate(detections):
+        if det.label not in label_ids:
+            label_ids[det.label] = len(labels)
+            labels.append(det.label)
+        box = det.box
+        records[i] = ((box.xmin, box.ymin, box.xmax, box.ymax), det.score, label_ids[det.label])
+    return records, labels
+
+
+def encode_struct(detections: Sequence[Any], image_width: int, image_height: int) -> bytes:
+    records, labels = to_records(detections)
+    parts = [HEADER.pack(MAGIC, image_width, image_height, len(records), len(labels))]
+    size = HEADER.size
+    for label in labels:
+        raw = label.encode("utf-8")
+        parts.append(LABEL_LEN.pack(len(raw)))
+        parts.append(raw)
+        size += LABEL_LEN.size + len(raw)
+    parts.append(b"\x00" * (-size % 4))
+    parts.append(records.tobytes())
+    return b"".join(parts)
+
+
+def decode_struct(payload: bytes) -> DetectionArrays:
+    magic, image_width, image_height, n_records, n_labels = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC:
+        raise ValueError(f"not a detection struct payload (magic={magic!r})")
+
+    offset = HEADER.size
+    labels = []
+    for _ in range(n_labels):
+        (length,) = LABEL_LEN.unpack_from(payload, offset)
+        offset += LABEL_LEN.size
+        labels.append(bytes(payload[offset:offset + length]).decode("utf-8"))
+        offset += length
+    offset += -offset % 4
+
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, count=n_records, offset=offset)
+    return DetectionArrays(records, labels, image_width, image_height)
+
+
+def encode_msgpack(detections: Sequence[Any], image_width: int, image_height: int) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    records, labels = to_records(detections)
+    return msgpack.packb({
+        "image_width": image_width,
+        "image_height": image_height,
+        "labels": labels,
+        "records": records.tobytes(),
+    }, use_bin_type=True)
+
+
+def decode_msgpack(payload: bytes) -> DetectionArrays:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    data = msgpack.unpackb(payload, raw=False)
+    records = np.frombuffer(data["records"], dtype=RECORD_DTYPE)
+    return DetectionArrays(records, data["labels"], data["image_width"], data["image_height"])
+
+
+def decode_json(data: Dict[str, Any]) -> DetectionArrays:
+    """Build the same arrays from the JSON body (``{"detections": [...], ...}``)."""
+    detections = data.get("detections", [])
+    labels: List[str] = []
+    label_ids: Dict[str, int] = {}
+    records = np.empty(len(detections), dtype=RECORD_DTYPE)
+    for i, d in enumerate(detections):
+        if d["label"] not in label_ids:
+            label_ids[d["label"]] = len(labels)
+            labels.append(d["label"])
+        b = d["box"]
+        records[i] = ((b["xmin"], b["ymin"], b["xmax"], b["ymax"]), d["score"], label_ids[d["label"]])
+    return DetectionArrays(records, labels, data.get("image_width"), data.get("image_height"))
+
+
+def encode(detections: Sequence[Any], image_width: int, image_height: int, media_type: str) -> bytes:
+    if media_type == STRUCT_MEDIA_TYPE:
+        return encode_struct(detections, image_width, image_height)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return encode_msgpack(detections, image_width, image_height)
+    raise ValueError(f"unsupported media type: {media_type}")
+
+
+def decode(payload: bytes, content_type: Optional[str]) -> DetectionArrays:
+    """Decode a /dino_api body according to its ``Content-Type`` header."""
+    media_type = (content_type or JSON_MEDIA_TYPE).split(";")[0].strip().lower()
+    if media_type == STRUCT_MEDIA_TYPE:
+        return decode_struct(payload)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return decode_msgpack(payload)
+    data = json.loads(payload)
+    if "detections" not in data:
+        raise ValueError(data.get("error", "response has no detections"))
+    return decode_json(data)
@@ -1,3 +1,4 @@
+import threading
 from typing import Any, List, Dict, Optional, Union, Tuple 
 
 import numpy as np 
@@ -8,6 +9,24 @@ from transformers import AutoModelForMaskGeneration, AutoProcessor, pipeline
 from vis_tools.detection_vis import get_boxes, load_image, refine_masks
 from custom_data.detection_data import BoundingBox, DetectionResult
 
+DEFAULT_DETECTOR_ID = "IDEA-Research/grounding-dino-tiny"
+
+# loaded pipelines, keyed by model id; the lock keeps the startup warmup and
+# an early request from loading the same model twice
+_detectors: Dict[str, Any] = {}
+_detectors_lock = threading.Lock()
+
+def load_detector(detector_id: Optional[str] = None):
+    """
+    Load (once) and return the zero-shot detection pipeline for detector_id.
+    """
+    detector_id = detector_id if detector_id is not None else DEFAULT_DETECTOR_ID
+    with _detectors_lock:
+        if detector_id not in _detectors:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            _detectors[detector_id] = pipeline(model=detector_id, task="zero-shot-object-detection", device=device)
+        return _detectors[detector_id]
+
 def detect(
     image: Image.Image,
     labels: List[str],
@@ -17,9 +36,7 @@ def detect(
     """
     Use Grounding DINO to detect a set of labels in an image in a zero-shot fashion.
     """
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    detector_id = detector_id if detector_id is not None else "IDEA-Research/grounding-dino-tiny"
-    object_detector = pipeline(model=detector_id, task="zero-shot-object-detection", device=device)
+    object_detector = load_detector(detector_id)
 
     labels = [label if label.endswith(".") else label+"." for label in labels]
 
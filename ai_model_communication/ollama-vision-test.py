@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, File, UploadFile
+from fastapi import FastAPI, Request, File, UploadFile, Header
 import requests
 from pydantic import BaseModel 
 import json 
@@ -11,8 +11,11 @@ from io import BytesIO
 from PIL import Image
 import os
 import logging
-from FastAPI_Modules import vision
-from fastapi.responses import JSONResponse
+import asyncio
+from contextlib import asynccontextmanager
+from FastAPI_Modules import vision, metrics
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
+from custom_data import detection_codec
 from PIL import Image 
 import numpy as np 
 
@@ -26,8 +29,65 @@ class QueryModel(BaseModel):
     response: str
     action: List[str] # [str] 
 
+# Startup warmup: models to load and the frame sizes the robot camera sends,
+# so the first /dino_api request does not pay model load + graph warmup
+WARMUP_DETECTOR_IDS = ["IDEA-Research/grounding-dino-tiny"]
+WARMUP_FRAME_SIZES = [(640, 480)]  # (width, height)
+WARMUP_LABELS = ["red block", "cup"]
+
+readiness = {"ready": False, "stage": "starting", "models": {}, "warmup": {}, "error": None}
+
+def warm_up():
+    from detect_seg import load_detector, detect 
+    for detector_id in WARMUP_DETECTOR_IDS:
+        readiness["stage"] = f"loading {detector_id}"
+        start = time.perf_counter()
+        load_detector(detector_id)
+        readiness["models"][detector_id] = round(time.perf_counter() - start, 3)
+        metrics.MODEL_LOAD_SECONDS.set(readiness["models"][detector_id], model=detector_id)
+        logger.info(f"loaded {detector_id} in {readiness['models'][detector_id]}s")
+
+        for width, height in WARMUP_FRAME_SIZES:
+            readiness["stage"] = f"warming up {detector_id} at {width}x{height}"
+            frame = Image.fromarray(np.zeros((height, width, 3), dtype=np.uint8))
+            start = time.perf_counter()
+            detect(image=frame, labels=WARMUP_LABELS, detector_id=detector_id)
+            readiness["warmup"][f"{detector_id}@{width}x{height}"] = round(time.perf_counter() - start, 3)
+            metrics.MODEL_WARMUP_SECONDS.set(
+                readiness["warmup"][f"{detector_id}@{width}x{height}"], model=detector_id, frame_size=f"{width}x{height}")
+
+async def startup_warmup():
+    try:
+        # runs in the default thread pool, which also spins it up
+        await asyncio.to_thread(warm_up)
+        readiness["stage"] = "ready"
+        readiness["ready"] = True
+        logger.info(f"vision service ready: {readiness}")
+    except Exception as e:
+        readiness["stage"] = "failed"
+        readiness["error"] = str(e)
+        logger.error(f"warmup failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one detection at a time on the detector; queued requests wait on this lock
+    app.state.detector_lock = asyncio.Lock()
+    # warm up in the background so /ready can report progress meanwhile
+    warmup_task = asyncio.create_task(startup_warmup())
+    yield
+    warmup_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan) 
+
+@app.get("/ready")
+async def ready():
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
-app = FastAPI() 
 @app.post("/chat_api")
 async def chat(request: str):
     OLLAMA_BASE_URL= "http://127.0.0.1:11434"
@@ -123,7 +183,28 @@ def detection_to_dict(det):
 
 
 @app.post("/dino_api")
-async def test(request: str, boundaryColors: str):
+async def test(http_request: Request, request: str, boundaryColors: str, accept: str = Header(default=None)):
+    metrics.IN_FLIGHT.inc(endpoint="dino_api")
+    metrics.QUEUE_DEPTH.inc(endpoint="dino_api")
+    queued = True
+    timer = metrics.StageTimer(metrics.STAGE_SECONDS, endpoint="dino_api")
+    status = "error"
+    try:
+        async with http_request.app.state.detector_lock:
+            metrics.QUEUE_DEPTH.dec(endpoint="dino_api")
+            queued = False
+            # blocking camera/detector work runs off the event loop so /ready and /metrics stay live
+            response = await asyncio.to_thread(dino_api, request, boundaryColors, accept, timer)
+        status = "error" if timer.failed or response.status_code != 200 else "ok"
+        return response
+    finally:
+        if queued:
+            metrics.QUEUE_DEPTH.dec(endpoint="dino_api")
+        metrics.IN_FLIGHT.dec(endpoint="dino_api")
+        metrics.REQUESTS.inc(endpoint="dino_api", status=status)
+        metrics.REQUEST_SECONDS.observe(timer.total_ms() / 1000, endpoint="dino_api")
+
+def dino_api(request: str, boundaryColors: str, accept: str, timer):
     from vis_tools.detection_vis import plot_detections
     from detect_seg import grounded_segmentation, detect 
     print(request, boundaryColors)
@@ -138,25 +219,30 @@ async def test(request: str, boundaryColors: str):
 
     web_image = True
     # try:
-    if web_image:
-        remote_address =  "http://lab-erza:8080/"# 0 #
-        camera = cv2.VideoCapture(remote_address)
-    else : # except Exception as e :
-        print("[-] failed to connect to remote camera, reverting to system camera")
-        camera = cv2.VideoCapture(0)
-    return_value, image = camera.read()
+    with timer.stage("camera_read"):
+        if web_image:
+            remote_address =  "http://lab-erza:8080/"# 0 #
+            camera = cv2.VideoCapture(remote_address)
+        else : # except Exception as e :
+            print("[-] failed to connect to remote camera, reverting to system camera")
+            camera = cv2.VideoCapture(0)
+        return_value, image = camera.read()
+        frame_time = time.time()  # lets the controller drop frames taken while the robot moved
+        camera.release()
     # except Exception:
     # image = cv2.imread("./cute_cats1.png")
     image_height, image_width, image_channel = image.shape 
         
     # cv2.imwrite("failedimage.png", image)
     
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    with timer.stage("color_convert"):
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     
     print("image shape: ", image.shape)
     
     try : 
-        image = Image.fromarray(image) # .convert("RGB")
+        with timer.stage("pil_convert"):
+            image = Image.fromarray(image) # .convert("RGB")
 
         print('------------------label')
         # image_array, detections = grounded_segmentation(
@@ -168,22 +254,25 @@ async def test(request: str, boundaryColors: str):
         #     segmenter_id=segmenter_id
         # )
         
-        detections = detect(
-            image = image, 
-            labels=labels
-        )
+        with timer.stage("detect"):
+            detections = detect(
+                image = image, 
+                labels=labels
+            )
         
         image_array = np.asarray(image)
         
         print('detetctions ', detections)
-        img = plot_detections(image_array, detections, "cute_cats1.png", label_colors=None)
+        with timer.stage("plot"):
+            img = plot_detections(image_array, detections, "cute_cats1.png", label_colors=None)
 
-        cv2.imwrite('test.png', 
-            cv2.cvtColor(
-                image_array,
-                cv2.COLOR_RGB2BGR
+        with timer.stage("png_write"):
+            cv2.imwrite('test.png', 
+                cv2.cvtColor(
+                    image_array,
+                    cv2.COLOR_RGB2BGR
+                )
             )
-        )
         
         print(detections[0].box)
         # Convert NumPy image (from OpenCV) to PIL
@@ -201,12 +290,31 @@ async def test(request: str, boundaryColors: str):
         
         
         # for detection in detections:
-            
-        return JSONResponse(content={
-            "detections": [detection_to_dict(d) for d in detections],
-            "image_width": image_width,
-            "image_height": image_height,
-        })
+        
+        # binary formats for clients that ask for them, json otherwise
+        media_type = detection_codec.negotiate(accept)
+        if media_type != detection_codec.JSON_MEDIA_TYPE:
+            with timer.stage("serialize"):
+                content = detection_codec.encode(detections, image_width, image_height, media_type)
+            return Response(
+                content=content,
+                media_type=media_type,
+                headers={"Server-Timing": timer.server_timing(),
+                         detection_codec.FRAME_TIME_HEADER: f"{frame_time:.3f}"},
+            )
+
+        with timer.stage("serialize"):
+            content = {
+                "detections": [detection_to_dict(d) for d in detections],
+                "image_width": image_width,
+                "image_height": image_height,
+            }
+            # stages so far, for client-side correlation; serialize itself is in Server-Timing
+            content["timings"] = dict(timer.timings)
+            response = JSONResponse(content=content)
+        response.headers["Server-Timing"] = timer.server_timing()
+        response.headers[detection_codec.FRAME_TIME_HEADER] = f"{frame_time:.3f}"
+        return response
 
         # return JSONResponse(content={
         #     "box": detections[0].box,
@@ -215,6 +323,7 @@ async def test(request: str, boundaryColors: str):
         #return detections[0].box
     except Exception as e :
         print('[-] failure to execute the detection' , e)
+        timer.failed = True
         try:
             img_pil =  Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
         except:
@@ -225,7 +334,7 @@ async def test(request: str, boundaryColors: str):
         buf = BytesIO()
         img_pil.save(buf, format="PNG")
         img_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-        return {"error": "detection failed", "image":img_b64} 
+        return JSONResponse(content={"error": "detection failed", "image":img_b64, "timings": timer.timings}) 
     
     
 # from fastapi import FastAPI, UploadFile, File, Form
@@ -0,0 +1,150 @@
+"""
+Timing log of robot RPCs and the duration table fitted from it.
+
+The server and the controller record every JSON-RPC they send to the robot
+as one compact JSONL line: when it was sent, the response time, how long the
+robot was then waited for and how that wait ended (``ActionTimer.last_wait``):
+
+    {"t": 1767563720.547, "src": "server", "method": "RunAction", "action": "go_forward",
+     "params": ["go_forward", 1], "rtt": 0.041, "settle": 0.912, "wait": "status"}
+
+Only waits that ended on the robot's own status ("status") measure how long
+an action really takes; table and fallback waits just repeat the guess. The
+estimator fits the per-repetition duration (rtt + settle) / Times of each
+action and writes the chosen percentile into the table ``ActionTimer`` reads,
+keeping the entries it has no samples for:
+
+    python action_log.py --percentile 90
+
+The stock TonyPi firmware has no action status method, so its logs only
+hold "table" and "default" waits and nothing can be fitted from them. Give
+the robot's action group files to fill in every action without measured
+samples from its ``.d6a`` play time (action_timing):
+
+    python action_log.py --action-groups ./ActionGroups
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from action_timing import DURATIONS_PATH, calibrate_from_action_groups, load_durations, save_durations
+from test_tools import append_jsonl
+
+LOG_PATH = "logs/robot_rpc.jsonl"
+PERCENTILE = 90
+MIN_SAMPLES = 3
+MEASURED_WAITS = {"status"}
+
+
+class TimingRecorder:
+    def __init__(self, source: str, path: str = LOG_PATH):
+        self.source = source
+        self.path = path
+
+    def record(self, method: str, params: List[Any], sent: float, received: float, settle: float,
+               wait: Optional[str] = None):
+        """``sent`` / ``received`` are ``time.monotonic()`` readings, ``settle`` the seconds waited after."""
+        try:
+            append_jsonl(self.path, {
+                "t": round(time.time() - (time.monotonic() - sent), 3),
+                "src": self.source,
+                "method": method,
+                "action": params[0] if method == "RunAction" and params else method,
+                "params": params,
+                "rtt": round(received - sent, 4),
+                "settle": round(settle, 4),
+                "wait": wait,
+            })
+        except OSError:
+            pass  # timing is best effort, never fail a robot command over it
+
+
+def read_log(path: str = LOG_PATH) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def action_samples(records, waits=MEASURED_WAITS) -> Dict[str, List[float]]:
+    """Seconds per repetition of each RunAction action, from records whose wait ended one of ``waits``."""
+    samples = defaultdict(list)
+    for r in records:
+        if r.get("method") != "RunAction" or r.get("wait") not in waits:
+            continue
+        params = r.get("params") or []
+        times = max(int(params[1]) if len(params) > 1 else 1, 1)
+        samples[r["action"]].append((r["rtt"] + r["settle"]) / times)
+    return dict(samples)
+
+
+def fit_durations(samples: Dict[str, List[float]], percentile: float = PERCENTILE,
+                  min_samples: int = MIN_SAMPLES) -> Dict[str, Dict[str, float]]:
+    """Per action: sample count, p50 / p90 / p95 / max and the chosen percentile as "seconds"."""
+    fitted = {}
+    for action, values in sorted(samples.items()):
+        if len(values) < min_samples:
+            continue
+        v = np.asarray(values)
+        fitted[action] = {
+            "n": len(values),
+            "p50": float(np.percentile(v, 50)),
+            "p90": float(np.percentile(v, 90)),
+            "p95": float(np.percentile(v, 95)),
+            "max": float(v.max()),
+            "seconds": float(np.percentile(v, percentile)),
+        }
+    return fitted
+
+
+def table_update(fitted: Dict[str, Dict[str, float]], group_seconds: Dict[str, float]) -> Dict[str, float]:
+    """Seconds per action to write: measured fits, and the action group play time for the other actions."""
+    update = dict(group_seconds)
+    update.update({action: f["seconds"] for action, f in fitted.items()})
+    return update
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fit the action duration table from the robot RPC log")
+    parser.add_argument("--log", default=LOG_PATH)
+    parser.add_argument("--output", default=DURATIONS_PATH)
+    parser.add_argument("--percentile", type=float, default=PERCENTILE)
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES)
+    parser.add_argument("--include-assumed", action="store_true",
+                        help="also fit table/fallback waits (only meaningful if RunAction blocks until done)")
+    parser.add_argument("--action-groups", help="directory of the robot's .d6a files, for actions without measured samples")
+    parser.add_argument("--dry-run", action="store_true", help="print the fit without writing the table")
+    args = parser.parse_args()
+
+    waits = MEASURED_WAITS | ({"table", "default"} if args.include_assumed else set())
+    fitted = fit_durations(action_samples(read_log(args.log), waits), args.percentile, args.min_samples)
+    group_seconds = calibrate_from_action_groups(args.action_groups) if args.action_groups else {}
+    if not fitted and not group_seconds:
+        # stock firmware has no status method, so nothing is ever measured
+        parser.error(f"no action with {args.min_samples}+ measured samples in {args.log}; without an action status "
+                     f"method calibrate from the action group files: python action_log.py --action-groups <dir>")
+    if not fitted:
+        print(f"no measured samples in {args.log}, using the action group play times")
+    else:
+        print(f"{'action':28} {'n':>4} {'p50':>6} {'p90':>6} {'p95':>6} {'max':>6} {'table':>6}")
+    for action, f in fitted.items():
+        print(f"{action:28} {f['n']:4} {f['p50']:6.2f} {f['p90']:6.2f} {f['p95']:6.2f} {f['max']:6.2f} {f['seconds']:6.2f}")
+
+    if not args.dry_run:
+        update = table_update(fitted, group_seconds)
+        durations = load_durations(args.output)
+        durations.update(update)
+        source = f"rpc log {args.log}, p{args.percentile:g}" + (f", action groups {args.action_groups}" if group_seconds else "")
+        save_durations(durations, source, args.output)
+        print(f"{len(update)} actions updated -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
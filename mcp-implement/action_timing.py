@@ -0,0 +1,205 @@
+"""
+Wait exactly as long as a robot command takes instead of a fixed sleep.
+
+After a ``RunAction`` the robot plays an action group; the next command must
+not be sent before it ends. ``ActionTimer`` decides how long that is:
+
+- if the firmware exposes an action-status JSON-RPC method
+  (``ACTION_STATUS_METHOD``), it is polled until the robot reports idle,
+- otherwise the action's duration comes from a calibrated table on disk
+  (``action_durations.json``), times the repetition count,
+- an action that was never calibrated keeps the old fixed wait.
+
+Time already spent on the RPC round trip counts towards the wait. A servo
+move takes the move time sent with ``SetPWMServo``.
+
+The table is calibrated from the robot's action group files (SQLite
+``.d6a`` files, one row per frame with its play time in ms, copied from
+``TonyPi/ActionGroups``). No table ships with the repository, and the stock
+firmware has no status method, so until this has been run every action waits
+the fixed ``DEFAULT_ACTION_SECONDS`` (the server warns about it at startup):
+
+    python action_timing.py --action-groups ./ActionGroups
+
+    timer = ActionTimer()
+    sent = time.monotonic()
+    reply = await rpc(payload)
+    await timer.wait_async("go_forward", 1, sent, rpc)
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+DURATIONS_PATH = "action_durations.json"
+# uncalibrated actions keep the fixed wait used before the table existed
+DEFAULT_ACTION_SECONDS = 3.0
+# the servos and the body need a moment to stop after the last frame
+SETTLE_MARGIN = 0.15
+POLL_INTERVAL = 0.1
+# move time sent with SetPWMServo by the server and the controller
+SERVO_MOVE_MS = 1000
+# JSON-RPC method that returns true while an action group is still playing,
+# on firmware that has one (the stock TonyPi RPCServer does not)
+ACTION_STATUS_METHOD: Optional[str] = None
+
+
+def load_durations(path: str = DURATIONS_PATH) -> Dict[str, float]:
+    """Seconds per action (one repetition) from the table on disk; {} if not calibrated yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {name: float(seconds) for name, seconds in data.get("actions", {}).items()}
+
+
+def save_durations(durations: Dict[str, float], source: str, path: str = DURATIONS_PATH):
+    data = {
+        "source": source,
+        "updated": datetime.now().isoformat(timespec="seconds"),
+        "actions": {name: round(seconds, 3) for name, seconds in sorted(durations.items())},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def action_group_seconds(path: str) -> float:
+    """Play time of an action group file: the sum of its frame times."""
+    with sqlite3.connect(path) as db:
+        (total_ms,) = db.execute("SELECT SUM(Time) FROM ActionGroup").fetchone()
+    return (total_ms or 0) / 1000
+
+
+def calibrate_from_action_groups(directory: str) -> Dict[str, float]:
+    return {
+        os.path.splitext(os.path.basename(path))[0]: action_group_seconds(path)
+        for path in sorted(glob.glob(os.path.join(directory, "*.d6a")))
+    }
+
+
+def _status_payload(method: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "method": method, "params": [], "id": int(time.time() * 1000) % 10**9}
+
+
+class ActionTimer:
+    def __init__(self, durations: Optional[Dict[str, float]] = None, status_method: Optional[str] = ACTION_STATUS_METHOD,
+                 margin: float = SETTLE_MARGIN, default_seconds: float = DEFAULT_ACTION_SECONDS):
+        self.durations = load_durations() if durations is None else durations
+        self.status_method = status_method
+        self.margin = margin
+        self.default_seconds = default_seconds
+        # how the last wait ended: "status" (robot reported idle), "timeout",
+        # "table" or "default" (slept the table / fallback duration)
+        self.last_wait: Optional[str] = None
+
+    def uncalibrated_warning(self) -> Optional[str]:
+        """Why every action gets the fixed wait, or None if the timer knows better."""
+        if self.durations or self.status_method:
+            return None
+        return (f"no action duration table ({DURATIONS_PATH}) and no action status method: every action waits "
+                f"{self.default_seconds:g} s; calibrate with `python action_timing.py --action-groups <TonyPi/ActionGroups>`")
+
+    def expected_seconds(self, action: str, times: int = 1) -> float:
+        """How long ``RunAction(action, times)`` keeps the robot busy, margin included."""
+        if action not in self.durations:
+            return self.default_seconds * max(times, 1)
+        return self.durations[action] * max(times, 1) + self.margin
+
+    def servo_seconds(self, move_ms: int) -> float:
+        return move_ms / 1000 + self.margin
+
+    def remaining(self, seconds: float, sent: float) -> float:
+        return max(0.0, sent + seconds - time.monotonic())
+
+    def _running(self, reply: Dict[str, Any]) -> Optional[bool]:
+        """True/False from a status reply; None (and polling off) if the firmware doesn't support it."""
+        if not isinstance(reply, dict) or "error" in reply or "result" not in reply:
+            self.status_method = None
+            return None
+        result = reply["result"]
+        if isinstance(result, (list, tuple)):  # Hiwonder replies (ok, value)
+            result = result[-1]
+        return bool(result)
+
+    def _deadline(self, seconds: float, sent: float) -> float:
+        # never poll longer than twice the table says
+        return sent + 2 * seconds + 1
+
+    async def wait_async(self, action: str, times: int, sent: float,
+                         rpc: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None) -> float:
+        """
+        Wait until the action sent at ``sent`` (``time.monotonic()``) has
+        finished; ``rpc`` posts a JSON-RPC payload and returns the reply.
+        Returns the seconds waited; ``last_wait`` tells how it ended.
+        """
+        start = time.monotonic()
+        seconds = self.expected_seconds(action, times)
+        if self.status_method and rpc is not None:
+            deadline = self._deadline(seconds, sent)
+            while time.monotonic() < deadline:
+                try:
+                    running = self._running(await rpc(_status_payload(self.status_method)))
+                except Exception:
+                    running = None
+                if running is None:
+                    break
+                if not running:
+                    self.last_wait = "status"
+                    return time.monotonic() - start
+                await asyncio.sleep(POLL_INTERVAL)
+            else:
+                self.last_wait = "timeout"
+                return time.monotonic() - start
+        self.last_wait = "table" if action in self.durations else "default"
+        await asyncio.sleep(self.remaining(seconds, sent))
+        return time.monotonic() - start
+
+    def wait(self, action: str, times: int, sent: float,
+             rpc: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> float:
+        """Blocking ``wait_async`` for the synchronous controller."""
+        start = time.monotonic()
+        seconds = self.expected_seconds(action, times)
+        if self.status_method and rpc is not None:
+            deadline = self._deadline(seconds, sent)
+            while time.monotonic() < deadline:
+                try:
+                    running = self._running(rpc(_status_payload(self.status_method)))
+                except Exception:
+                    running = None
+                if running is None:
+                    break
+                if not running:
+                    self.last_wait = "status"
+                    return time.monotonic() - start
+                time.sleep(POLL_INTERVAL)
+            else:
+                self.last_wait = "timeout"
+                return time.monotonic() - start
+        self.last_wait = "table" if action in self.durations else "default"
+        time.sleep(self.remaining(seconds, sent))
+        return time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="calibrate the action duration table")
+    parser.add_argument("--action-groups", required=True, help="directory of the robot's .d6a action group files")
+    parser.add_argument("--output", default=DURATIONS_PATH)
+    args = parser.parse_args()
+
+    durations = calibrate_from_action_groups(args.action_groups)
+    if not durations:
+        parser.error(f"no .d6a files in {args.action_groups}")
+    save_durations(durations, f"action groups: {os.path.abspath(args.action_groups)}", args.output)
+    for name, seconds in sorted(durations.items()):
+        print(f"{name:28} {seconds:6.2f} s")
+    print(f"{len(durations)} actions -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
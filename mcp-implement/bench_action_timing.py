@@ -0,0 +1,71 @@
+"""
+Robot wait time per task with the fixed sleeps vs the action timer.
+
+Replays the motion steps of every valid logged plan and adds up the time
+the server keeps the robot busy before it returns each step:
+
+- before: 3 s per Propagate Action (whatever ``Times`` is), 2.5 s per
+  Control Servo, 2.5 s after every Capture Image result,
+- after: ``ActionTimer.expected_seconds`` from the duration table, the servo
+  move time plus margin, nothing after Capture Image.
+
+RPC round trips, planning, vision and Pick Object episodes are the same in
+both and left out. With --action-groups the table is calibrated from the
+robot's ``.d6a`` files first, otherwise ``action_durations.json`` is used.
+
+    python bench_action_timing.py
+    python bench_action_timing.py --action-groups ./ActionGroups
+"""
+import argparse
+import statistics
+from collections import defaultdict
+
+from action_timing import DURATIONS_PATH, SERVO_MOVE_MS, ActionTimer, calibrate_from_action_groups, load_durations
+from bench_plan_schema import logged_trials
+from main_mcp_client import list_of_all_actions
+from test_tools import validate_plan
+
+FIXED_SECONDS = {"Propagate Action": 3.0, "Control Servo": 2.5, "Capture Image": 2.5}
+
+
+def plan_seconds(plan, timer: ActionTimer):
+    """(before, after) seconds of robot waits for one plan."""
+    before = after = 0.0
+    for step in plan:
+        tool, params = step.get("tool"), step.get("params") or {}
+        before += FIXED_SECONDS.get(tool, 0.0)
+        if tool == "Propagate Action":
+            after += timer.expected_seconds(params["Action"], int(params.get("Times", 1)))
+        elif tool == "Control Servo":
+            after += timer.servo_seconds(SERVO_MOVE_MS)
+    return before, after
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--action-groups", help="calibrate from this directory of .d6a files instead of the table")
+    parser.add_argument("--durations", default=DURATIONS_PATH)
+    args = parser.parse_args()
+
+    durations = (calibrate_from_action_groups(args.action_groups) if args.action_groups
+                 else load_durations(args.durations))
+    timer = ActionTimer(durations)
+    uncalibrated = sorted(a for a in list_of_all_actions if a not in durations)
+    print(f"duration table: {len(durations)} actions calibrated, {len(uncalibrated)} on the "
+          f"{timer.default_seconds:.1f} s fallback")
+
+    per_task = defaultdict(list)
+    for _, task, plan in logged_trials():
+        if plan and validate_plan({"plan": plan}, list_of_all_actions)["plan_compliant"]:
+            per_task[task].append(plan_seconds(plan, timer))
+
+    print(f"{'task':8} {'plans':>6} {'before s/plan':>14} {'after s/plan':>13} {'saved':>7}")
+    for task, times in sorted(per_task.items()):
+        before = statistics.mean(b for b, _ in times)
+        after = statistics.mean(a for _, a in times)
+        saved = 1 - after / before if before else 0.0
+        print(f"{task:8} {len(times):6} {before:14.2f} {after:13.2f} {saved:7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-step cost of the bounding-box features used by the pick_object loop:
+the plain-float dataclass BoundingBox this replaced (baseline), the current
+scalar BoundingBox per detection and one batched BoxArray pass, plus IoU
+matching of consecutive frames. Baseline and scalar include building the
+boxes from the decoded (N, 4) array, like detect_http does every step.
+
+    python bench_box_array.py --detections 1 5 20 100
+"""
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from vision_tools.detection_data import BoxArray
+
+IMAGE_WIDTH, IMAGE_HEIGHT = 640, 480
+
+
+def make_boxes(n: int, rng) -> BoxArray:
+    xy = rng.integers(0, [IMAGE_WIDTH - 50, IMAGE_HEIGHT - 50], size=(n, 2))
+    wh = rng.integers(10, 50, size=(n, 2))
+    return BoxArray(np.hstack([xy, xy + wh]), IMAGE_WIDTH, IMAGE_HEIGHT)
+
+
+@dataclass
+class BaselineBox:
+    """The scalar BoundingBox before BoxArray, for comparison."""
+    xmin: int
+    ymin: int
+    xmax: int
+    ymax: int
+    image_width: int = None
+    image_height: int = None
+
+    @property
+    def n_cxcy(self):
+        cx, cy = self.xmin + (self.xmax - self.xmin) / 2.0, self.ymin + (self.ymax - self.ymin) / 2.0
+        return [cx / self.image_width, cy / self.image_height]
+
+    @property
+    def ncx(self):
+        return self.n_cxcy[0]
+
+    @property
+    def ncy(self):
+        return self.n_cxcy[1]
+
+    @property
+    def n_area(self):
+        return max(1, self.xmax - self.xmin) * max(1, self.ymax - self.ymin) / (self.image_width * self.image_height)
+
+    @property
+    def n_bottom(self):
+        return self.ymax / self.image_height
+
+
+def features(boxes):
+    # what decide_action_from_bbox reads, one box at a time
+    return [(b.n_cxcy, b.ncx, b.ncy, b.n_area, b.n_bottom) for b in boxes]
+
+
+def baseline_features(xyxy: np.ndarray):
+    return features([BaselineBox(*row, IMAGE_WIDTH, IMAGE_HEIGHT) for row in xyxy.tolist()])
+
+
+def scalar_features(xyxy: np.ndarray):
+    return features(BoxArray(xyxy, IMAGE_WIDTH, IMAGE_HEIGHT))
+
+
+def batched_features(xyxy: np.ndarray):
+    boxes = BoxArray(xyxy, IMAGE_WIDTH, IMAGE_HEIGHT)
+    return boxes.n_cxcy, boxes.n_area, boxes.n_bottom
+
+
+def bench(fn, repeat, *args):
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--detections", type=int, nargs="+", default=[1, 5, 20, 100])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>5} {'baseline us':>12} {'scalar us':>10} {'batched us':>11} {'match us':>9}")
+    for n in args.detections:
+        boxes = make_boxes(n, rng)
+        # next frame: same boxes nudged by a few pixels
+        moved = BoxArray(boxes.xyxy + rng.integers(-5, 5, size=boxes.xyxy.shape), IMAGE_WIDTH, IMAGE_HEIGHT)
+        print(f"{n:>5} {bench(baseline_features, args.repeat, boxes.xyxy):>12.1f} "
+              f"{bench(scalar_features, args.repeat, boxes.xyxy):>10.1f} "
+              f"{bench(batched_features, args.repeat, boxes.xyxy):>11.1f} "
+              f"{bench(boxes.match, args.repeat, moved):>9.1f}")
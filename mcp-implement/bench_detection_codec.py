@@ -0,0 +1,82 @@
+"""
+Compare /dino_api response formats: encode+decode time and payload size.
+
+    python bench_detection_codec.py --detections 1 5 20 100
+"""
+import argparse
+import json
+import random
+import time
+
+from vision_tools import detection_codec
+from vision_tools.detection_data import BoundingBox, DetectionResult
+
+IMAGE_WIDTH, IMAGE_HEIGHT = 640, 480
+LABELS = ["red block.", "pink box.", "blue cup.", "bottle."]
+
+
+def make_detections(n: int):
+    dets = []
+    for _ in range(n):
+        x, y = random.randint(0, IMAGE_WIDTH - 50), random.randint(0, IMAGE_HEIGHT - 50)
+        dets.append(DetectionResult(
+            score=random.random(),
+            label=random.choice(LABELS),
+            box=BoundingBox(x, y, x + random.randint(10, 50), y + random.randint(10, 50)),
+        ))
+    return dets
+
+
+def detection_to_dict(det):
+    # same as the vision service's json path
+    return {
+        "score": det.score,
+        "label": det.label,
+        "box": {"xmin": det.box.xmin, "ymin": det.box.ymin, "xmax": det.box.xmax, "ymax": det.box.ymax},
+    }
+
+
+def json_roundtrip(dets):
+    payload = json.dumps({
+        "detections": [detection_to_dict(d) for d in dets],
+        "image_width": IMAGE_WIDTH,
+        "image_height": IMAGE_HEIGHT,
+    }).encode("utf-8")
+    data = json.loads(payload)
+    [DetectionResult.from_json(d, IMAGE_WIDTH, IMAGE_HEIGHT) for d in data["detections"]]
+    return payload
+
+
+def binary_roundtrip(media_type):
+    def roundtrip(dets):
+        payload = detection_codec.encode(dets, IMAGE_WIDTH, IMAGE_HEIGHT, media_type)
+        arrays = detection_codec.decode(payload, media_type)
+        arrays.boxes, arrays.scores, arrays.label_ids
+        return payload
+    return roundtrip
+
+
+def bench(fn, dets, repeat):
+    payload = fn(dets)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(dets)
+    return (time.perf_counter() - start) / repeat * 1e6, len(payload)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--detections", type=int, nargs="+", default=[1, 5, 20, 100])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    formats = {"json": json_roundtrip, "struct": binary_roundtrip(detection_codec.STRUCT_MEDIA_TYPE)}
+    if detection_codec.msgpack is not None:
+        formats["msgpack"] = binary_roundtrip(detection_codec.MSGPACK_MEDIA_TYPE)
+
+    print(f"{'n':>5} {'format':>8} {'us/roundtrip':>14} {'bytes':>8}")
+    for n in args.detections:
+        dets = make_detections(n)
+        for name, fn in formats.items():
+            us, size = bench(fn, dets, args.repeat)
+            print(f"{n:>5} {name:>8} {us:>14.1f} {size:>8}")
@@ -0,0 +1,108 @@
+"""
+pick_object cycle time per step, serial vs pipelined detection.
+
+Runs the real pick_object loop against a simulated robot and vision
+service: RunAction / SetPWMServo return at once and the action timer waits
+``--action`` seconds per go_forward; a detection takes ``--camera`` seconds
+to open the stream and read a frame, then ``--infer`` seconds for the
+detector, and reports its frame time like the service does. Frames acted
+on although they were read while the simulated robot moved are counted
+(must be 0).
+
+    python bench_pick_pipeline.py
+    python bench_pick_pipeline.py --camera 0.3 --infer 0.4 --action 0.8 --episodes 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import controller
+from robot_state import state as known_state
+from vision_tools.detection_data import BoundingBox
+
+IMAGE_WIDTH, IMAGE_HEIGHT = 640, 480
+
+
+class SimulatedRobot:
+    def call(self, method, params=(), idempotent=False):
+        return [True, None]
+
+
+class SimulatedVision:
+    def __init__(self, args):
+        self.args = args
+        self.frames = {}  # id(box) -> Frame
+        self.requests = 0
+
+    def detect_frame(self, query, colors="red", url=None):
+        self.requests += 1
+        time.sleep(self.args.camera)
+        read = time.monotonic()
+        time.sleep(self.args.infer)
+        # centered, low in the image: go_forward and lower the head until the object is reached
+        box = BoundingBox(280, 340, 360, 440, IMAGE_WIDTH, IMAGE_HEIGHT)
+        frame = controller.Frame(SimpleNamespace(box=box), read - controller.FRAME_LATENCY, read, True)
+        self.frames[id(box)] = frame
+        return frame
+
+
+def run_episodes(args, pipeline: bool):
+    """Seconds per step, detections requested, and frames acted on although captured while moving."""
+    controller.PIPELINE = pipeline
+    vision = SimulatedVision(args)
+    controller.detect_frame = vision.detect_frame
+    decide = controller.decide_action_from_bbox
+    prefetchers = []
+
+    class RecordingPrefetcher(controller.DetectionPrefetcher):
+        def __init__(self, query):
+            super().__init__(query)
+            self.motion.intervals = deque()  # the whole episode, not just the recent moves
+            prefetchers.append(self)
+
+    controller.DetectionPrefetcher = RecordingPrefetcher
+    step_seconds, moving = [], 0
+    for _ in range(args.episodes):
+        known_state.head = None
+        steps, decided = [], []
+
+        def recording_decide(b, robot_state, execute=True):
+            decided.append(vision.frames[id(b)])
+            return decide(b, robot_state, execute)
+
+        controller.decide_action_from_bbox = recording_decide
+        controller.pick_object("box", on_step=lambda info: steps.append(time.monotonic()))
+        controller.decide_action_from_bbox = decide
+        step_seconds += [b - a for a, b in zip(steps, steps[1:])]
+        moving += sum(prefetchers[-1].motion.overlaps(f.start, f.end) for f in decided)
+    controller.DetectionPrefetcher = RecordingPrefetcher.__base__
+    return step_seconds, vision.requests, moving
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--camera", type=float, default=0.25, help="seconds from request to camera read")
+    parser.add_argument("--infer", type=float, default=0.3, help="seconds of detection after the read")
+    parser.add_argument("--action", type=float, default=0.6, help="seconds per go_forward")
+    parser.add_argument("--episodes", type=int, default=3)
+    args = parser.parse_args()
+
+    controller.robot = SimulatedRobot()
+    controller.wait_for_vision_ready = lambda *a, **k: True
+    controller.action_timer.durations = {"go_forward": args.action}
+    controller.action_timer.status_method = None
+    controller.rpc_timing.path = os.path.join(tempfile.mkdtemp(), "rpc.jsonl")
+
+    print(f"{'mode':10} {'steps':>6} {'p50 s':>7} {'mean s':>7} {'detections':>11} {'acted on while moving':>22}")
+    for name, pipeline in (("serial", False), ("pipelined", True)):
+        seconds, detections, moving = run_episodes(args, pipeline)
+        print(f"{name:10} {len(seconds):6} {statistics.median(seconds):7.3f} {statistics.fmean(seconds):7.3f} "
+              f"{detections:11} {moving:22}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Hit rate and lookup latency of the semantic plan memory on the task A-D prompts.
+
+The memory is seeded with the first compliant qwen3 plan logged for each task
+prompt, then queried with the prompts themselves, paraphrases that should
+reuse a stored plan (with re-tiled repetition counts), and commands that must
+miss (another object, direction or action).
+
+    python bench_plan_memory.py                      # local hashing embedder
+    python bench_plan_memory.py --embedder ollama    # nomic-embed-text via Ollama
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import tempfile
+import time
+
+from main_mcp_client import SYS_PROMPT, TASK_PROMPTS, list_of_all_actions
+from plan_memory import EMBED_MODEL, SIMILARITY_THRESHOLD, HashingEmbedder, OllamaEmbedder, PlanMemory
+
+FWD, LEFT, RIGHT, WAVE = "go_forward_one_step", "left_move", "right_move", "wave"
+
+# paraphrase -> expected (tool, Action/object) sequence; None means it must miss
+PARAPHRASES = {
+    "Please wave.": [WAVE],
+    "Go right.": [RIGHT],
+    "Walk left.": [LEFT],
+    "Walk forward one step.": [FWD],
+    "Walk forward two steps.": [FWD, FWD],
+    "Take 3 steps forward.": [FWD, FWD, FWD],
+    "Go left 3 times.": [LEFT, LEFT, LEFT],
+    "Move left once.": [LEFT],
+    "Move right twice.": [RIGHT, RIGHT],
+    "Grab the pen!": [("Summarize Scene", None), ("Pick Object", "pen"), "catch_ball"],
+    "Fetch the bottle.": None,
+    "Pick up the mug.": None,
+    "Move up.": None,
+    "Move left, then wave.": None,
+    "Turn around.": None,
+}
+
+
+def step_key(step):
+    params = step.get("params") or {}
+    if step["tool"] == "Propagate Action":
+        return params.get("Action")
+    return (step["tool"], params.get("object_description"))
+
+
+def logged_plans(model="qwen3"):
+    """The first compliant logged plan per task prompt."""
+    plans = {}
+    for path in sorted(glob.glob(os.path.join("logs", "task-*", f"{model}-task*-robot_trials.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("compliance", {}).get("plan_compliant"):
+                    plans.setdefault(record["user_input"], {"response": "", "plan": record["plan"]})
+    return plans
+
+
+async def run(args):
+    embedder = HashingEmbedder() if args.embedder == "hashing" else OllamaEmbedder(args.ollama, args.model)
+    plans = logged_plans()
+    queries = {}
+    for prompts in TASK_PROMPTS.values():
+        for prompt in prompts:
+            if prompt in plans:
+                queries[prompt] = [step_key(s) for s in plans[prompt]["plan"]]
+    queries.update(PARAPHRASES)
+
+    with tempfile.TemporaryDirectory() as directory:
+        memory = PlanMemory(embedder, directory, threshold=args.threshold)
+        start = time.perf_counter()
+        for prompt, plan_data in plans.items():
+            await memory.add(prompt, plan_data, SYS_PROMPT, list_of_all_actions)
+        seed_ms = (time.perf_counter() - start) * 1000
+
+        rows, latencies = [], []
+        for query, expected in queries.items():
+            start = time.perf_counter()
+            match = await memory.lookup(query, SYS_PROMPT)
+            latencies.append((time.perf_counter() - start) * 1000)
+            got = [step_key(s) for s in match["plan"]] if match else None
+            rows.append((query, expected, got, match))
+
+    print(f"embedder={embedder.name} threshold={args.threshold} entries={len(plans)} seed={seed_ms:.1f} ms")
+    for query, expected, got, match in rows:
+        verdict = "ok" if got == expected else ("MISS" if got is None else "WRONG")
+        via = f"<- '{match['matched_command']}' ({match['similarity']})" if match else ""
+        print(f"  [{verdict:5}] {query:40} {via}")
+
+    positives = [r for r in rows if r[1] is not None]
+    negatives = [r for r in rows if r[1] is None]
+    hits = [r for r in positives if r[2] is not None]
+    correct = [r for r in positives if r[2] == r[1]]
+    false_hits = [r for r in negatives if r[2] is not None]
+    latencies.sort()
+    print(f"hit rate {len(hits)}/{len(positives)}, correct {len(correct)}/{len(positives)}, "
+          f"false hits {len(false_hits)}/{len(negatives)}")
+    print(f"lookup latency: median {latencies[len(latencies) // 2]:.3f} ms, max {latencies[-1]:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedder", choices=["hashing", "ollama"], default="hashing")
+    parser.add_argument("--ollama", default="http://127.0.0.1:11434")
+    parser.add_argument("--model", default=EMBED_MODEL)
+    parser.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args()
+    if args.threshold is None:
+        # character n-gram vectors score paraphrases lower than a sentence embedding model
+        args.threshold = 0.5 if args.embedder == "hashing" else SIMILARITY_THRESHOLD
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
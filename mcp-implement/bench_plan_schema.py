@@ -0,0 +1,87 @@
+"""
+Replans avoided by schema-constrained planner output, per task set.
+
+Every plan with an invalid step costs at least one check_and_replan round
+trip (a Summarize Scene call plus a replan). From the logged trials this
+reports, per model and task set, how many plans were invalid and confirms
+the plan schema rejects them, i.e. they cannot be decoded under
+``format=catalog.plan_schema()``. With --eval the task A-D prompts are
+planned live with ``format="json"`` and with the schema.
+
+    python bench_plan_schema.py
+    python bench_plan_schema.py --eval --repeat 3
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+from collections import defaultdict
+
+import jsonschema
+
+import ollama_client
+from bench_prompt_catalog import evaluate, list_server_tools
+from main_mcp_client import MODEL_NAME
+from tool_catalog import ToolCatalog
+
+
+def logged_trials():
+    """(model, task set, plan) for every logged trial."""
+    for path in sorted(glob.glob(os.path.join("logs", "task-*", "*-robot_trials.jsonl"))):
+        task = os.path.basename(os.path.dirname(path))
+        model = os.path.basename(path).split("-task")[0]
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield model, task, json.loads(line).get("plan", [])
+
+
+def schema_accepts(validator, plan) -> bool:
+    # the validators accept a missing params for Summarize Scene; the schema decodes it as {}
+    steps = [dict(step, params=step.get("params", {})) if isinstance(step, dict) else step for step in plan]
+    return validator.is_valid({"response": "", "plan": steps})
+
+
+def report_logs(catalog: ToolCatalog):
+    validator = jsonschema.Draft202012Validator(catalog.plan_schema())
+    counts = defaultdict(lambda: {"plans": 0, "invalid": 0, "schema_rejects": 0, "disagree": 0})
+    for model, task, plan in logged_trials():
+        c = counts[(model, task)]
+        c["plans"] += 1
+        invalid = not catalog.validate_plan({"plan": plan})["plan_compliant"]
+        rejected = not schema_accepts(validator, plan)
+        c["invalid"] += invalid
+        c["schema_rejects"] += rejected
+        c["disagree"] += invalid != rejected
+
+    print(f"{'model':12} {'task':8} {'plans':>6} {'invalid':>8} {'schema rejects':>15} {'replans avoided':>16}")
+    for (model, task), c in sorted(counts.items()):
+        print(f"{model:12} {task:8} {c['plans']:6} {c['invalid']:8} {c['schema_rejects']:15} {c['invalid']:16}"
+              + (f"  ({c['disagree']} judged differently)" if c["disagree"] else ""))
+
+
+async def run(args):
+    catalog = ToolCatalog.from_mcp(await list_server_tools())
+    report_logs(catalog)
+    if args.eval:
+        prompt = catalog.render_prompt()
+        formats = {"json": "json", "schema": catalog.plan_schema()}
+        results = {name: (await evaluate(prompt, catalog, args.repeat, plan_format))[0]
+                   for name, plan_format in formats.items()}
+        print(f"\nlive, {MODEL_NAME}: invalid plans (= replans) with format json vs schema")
+        for task in results["json"]:
+            invalid = {name: r[task][1] - r[task][0] for name, r in results.items()}
+            print(f"  {task}: json {invalid['json']}, schema {invalid['schema']}, "
+                  f"avoided {invalid['json'] - invalid['schema']} of {results['json'][task][1]} plans")
+    await ollama_client.aclose_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eval", action="store_true", help="plan the task A-D prompts with and without the schema")
+    parser.add_argument("--repeat", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
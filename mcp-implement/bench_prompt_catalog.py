@@ -0,0 +1,96 @@
+"""
+Token count and plan compliance of the generated planner prompt vs SYS_PROMPT.
+
+Connects to the MCP server like the client does, renders the prompt from
+``session.list_tools()``, reports the size of both prompts (Ollama's
+``prompt_eval_count`` for the planner model) and, with --eval, plans every
+task A-D prompt with each and validates the plans against the catalog.
+
+    python bench_prompt_catalog.py
+    python bench_prompt_catalog.py --eval --repeat 3
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+import ollama_client
+from main_mcp_client import MODEL_NAME, OLLAMA_SERVER, SYS_PROMPT, TASK_PROMPTS
+from planner_session import PlannerSession
+from tool_catalog import ToolCatalog
+
+
+async def list_server_tools():
+    server_params = StdioServerParameters(command="python", args=["main_mcp_server.py"])
+    async with stdio_client(server_params) as (stdio, write):
+        async with ClientSession(stdio, write) as session:
+            await session.initialize()
+            return (await session.list_tools()).tools
+
+
+async def count_tokens(prompt: str) -> int:
+    """Tokens the planner model evaluates for the prompt (from a 1-token generation)."""
+    session = PlannerSession(OLLAMA_SERVER, MODEL_NAME, prompt)
+    await session.warm_up()
+    return session.calls[-1]["prompt_eval_count"]
+
+
+async def evaluate(prompt: str, catalog: ToolCatalog, repeat: int, plan_format="json"):
+    session = PlannerSession(OLLAMA_SERVER, MODEL_NAME, prompt)
+    results = {}
+    for task, prompts in TASK_PROMPTS.items():
+        compliant = total = 0
+        seconds = 0.0
+        for _ in range(repeat):
+            for user_input in prompts:
+                start = time.perf_counter()
+                try:
+                    result = await session.plan(user_input, format=plan_format, timeout=60)
+                    plan_data = json.loads(result.get("message", {}).get("content", "{}"))
+                except Exception as e:
+                    print(f"  {user_input}: {e}")
+                    plan_data = {}
+                seconds += time.perf_counter() - start
+                total += 1
+                compliant += bool(isinstance(plan_data, dict) and catalog.validate_plan(plan_data)["plan_compliant"])
+        results[task] = (compliant, total, seconds / total)
+    return results, session.stats().get("plan", {})
+
+
+async def run(args):
+    catalog = ToolCatalog.from_mcp(await list_server_tools())
+    prompts = {"SYS_PROMPT": SYS_PROMPT, "generated": catalog.render_prompt()}
+
+    print(f"{'prompt':12} {'chars':>7} {'words':>7} {'tokens':>7}")
+    for name, prompt in prompts.items():
+        try:
+            tokens = await count_tokens(prompt)
+        except Exception as e:
+            print(f"token count unavailable ({e})")
+            tokens = "-"
+        words = len(re.findall(r"\S+", prompt))
+        print(f"{name:12} {len(prompt):7} {words:7} {tokens:>7}")
+
+    if args.eval:
+        for name, prompt in prompts.items():
+            results, stats = await evaluate(prompt, catalog, args.repeat)
+            print(f"\n{name}: {MODEL_NAME}, avg prompt_eval_count {stats.get('avg_prompt_eval_count')}, "
+                  f"avg prompt_eval_ms {stats.get('avg_prompt_eval_ms')}")
+            for task, (compliant, total, avg_s) in results.items():
+                print(f"  {task}: compliant {compliant}/{total} ({compliant / total:.0%}), avg {avg_s:.2f} s/plan")
+    await ollama_client.aclose_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eval", action="store_true", help="plan the task A-D prompts with both prompts")
+    parser.add_argument("--repeat", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Session start latency: a spawned stdio server vs one warm streamable HTTP server.
+
+stdio: every session spawns ``main_mcp_server.py`` (cold imports, new robot /
+vision / Ollama connections), then initializes and lists the tools.
+http: one ``main_mcp_server.py --transport http`` process is started (or
+``--url`` of a running one is used) and every session only connects,
+initializes and lists the tools; ``--concurrent`` sessions are also opened
+at once, like parallel evaluation runners.
+
+    python bench_session_start.py --repeat 10
+    python bench_session_start.py --url http://127.0.0.1:8765/mcp --concurrent 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamable_http_client
+
+SERVER_SCRIPT = "main_mcp_server.py"
+# main_mcp_server.HTTP_HOST / HTTP_PORT (not imported: that loads the vision stack)
+HTTP_HOST = "127.0.0.1"
+HTTP_PORT = 8765
+READY_TIMEOUT = 60
+
+
+async def open_session(transport) -> float:
+    """Seconds until a session is initialized and has the tool list."""
+    start = time.perf_counter()
+    async with transport as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            await session.list_tools()
+            return time.perf_counter() - start
+
+
+def stdio_transport():
+    # same environment as the http server process
+    return stdio_client(StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], env=dict(os.environ)))
+
+
+async def wait_ready(url: str, process=None):
+    """Until the server answers http at all (any status)."""
+    deadline = time.monotonic() + READY_TIMEOUT
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"server exited with {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {READY_TIMEOUT} s")
+
+
+def summary(name: str, seconds):
+    ms = sorted(s * 1000 for s in seconds)
+    p90 = ms[min(len(ms) - 1, int(round(0.9 * (len(ms) - 1))))]
+    print(f"{name:24} {len(ms):4} {ms[0]:9.1f} {statistics.median(ms):9.1f} {p90:9.1f} {ms[-1]:9.1f}")
+
+
+async def run(args):
+    print(f"{'session start':24} {'n':>4} {'min ms':>9} {'p50 ms':>9} {'p90 ms':>9} {'max ms':>9}")
+
+    if not args.skip_stdio:
+        summary("stdio spawn", [await open_session(stdio_transport()) for _ in range(args.repeat)])
+
+    process = None
+    url = args.url
+    if url is None:
+        url = f"http://{HTTP_HOST}:{args.port}/mcp"
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, SERVER_SCRIPT, "--transport", "http", "--port", str(args.port)],
+                                   stdout=subprocess.DEVNULL)
+    try:
+        await wait_ready(url, process)
+        if process is not None:
+            print(f"(http server start: {(time.perf_counter() - start) * 1000:.1f} ms, paid once)")
+        summary("http warm server", [await open_session(streamable_http_client(url)) for _ in range(args.repeat)])
+        if args.concurrent > 1:
+            wall = time.perf_counter()
+            seconds = await asyncio.gather(*(open_session(streamable_http_client(url)) for _ in range(args.concurrent)))
+            summary(f"http x{args.concurrent} concurrent", seconds)
+            print(f"(all {args.concurrent} sessions ready after {(time.perf_counter() - wall) * 1000:.1f} ms)")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrent", type=int, default=4, help="sessions opened at once against the http server")
+    parser.add_argument("--url", help="use a running http server instead of starting one")
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    parser.add_argument("--skip-stdio", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Per-call MCP overhead of each transport: in-process, stdio and streamable HTTP.
+
+Times calls that never reach the robot or the vision service, so what is
+left is the protocol round trip:
+
+- ``list_tools``: the full tool list with its schemas,
+- ``read_resource``: the small robot://state document,
+- ``call_tool``: an Execute Plan that the server rejects at validation
+  (a structured tool result, nothing runs).
+
+in-process runs the server in this event loop over memory streams, stdio
+spawns it, http starts ``main_mcp_server.py --transport http`` (or uses
+``--url``).
+
+    python bench_transport_overhead.py --repeat 500
+    python bench_transport_overhead.py --transports in-process stdio
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+
+from bench_session_start import HTTP_HOST, HTTP_PORT, SERVER_SCRIPT, stdio_transport, wait_ready
+from robot_state import STATE_URI
+
+WARMUP = 20
+TRANSPORTS = ("in-process", "stdio", "http")
+CALLS = {
+    "list_tools": lambda session: session.list_tools(),
+    "read_resource": lambda session: session.read_resource(STATE_URI),
+    "call_tool": lambda session: session.call_tool("Execute Plan", {"Plan": [{"tool": "No Such Tool"}]}),
+}
+
+
+async def time_calls(transport, repeat: int):
+    """Seconds per call, for every call in CALLS, over one session."""
+    samples = {}
+    async with transport as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            for name, call in CALLS.items():
+                for _ in range(WARMUP):
+                    await call(session)
+                seconds = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await call(session)
+                    seconds.append(time.perf_counter() - start)
+                samples[name] = seconds
+    return samples
+
+
+def summary(transport: str, samples):
+    for name, seconds in samples.items():
+        us = sorted(s * 1e6 for s in seconds)
+        p90 = us[int(0.9 * (len(us) - 1))]
+        print(f"{transport:12} {name:14} {statistics.median(us):10.0f} {p90:10.0f} {statistics.fmean(us):10.0f}")
+
+
+async def run(args):
+    print(f"{'transport':12} {'call':14} {'p50 us':>10} {'p90 us':>10} {'mean us':>10}")
+    for transport in args.transports:
+        if transport == "in-process":
+            # imported here: the server module loads the vision stack
+            from main_mcp_server import serve_in_process
+            summary(transport, await time_calls(serve_in_process(), args.repeat))
+        elif transport == "stdio":
+            summary(transport, await time_calls(stdio_transport(), args.repeat))
+        else:
+            process = None
+            url = args.url
+            if url is None:
+                url = f"http://{HTTP_HOST}:{args.port}/mcp"
+                process = subprocess.Popen([sys.executable, SERVER_SCRIPT, "--transport", "http", "--port", str(args.port)],
+                                           stdout=subprocess.DEVNULL)
+            try:
+                await wait_ready(url, process)
+                summary(transport, await time_calls(streamable_http_client(url), args.repeat))
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--url", help="use a running http server instead of starting one")
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
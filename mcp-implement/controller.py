@@ -1,14 +1,23 @@
 
 import os, time, json, requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime 
+from typing import NamedTuple, Optional
 
 import cv2 
 from PIL import Image 
 
 from vision_tools import vision 
+from vision_tools import detection_codec
 from vision_tools.detection_data import BoundingBox, DetectionResult
 import logging
 
+from action_timing import ActionTimer
+from action_log import TimingRecorder
+import robot_rpc
+from robot_state import state as known_state
+
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
@@ -28,91 +37,252 @@ CENTER_Y_THRESH = .09 # normalized
 TOLERANCE = 30 
 
 STABILITY_FRAMES = 2
-SLEEP_BETWEEN_ACTIONS = 1 
+SLEEP_BETWEEN_ACTIONS = 1  # for actions missing from the duration table
+
+PIPELINE = True  # request the next detection while the current action still plays
+FRAME_LATENCY = 0.1  # seconds the camera stream lags behind the robot
+PREFETCH_LEAD = 0.3  # seconds from a detection request to its camera read, until measured
+PREFETCH_MARGIN = 0.05  # read the camera this much after the motion should have ended
 
 VISION_URL = "http://127.0.0.0:8000/dino_api"    # your detect endpoint
+VISION_READY_URL = "http://127.0.0.0:8000/ready"  # 200 once models are loaded and warm
+VISION_READY_TIMEOUT = 300 
 ROBOT_URL = "http://lab-erza.local"
 TONYPI_RPC = "http://lab-erza.local:9030" # Hiwonder JSON-RPC server
 HTTP_TIMEOUT = 5 
 
-import requests
+# waits for each action to finish (action_durations.json or firmware status)
+action_timer = ActionTimer(default_seconds=SLEEP_BETWEEN_ACTIONS)
+rpc_timing = TimingRecorder("controller")
+# pooled json-rpc client with a circuit breaker, shared with the MCP server
+robot = robot_rpc.get_client(TONYPI_RPC)
 
-def detect_http(query: str, colors="red", url=VISION_URL):
+
+class MotionLog:
+    """When the robot last moved (time.monotonic()); frames captured then show an outdated, blurred scene"""
+    def __init__(self, size=16):
+        self.intervals = deque(maxlen=size)
+
+    def add(self, start, end):
+        self.intervals.append((start, end))
+
+    def overlaps(self, start, end) -> bool:
+        return any(s < end and start < e for s, e in self.intervals)
+
+
+class VisionNotReady(Exception):
+    """The vision service did not report ready within VISION_READY_TIMEOUT"""
+
+vision_ready = False  # set once the service reported ready; models stay loaded after that
+
+def wait_for_vision_ready(url=VISION_READY_URL, timeout=VISION_READY_TIMEOUT, interval=1.0) -> bool:
+    """
+    Block until the vision service reports ready (models loaded and warmed up).
+    Returns False if it is still not ready after timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            r = requests.get(url, timeout=HTTP_TIMEOUT)
+            if r.status_code == 200:
+                return True
+            if r.status_code == 404:
+                # a service without /ready loads its models before it answers at all
+                logger.info("[vision] no /ready endpoint, assuming ready")
+                return True
+            logger.info(f"[vision] not ready yet: {r.json().get('stage')}")
+        except Exception as e:
+            logger.info(f"[vision] waiting for service: {e}")
+
+        if time.monotonic() >= deadline:
+            logger.warning(f"[vision] not ready after {timeout}s")
+            return False
+        time.sleep(interval)
+
+def ensure_vision_ready():
+    """wait_for_vision_ready once per process, VisionNotReady if it times out"""
+    global vision_ready
+    if vision_ready:
+        return
+    if not wait_for_vision_ready():
+        raise VisionNotReady(f"vision service at {VISION_READY_URL} not ready after {VISION_READY_TIMEOUT}s")
+    vision_ready = True
+
+class Frame(NamedTuple):
+    det: Optional[DetectionResult]
+    start: float  # the frame was captured between start and end (time.monotonic())
+    end: float
+    timestamped: bool  # the service reported when it read the camera
+
+def detect_frame(query: str, colors="red", url=VISION_URL) -> Frame:
     params = {
         "request": query,
         "boundaryColors": colors
     }
 
+    sent = time.monotonic()
     try:
-        r = requests.post(url, params=params, timeout=10)
-        data = r.json()
+        # ask for the compact struct encoding, the server falls back to json
+        r = requests.post(url, params=params, headers={"Accept": detection_codec.BINARY_ACCEPT}, timeout=10)
+        arrays = detection_codec.decode(r.content, r.headers.get("Content-Type"))
     except Exception as e:
-        logger.debug("HTTP detection error:", e)
-        return None
+        logger.debug(f"HTTP detection error: {e}")
+        return Frame(None, sent - FRAME_LATENCY, time.monotonic(), False)
+    received = time.monotonic()
 
-    # Expected format:
-    # {'detections': [ {...}, {...} ]}
-    if "detections" not in data or len(data["detections"]) == 0:
-        return None
+    try:
+        # wall clock of the camera read -> monotonic, kept within the request
+        read = float(r.headers[detection_codec.FRAME_TIME_HEADER]) - time.time() + time.monotonic()
+        read = min(max(read, sent), received)
+        start, end, timestamped = read - FRAME_LATENCY, read, True
+    except (KeyError, ValueError):
+        start, end, timestamped = sent - FRAME_LATENCY, received, False
 
-    det_json = data["detections"][0]  # take first detection
-    logger.debug(det_json)
+    if len(arrays) == 0:
+        return Frame(None, start, end, timestamped)
 
-    # No image dims available → can fill later in pick_and_place
-    det = DetectionResult.from_json(det_json)
-    det.box.set_image_size(image_width = data["image_width"], image_height = data["image_height"])
-    return det
+    det = DetectionResult.from_arrays(arrays)[0]  # take first detection
+    logger.debug(det)
+    return Frame(det, start, end, timestamped)
 
+def detect_http(query: str, colors="red", url=VISION_URL):
+    return detect_frame(query, colors, url).det
 
-def rpc_run_action(action: str, times: int = 1) -> bool:
-    payload = {
-        'jsonrpc': '2.0',
-        'method': 'RunAction',
-        'params': [action, times],
-        'id': int(time.time() *1000)%10**9
-    }
+
+class DetectionPrefetcher:
+    """
+    Requests the next detection on a worker thread, timed so that the camera
+    is read just after the current action and head move end: the request,
+    camera open and the wait for the vision service overlap the motion
+    instead of following it. A prefetched frame that was still captured
+    while the robot moved (see motion, filled by execute_response) is
+    dropped and detected again.
+
+    One per episode: concurrent picks never queue behind each other's
+    detections, and close() shuts the worker thread down.
+    """
+    def __init__(self, query: str):
+        self.query = query
+        self.motion = MotionLog()
+        # one detection in flight at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.lead: Optional[float] = None  # measured from the first detection on
+        self.pending = None
+        self.enabled = PIPELINE  # off once the service turns out not to timestamp its frames
+        self.stats = {"detections": 0, "prefetched": 0, "stale": 0}
+
+    def _detect_at(self, at: float) -> Frame:
+        time.sleep(max(0.0, at - time.monotonic()))
+        sent = time.monotonic()
+        frame = detect_frame(self.query)
+        self.stats["detections"] += 1
+        if frame.timestamped:
+            lead = frame.end - sent
+            self.lead = lead if self.lead is None else 0.8 * self.lead + 0.2 * lead
+        elif frame.det is not None:
+            self.enabled = False
+        return frame
+
+    def schedule(self, motion_seconds: float):
+        """The robot is about to move for motion_seconds: have the next frame read right after"""
+        if self.enabled and self.pending is None:
+            lead = PREFETCH_LEAD if self.lead is None else self.lead
+            at = time.monotonic() + motion_seconds + FRAME_LATENCY + PREFETCH_MARGIN - lead
+            self.pending = self.executor.submit(self._detect_at, at)
+
+    def next(self) -> Frame:
+        """The prefetched detection if its frame shows the robot at rest, a fresh one otherwise"""
+        if self.pending is not None:
+            frame = self.pending.result()
+            self.pending = None
+            self.stats["prefetched"] += 1
+            if not self.motion.overlaps(frame.start, frame.end):
+                return frame
+            self.stats["stale"] += 1
+            logger.debug('[-] prefetched frame was captured while moving, detecting again')
+        return self._detect_at(0.0)
+
+    def close(self):
+        if self.pending is not None:
+            self.pending.cancel()  # a request already sent just finishes unused
+            self.pending = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def expected_motion_seconds(response) -> float:
+    """How long executing a decided response keeps the robot moving"""
+    seconds = action_timer.expected_seconds(response['action']) if response['action'] else 0.0
+    move_ms = known_state.servo_move_ms(response['head']) if response['head'] is not None else None
+    if move_ms is not None:
+        seconds += action_timer.servo_seconds(move_ms)
+    return seconds
+
+
+def rpc_call(payload: dict) -> dict:
+    # status polls only: safe to retry
+    return robot.send(payload, idempotent=True)
+
+def rpc_run_action(action: str, times: int = 1, motion: Optional[MotionLog] = None) -> bool:
+    params = [action, times]
     try:
-        r = requests.post(
-            TONYPI_RPC,
-            json=payload,
-            timeout=HTTP_TIMEOUT
-        )
-        ok = (r.status_code == 200)
-        time.sleep(SLEEP_BETWEEN_ACTIONS)
+        sent = time.monotonic()
+        try:
+            robot.call('RunAction', params)
+        except robot_rpc.RobotUnavailable:
+            raise
+        except Exception:
+            known_state.forget_posture()
+            raise
+        known_state.after_action(action)
+        received = time.monotonic()
+        settle = action_timer.wait(action, times, sent, rpc_call)
+        if motion is not None:
+            motion.add(sent, time.monotonic())
+        rpc_timing.record('RunAction', params, sent, received, settle, action_timer.last_wait)
         logger.debug('[+] action execution success')
-        return ok
+        return True
+    except robot_rpc.RobotUnavailable:
+        raise  # end the episode instead of stepping blind
     except Exception as e :
         logger.debug(f'[-] failed to execute the action. Error {e}')
         return False
 
-def control_servo(servo_position, head = 'v'):
+def control_servo(servo_position, head = 'v', motion: Optional[MotionLog] = None):
     '''
     accept v as vertical and h as horizontal movement
     '''
-    url = TONYPI_RPC
-    payload = {
-        'jsonrpc': '2.0',
-        'method': 'SetPWMServo',
-        'params': [1000, 2, 1, int(servo_position)],
-        'id': 1,
-    }
+    # called every step, mostly with the position the head already has
+    move_ms = known_state.servo_move_ms(servo_position)
+    if move_ms is None:
+        known_state.skip()
+        return True
+    params = [move_ms, 2, 1, int(servo_position)]
     try:
-        r = requests.post(
-            TONYPI_RPC,
-            json=payload,
-            timeout=HTTP_TIMEOUT
-        )
-        ok = (r.status_code == 200)
-        time.sleep(SLEEP_BETWEEN_ACTIONS)
+        sent = time.monotonic()
+        try:
+            robot.call('SetPWMServo', params)
+        except robot_rpc.RobotUnavailable:
+            raise
+        except Exception:
+            known_state.after_servo(None)
+            raise
+        known_state.after_servo(servo_position)
+        received = time.monotonic()
+        time.sleep(action_timer.remaining(action_timer.servo_seconds(move_ms), sent))
+        if motion is not None:
+            motion.add(sent, time.monotonic())
+        rpc_timing.record('SetPWMServo', params, sent, received, time.monotonic() - received, 'servo')
         logger.debug('[+] action execution success head')
-        return ok
+        return True
+    except robot_rpc.RobotUnavailable:
+        raise
     except Exception as e :
         logger.debug(f'[-] head failed to execute the action. Error {e}')
         return False
 
-def decide_action_from_bbox(b: BoundingBox, robot_state : dict):
+def decide_action_from_bbox(b: BoundingBox, robot_state : dict, execute = True):
     """
     bbox information to discrete action 
+    execute=False only decides; the caller then runs execute_response
     """
 
     logger.debug(f'test {b.image_height}')
@@ -160,26 +330,41 @@ def decide_action_from_bbox(b: BoundingBox, robot_state : dict):
 
 
 
-    rpc_run_action(action=response['action'])
     logger.debug(f"[head] {response['head'] },ncxcy  {ncy} dy {dy}, center y thresh {CENTER_Y_THRESH}")
-    # if response['head']:
-    control_servo(response['head'], 'v')
+    if execute:
+        execute_response(response)
 
     return features, response, robot_state
+
+def execute_response(response, motion: Optional[MotionLog] = None):
+    rpc_run_action(action=response['action'], motion=motion)
+    # if response['head']:
+    control_servo(response['head'], 'v', motion=motion)
     ...
 
-def pick_object(object_description: str, after_pick = None, log_actions = None ):
+def pick_object(object_description: str, after_pick = None, log_actions = None, on_step = None, stop = None):
+    """
+    on_step(info) is called after every step with the step index, bbox
+    features, chosen action, head position and seconds since the start;
+    the loop ends before the next step once stop (a threading.Event) is set.
+    """
+    start = time.monotonic()
     close_frames = 0 
     retry_detection = 0 
     episode = {}
 
     list_of_action_executed = [] 
 
+    # don't start the episode against a cold vision service
+    ensure_vision_ready()
+
     robot_state={
         "action" : None, 
         "head" : 1500,
     }
     control_servo(robot_state['head'], head = 'v')
+    # next detection requested while the robot still moves (PIPELINE)
+    prefetcher = DetectionPrefetcher(object_description)
 
 
     if log_actions:
@@ -192,56 +377,85 @@ def pick_object(object_description: str, after_pick = None, log_actions = None )
             "w"
         )
 
-    for step in range(MAX_STEPS):
-        # camera capture
-        # cap = cv2.VideoCapture(f"{ROBOT_URL}:8080")
-        # if not cap.isOpened():
-        #     logger.debug('cannot open camera')
-        #     exit() 
-        # ret, frame = cap.read() 
-        # image = Image.fromarray(frame)
-
-        # detection 
-        # det = vision.detect(
-        #     image= image,
-        #     labels= query,
-        # )
-
-        det = detect_http(query=object_description)
-
-        if det is None:
-        # no detection so loop back retry after 
-            # no detection of object 
-            retry_detection += 1 
-            if retry_detection > 5:
-                # action to look around 
-                ... 
+    def report(step, features=None, response=None):
+        if on_step is not None:
+            on_step({
+                'step': step + 1,
+                'max_steps': MAX_STEPS,
+                'features': {k: round(v, 3) if isinstance(v, float) else v for k, v in (features or {}).items()},
+                'action': response['action'] if response else None,
+                'head': round(response['head']) if response and response['head'] is not None else None,
+                'elapsed': round(time.monotonic() - start, 2),
+            })
+
+    # the prefetch thread also stops when a step raises (robot unreachable, vision error)
+    try:
+        for step in range(MAX_STEPS):
+            if stop is not None and stop.is_set():
+                logger.debug(f'[-] pick_object stopped before step {step}')
+                break
+            # camera capture
+            # cap = cv2.VideoCapture(f"{ROBOT_URL}:8080")
+            # if not cap.isOpened():
+            #     logger.debug('cannot open camera')
+            #     exit() 
+            # ret, frame = cap.read() 
+            # image = Image.fromarray(frame)
+
+            # detection 
+            # det = vision.detect(
+            #     image= image,
+            #     labels= query,
+            # )
+
+            frame = prefetcher.next()
+            det = frame.det
+
+            if det is None:
+            # no detection so loop back retry after 
+                # no detection of object 
+                retry_detection += 1 
+                if retry_detection > 5:
+                    # action to look around 
+                    ... 
             
-            continue 
+                report(step)
+                continue 
+            if stop is not None and stop.is_set():
+                logger.debug(f'[-] pick_object stopped before acting on step {step}')
+                break
         
-        # det.box.image_width = 100 # image.width
-        # det.box.image_height = 100 # image.height
-        logger.debug(f'[xxx] {det.box.image_height}')
-        features, response, robot_state = decide_action_from_bbox(det.box, robot_state)
+            # det.box.image_width = 100 # image.width
+            # det.box.image_height = 100 # image.height
+            logger.debug(f'[xxx] {det.box.image_height}')
+            features, response, robot_state = decide_action_from_bbox(det.box, robot_state, execute=False)
+            if not response['end']:
+                prefetcher.schedule(expected_motion_seconds(response))
+            execute_response(response, prefetcher.motion)
+            report(step, features, response)
         
 
-        if (response['action'] is None) and (response['head'] is None): 
-            # close enough - confirm stability for a couple frames 
-            close_frames += 1 
-            if close_frames < STABILITY_FRAMES:
-                time.sleep(0.05) 
-                continue
-
-        episode[step] = {
-            'features': features,  # features are detailed robot state 
-            'actions': response,
-            'success': response['end'] 
-        }
-
-        logger.debug(f'[step]: {step}/{MAX_STEPS} : {episode[step]}')
-        list_of_action_executed.append(robot_state['action'])
-        if response['end']:
-            break 
+            if (response['action'] is None) and (response['head'] is None): 
+                # close enough - confirm stability for a couple frames 
+                close_frames += 1 
+                if close_frames < STABILITY_FRAMES:
+                    time.sleep(0.05) 
+                    continue
+
+            episode[step] = {
+                'features': features,  # features are detailed robot state 
+                'actions': response,
+                'success': response['end'] 
+            }
+
+            logger.debug(f'[step]: {step}/{MAX_STEPS} : {episode[step]}')
+            list_of_action_executed.append(robot_state['action'])
+            if response['end']:
+                break 
+    finally:
+        prefetcher.close()
+
+    logger.info(f'[pipeline] {prefetcher.stats}, lead {prefetcher.lead}s')
 
     # saving the episode json file 
     if log_actions:
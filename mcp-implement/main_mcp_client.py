@@ -6,12 +6,26 @@ os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"  # code to only show critical errors
 warnings.filterwarnings("ignore", category=UserWarning, module="google.protobuf")
 
 import asyncio
+import contextvars
 import json
-import requests
-from mcp import ClientSession, StdioServerParameters
+import signal
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamable_http_client
 import re
 from test_tools import * 
+import ollama_client
+from plan_stream import PlanStreamParser
+from plan_cache import PlanCache
+from plan_memory import PlanMemory, OllamaEmbedder
+import rule_planner
+from planner_session import PlannerSession
+from tool_catalog import ToolCatalog
+from plan_repair import REPAIR_CONFIDENCE, repair_step
+from plan_optimizer import ACTION_TOOL, absorb_repeats, merge_repeated_actions
+from plan_scheduler import resume_order
+from tool_catalog import EXECUTE_PLAN_TOOL
+from robot_state import STATE_URI, describe as describe_state
 
 
 # Planner configuration 
@@ -19,6 +33,18 @@ OLLAMA_SERVER = "http://127.0.0.0:11434"
 # ollama run smollm2:1.7b
 MODEL_NAME = "qwen3:1.7b" # "deepseek-r1:1.5b" # "smollm2:1.7b" #       
 IS_THINKING = True
+STREAM_PLAN = True  # start executing plan steps while the planner is still generating
+USE_PLAN_CACHE = True  # reuse validated plans for repeated commands (plan_cache.sqlite)
+USE_PLAN_MEMORY = True  # reuse validated plans for paraphrased commands (plan_memory/)
+USE_RULE_PLANNER = True  # plan simple movement commands without the LLM (rule_planner.py)
+USE_GENERATED_PROMPT = True  # build the system prompt from the server's tool list instead of SYS_PROMPT
+USE_PLAN_SCHEMA = True  # constrain planner output to the JSON Schema of valid plans (Ollama structured output)
+USE_SERVER_EXECUTION = True  # run validated plans in the server with its Execute Plan tool, one call per plan
+# connect to a running server (python main_mcp_server.py --transport http) instead of spawning one per client
+MCP_SERVER_URL = None  # e.g. "http://127.0.0.1:8765/mcp"
+# run the server in this process and event loop, over memory streams (single-machine setups)
+MCP_IN_PROCESS = False
+USE_ROBOT_STATE = True  # tell the planner the robot's posture/head/hands from the server's robot://state resource
 SYS_PROMPT = """
 You are a robot with a physical body: a camera (head), legs, and hands. Your body is bipedal. You can move the robot and look around the environment, and you have the following tools available to control it.
 
@@ -202,31 +228,118 @@ list_of_all_actions = [
     "right_uppercut", "sit_ups", "squat", "squat_down", "squat_up",
     "stand", "stand_slow", "stand_up_back", "stand_up_front",
     "put_down", "wave", "wing_chun", "catch_ball", "catch_ball_up", 
-    "catch_ball_go", "catch_ball_left_move", "catch_ball_right_move",
+    "catch_ball_go", "catch_ball_left_move", "catch_ball_right_move", "move_up",
 ]
 
 
+# evaluation prompts per task category (see logs/task-A..D)
+TASK_PROMPTS = {
+    "task_a":[
+        "Wave.",
+        "Move right.",
+        "Move left.",
+        "Move forward one step.",    
+    ],
+    "task_b": [
+        "Move 3 steps forward and move right.",
+        "Move left twice.",
+        "Move forward 2 steps, move right 2 steps, then wave.",
+        "Move backward one step, then move forward one step.",
+    ],
+    "task_c": [
+        "Grab the pen.",
+        "Pick up the bottle.",
+        "Pick up the cup.",
+        "Fetch the red block.",
+    ],
+    "task_d": [  
+        "Grab the pen, then move right.",
+        "Grab the bottle, move forward one step, then put it down.",
+        "Pick up the cup, move left twice, then put it down.",
+        "Grab the red block, wave, then put it down.",
+    ]
+}
+
 previous_action = lambda msg : f"previous action: '{msg}'"
 
+class ToolAborted(Exception):
+    """The operator aborted a running tool call (Ctrl-C); ends the command without replanning"""
+
+# id of the last request the current task sent through the session (RequestTrackingStream)
+sent_request_id = contextvars.ContextVar("sent_request_id", default=None)
+
+class RequestTrackingStream:
+    """
+    The session's write stream, noting the id of every request it sends in
+    sent_request_id: mcp's ClientSession neither exposes request ids nor tells
+    the server when a request is cancelled, so call_tool_abortable does.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def send(self, message):
+        if isinstance(message.message.root, types.JSONRPCRequest):
+            sent_request_id.set(message.message.root.id)
+        await self.stream.send(message)
+
+    async def __aenter__(self):
+        await self.stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
 class MCPClient:
-    def __init__(self):
+    def __init__(self, bypass_plan_cache: bool = False, use_rule_planner: bool = USE_RULE_PLANNER,
+                 use_generated_prompt: bool = USE_GENERATED_PROMPT, server_url: str = MCP_SERVER_URL,
+                 in_process: bool = MCP_IN_PROCESS):
         self.session = None
+        self.server_url = server_url
+        self.in_process = in_process
         self.stdio = None
         self.write = None
         
         self.previous_plan = "None."
+        # bypass: always plan fresh (evaluation runs) but still record new valid plans
+        self.plan_cache = PlanCache() if USE_PLAN_CACHE else None
+        self.bypass_plan_cache = bypass_plan_cache
+        self.use_rule_planner = use_rule_planner
+        self.use_generated_prompt = use_generated_prompt
+        # replaced from the server's tool list once connected (load_tool_catalog)
+        self.system_prompt = SYS_PROMPT
+        self.allowed_actions = list_of_all_actions
+        self.allowed_tools = ALLOWED_TOOLS
+        self.plan_format = "json"
+        self.server_execution = False  # the server has Execute Plan (load_tool_catalog)
+        self.state_resource = False  # the server has robot://state (run)
+        # one conversation with the planner model; keeps the system prompt cached in Ollama
+        self.planner = PlannerSession(OLLAMA_SERVER, MODEL_NAME, self.system_prompt)
+        self.plan_memory = PlanMemory(OllamaEmbedder(OLLAMA_SERVER)) if USE_PLAN_MEMORY else None
 
     async def run(self):
         """Connect to MCP server"""
         try:
-            server_params = StdioServerParameters(
-                command="python", args=["main_mcp_server.py"]
-            )
-            print("Connecting to robot MCP server...")
+            if self.in_process:
+                # imported here: it loads the server's vision stack into the client
+                from main_mcp_server import serve_in_process
+                print("Starting robot MCP server in process...")
+                transport = serve_in_process()
+            elif self.server_url:
+                print(f"Connecting to robot MCP server at {self.server_url}...")
+                transport = streamable_http_client(self.server_url)
+            else:
+                server_params = StdioServerParameters(
+                    command="python", args=["main_mcp_server.py"]
+                )
+                print("Connecting to robot MCP server...")
+                transport = stdio_client(server_params)
 
-            async with stdio_client(server_params) as (stdio, write):
-                self.stdio = stdio
-                self.write = write
+            async with transport as streams:
+                self.stdio = streams[0]
+                self.write = RequestTrackingStream(streams[1])
 
                 async with ClientSession(self.stdio, self.write) as session:
                     self.session = session
@@ -237,6 +350,15 @@ class MCPClient:
                     print("\nAvailable Tools:")
                     for tool in tools_response.tools:
                         print(f"  - {tool.name}: {tool.description}")
+                    self.load_tool_catalog(tools_response.tools)
+                    if USE_ROBOT_STATE:
+                        resources = await session.list_resources()
+                        self.state_resource = any(str(r.uri) == STATE_URI for r in resources.resources)
+
+                    try:
+                        await self.planner.warm_up()
+                    except Exception as e:
+                        print(f"Planner warm-up failed: {e}")
 
                     await self.interactive_chat()
                     # return True
@@ -244,8 +366,30 @@ class MCPClient:
         except Exception as e:
             print(f"Connection failed: {e}")
             # return False
-
-    def get_ollama_plan(self, user_input: str):
+        finally:
+            print(f"Ollama connection stats: {ollama_client.all_stats()}")
+            print(f"Planner prompt eval stats: {self.planner.stats()}")
+            await ollama_client.aclose_all()
+            if self.plan_cache is not None:
+                print(f"Plan cache stats: {self.plan_cache.stats()}")
+                self.plan_cache.close()
+            if self.plan_memory is not None:
+                print(f"Plan memory stats: {self.plan_memory.stats()}")
+
+    def load_tool_catalog(self, tools):
+        """Build the validators and, unless disabled, the planner prompt from the server's tool list"""
+        catalog = ToolCatalog.from_mcp(tools)
+        self.server_execution = USE_SERVER_EXECUTION and any(t.name == EXECUTE_PLAN_TOOL for t in tools)
+        self.allowed_actions = catalog.allowed_actions
+        self.allowed_tools = catalog.allowed_tools
+        if USE_PLAN_SCHEMA:
+            self.plan_format = catalog.plan_schema()
+        if self.use_generated_prompt:
+            self.system_prompt = catalog.render_prompt()
+            self.planner = PlannerSession(OLLAMA_SERVER, MODEL_NAME, self.system_prompt)
+            print(f"Generated planner prompt: {len(self.system_prompt)} chars (SYS_PROMPT: {len(SYS_PROMPT)})")
+
+    async def get_ollama_plan(self, user_input: str):
         """Get planning and tools sequence from qwen3:1.7b"""
         # repetition_patterns = [
         #     (r'twice', 2),
@@ -268,24 +412,10 @@ class MCPClient:
         #         else:
         #             repetitions = rep
 
-        url = f"{OLLAMA_SERVER}/api/chat"
-        payload = {
-            "model": MODEL_NAME,
-            "messages": [
-                {"role": "system", "content": SYS_PROMPT},
-                {"role": "user", "content": user_input},
-                # {"role": "user", "content": previous_action(self.previous_plan) + "\ncurrent input:" + user_input},
-            ],
-            "stream": False,
-            "format": "json",
-        }
-
         try:
             print("Sending request to Ollama...")
-            response = requests.post(url, json=payload, timeout=30)
-            print(payload['messages'][-1])
-            response.raise_for_status()
-            result = response.json()
+            result = await self.planner.plan(user_input, format=self.plan_format, timeout=30)
+            print(self.planner.messages[1])
             content = result.get("message", {}).get("content", "{}")
             # print(f"Raw content: {content}")
 
@@ -304,6 +434,24 @@ class MCPClient:
             print(f"Ollama request failed: {e}")
             return {"response": "Planning failed", "plan": []}
 
+    async def stream_ollama_plan(self, user_input: str, step_queue: asyncio.Queue):
+        """Stream the plan from Ollama and queue each step, with its validation result, as soon as it is complete"""
+        parser = PlanStreamParser()
+        try:
+            print("Streaming plan from Ollama...")
+            async for chunk in self.planner.plan_stream(user_input, format=self.plan_format, timeout=30):
+                for step in parser.feed(chunk.get("message", {}).get("content", "")):
+                    ok, violations = validate_step(step, self.allowed_actions, self.allowed_tools)
+                    step_queue.put_nowait((step, violations))
+            plan_data = parser.result()
+            self.previous_plan = plan_data
+            return plan_data
+        except Exception as e:
+            print(f"Ollama request failed: {e}")
+            return {"response": "Planning failed", "plan": list(parser.steps)}
+        finally:
+            step_queue.put_nowait(None)  # end of plan
+
     async def check_and_replan(
         self, step_result: str, current_plan: list, step_index: int, user_input: str
     ) -> tuple[bool, list]:
@@ -329,26 +477,26 @@ class MCPClient:
             except:
                 scene_text = "Unable to capture scene"
 
-            replan_prompt = f"""
-            The previous plan failed with error: {step_result}. You are correcting a failed robot plan.
-            Current scene: {scene_text}
-            Original user command: {user_input}
-            
-            IMPORTANT REPETITION RULES:
-            - If the user said "twice", create 2 identical steps
-            - If the user said "3 times", create 3 identiical steps
-            - If the user said "five times", create 5 identiical steps
-            - For "move right twice", create TWO "right_move" actions
-            - For "walk forward 3 times", create THREE "go_forward" actions
-            
-            Create a corrected plan using ONLY VALID tools and actions from the allowed list.
-            CRITICAL:Use ONLY these action names: {list_of_all_actions}
-            Return ONLY JSON with a corrected plan.
-            Original system prompt: {SYS_PROMPT}
-            """
+            # only the delta: the system prompt and the failed plan are already in the conversation
+            # (the executed steps are listed: with Execute Plan they are not always a prefix of the plan)
+            executed = ", ".join(str(s.get("step", k + 1)) for k, s in enumerate(current_plan[:step_index])) or "none"
+            failed_step = current_plan[step_index].get("step", step_index + 1) if step_index < len(current_plan) else step_index + 1
+            correction = (
+                f"Step {failed_step} of your plan failed with error: {step_result}\n"
+                f"Steps already executed: {executed}. Current scene: {scene_text}\n"
+                "Reply with a corrected plan for the remaining steps only, in the same JSON format, "
+                "using ONLY the allowed tools and actions."
+            )
 
             # Corrected plan
-            corrected_plan_data = self.get_ollama_plan(replan_prompt)
+            try:
+                result = await self.planner.replan(
+                    user_input, correction, json.dumps({"plan": current_plan}), format=self.plan_format, timeout=30
+                )
+                corrected_plan_data = json.loads(result.get("message", {}).get("content", "{}"))
+            except Exception as e:
+                print(f"Replanning failed: {e}")
+                corrected_plan_data = None
             if corrected_plan_data and "plan" in corrected_plan_data:
                 corrected_plan = corrected_plan_data.get(
                     "plan", []
@@ -357,10 +505,11 @@ class MCPClient:
                     :step_index
                 ]  # keep executed steps and just replace futre ones
                 new_steps = []
+                first = max([s["step"] for s in executed_steps if isinstance(s.get("step"), int)] + [step_index]) + 1
                 for i, step in enumerate(corrected_plan):
                     new_steps.append(
                         {
-                            "step": step_index + i + 1,
+                            "step": first + i,
                             "tool": step["tool"],
                             "params": step["params"],
                         }
@@ -370,25 +519,103 @@ class MCPClient:
                 return True, updated_plan
         return False, current_plan
 
-    async def execute_plan(self, plan_data: dict, user_input: str):
-        """Execute the planned tool sequence"""
+    async def execute_plan(self, plan_data: dict, user_input: str, step_queue: asyncio.Queue = None, planner_task: asyncio.Task = None):
+        """Execute the planned tool sequence; with step_queue, steps are taken from the streaming planner as they arrive"""
         if not plan_data or "plan" not in plan_data:
             return "No plan to execute"
 
         response_text = plan_data.get("response", "")
         plan = plan_data.get("plan", [])
+        if step_queue is None:
+            plan = merge_repeated_actions(plan)  # "wave" x3 -> one "wave" with Times 3
+        streamed_violations = {}  # plan index -> validation violations of streamed steps
         execution_log = []
-        execution_log.append(f"Initial response: {response_text}")
-        execution_log.append(f"Execution plan with {len(plan)} steps:")
+        execution_log.append(f"Planner: {plan_data.get('planner', MODEL_NAME)}")
+        if step_queue is None:
+            execution_log.append(f"Initial response: {response_text}")
+            execution_log.append(f"Execution plan with {len(plan)} steps:")
+        else:
+            execution_log.append("Execution plan (streamed):")
 
         # Execute each step in plan
         i = 0
-        while i < len(plan):
+        while True:
+            if i >= len(plan):
+                if step_queue is None:
+                    break
+                item = await step_queue.get()  # wait for the planner's next step
+                if item is None:
+                    step_queue = None
+                    continue
+                step, violations = item
+                if violations:
+                    streamed_violations[len(plan)] = violations
+                plan.append(step)
+                continue
+
+            if step_queue is None and self.server_execution:
+                # the rest of the plan in one server call, up to the first step that needs a replan
+                next_i, error = await self.execute_batch(plan, i, execution_log)
+                if error is not None:
+                    should_replan, new_plan = await self.check_and_replan(error, plan, next_i, user_input)
+                    if should_replan:
+                        execution_log.append(f" [Replanning] Generating corrected plan...")
+                        plan = new_plan
+                        i = next_i
+                        continue
+                    next_i += 1
+                if next_i > i:
+                    i = next_i
+                    continue
+
             step = plan[i]
             step_num = step.get("step", i + 1)
             tool_name = step.get("tool", "")
             params = step.get("params", {})
             execution_log.append(f"Step {step_num}: {tool_name} with params {params}")
+
+            # validate and repair locally before anything is sent to the server
+            violations = streamed_violations.pop(i, None)
+            if violations is None:
+                _, violations = validate_step(step, self.allowed_actions, self.allowed_tools)
+            if violations:
+                repaired, confidence, notes = repair_step(step, self.allowed_actions, self.allowed_tools)
+                if confidence >= REPAIR_CONFIDENCE:
+                    execution_log.append(f"  Repaired (confidence {confidence:.2f}): {'; '.join(notes)}")
+                    step = plan[i] = dict(repaired, step=step_num)
+                    tool_name, params = step["tool"], step["params"]
+                    violations = []
+            if violations:
+                # invalid step that could not be repaired: replan without a round trip to the server
+                tool_result = f"Validation error: {violations}"
+                execution_log.append(f"  Result: {tool_result}")
+                should_replan, new_plan = await self.check_and_replan(tool_result, plan, i, user_input)
+                if should_replan:
+                    execution_log.append(f" [Replanning] Generating corrected plan...")
+                    if planner_task is not None:
+                        planner_task.cancel()  # later streamed steps belong to the failed plan
+                    step_queue, streamed_violations = None, {}
+                    plan = new_plan
+                    continue
+                i += 1
+                continue
+
+            if tool_name == ACTION_TOOL:
+                # one call for the identical action steps already planned after this one
+                while step_queue is not None and not step_queue.empty():
+                    item = step_queue.get_nowait()
+                    if item is None:
+                        step_queue = None
+                        break
+                    if item[1]:
+                        streamed_violations[len(plan)] = item[1]
+                    plan.append(item[0])
+                removed = absorb_repeats(plan, i, streamed_violations)
+                if removed:
+                    streamed_violations = {k - removed if k > i else k: v for k, v in streamed_violations.items()}
+                    step = plan[i]
+                    params = step["params"]
+                    execution_log.append(f"  Merged with the next {removed} identical step(s): {params}")
             # for step in plan:
             #     step_num = step.get("step", 0)
             #     tool_name = step.get("tool", "")
@@ -397,7 +624,7 @@ class MCPClient:
 
             try:
                 # Executing tool via MCP server tool call
-                result = await self.session.call_tool(tool_name, params)
+                result = await self.call_tool_abortable(tool_name, params)
                 if result and result.content:
                     tool_result = result.content[0].text
                     execution_log.append(f"  Result: {tool_result}")
@@ -410,12 +637,17 @@ class MCPClient:
                         execution_log.append(
                             f" [Replanning] Generating corrected plan..."
                         )
+                        if planner_task is not None:
+                            planner_task.cancel()
+                        step_queue, streamed_violations = None, {}
                         plan = new_plan  # corrected plan
                         continue
 
                 else:
                     execution_log.append(f"  Result: No response from tool")
 
+            except ToolAborted:
+                raise
             except Exception as e:
                 execution_log.append(f"  Error: {repr(e)}")
                 # if exception error needs replanning
@@ -424,6 +656,9 @@ class MCPClient:
                 )
                 if should_replan:
                     execution_log.append(f" [Replanning] Generating corrected plan...")
+                    if planner_task is not None:
+                        planner_task.cancel()
+                    step_queue, streamed_violations = None, {}
                     plan = new_plan  # corrected plan
                     continue
 
@@ -431,29 +666,127 @@ class MCPClient:
             i += 1
             await asyncio.sleep(0.5)
 
+        if planner_task is not None and planner_task.done() and not planner_task.cancelled():
+            execution_log.insert(1, f"Initial response: {planner_task.result().get('response', '')}")
+
         execution_summary = "\n".join(execution_log)
         final_analysis = await self.get_final_analysis(user_input, execution_summary)
         execution_log.append(f"\n{final_analysis}")
         return "\n".join(execution_log)
 
+    async def execute_batch(self, plan: list, i: int, execution_log: list):
+        """
+        Run plan[i:] with the server's Execute Plan tool, up to the first step
+        that is invalid and can't be repaired locally. Returns the index of the
+        next step to run and, if a step failed, its error (the index is then
+        the failed step's). The server runs steps out of order, so on a failure
+        the batch is reordered in place: the steps that completed (also ones
+        planned after the failed step) come first, so plan[:index] is exactly
+        what ran and neither a replan nor resuming after it repeats them.
+        """
+        plan[i:] = merge_repeated_actions(plan[i:], plan[i].get("step", i + 1))
+        end, logged = i, {}
+        while end < len(plan):
+            step = plan[end]
+            logged[end] = [f"Step {step.get('step', end + 1)}: {step.get('tool', '')} with params {step.get('params', {})}"]
+            _, violations = validate_step(step, self.allowed_actions, self.allowed_tools)
+            if violations:
+                repaired, confidence, notes = repair_step(step, self.allowed_actions, self.allowed_tools)
+                if confidence < REPAIR_CONFIDENCE:
+                    break
+                logged[end].append(f"  Repaired (confidence {confidence:.2f}): {'; '.join(notes)}")
+                plan[end] = dict(repaired, step=step.get("step", end + 1))
+            end += 1
+        if end == i:
+            return i, None
+
+        try:
+            result = await self.call_tool_abortable(EXECUTE_PLAN_TOOL, {"Plan": plan[i:end]})
+        except ToolAborted:
+            raise
+        except Exception as e:
+            print(f"Execute Plan failed, running steps one by one: {e!r}")
+            return i, None
+        outcome = result.structuredContent
+        if result.isError or not outcome:
+            text = result.content[0].text if result.content else "No response from tool"
+            execution_log.extend(logged[i])
+            execution_log.append(f"  Result: {text}")
+            return i, text
+
+        # the server runs steps that don't share a resource concurrently: log when each ran
+        for s in outcome["steps"]:
+            execution_log.extend(logged[i + s["index"]])
+            if s["started"] is None:
+                execution_log.append(f"  Result: {s['result']}")
+            else:
+                execution_log.append(f"  Result: {s['result']} "
+                                     f"(t={s['started']:.2f}-{s['finished']:.2f} s, {'+'.join(s['resources'])})")
+        if outcome["status"] == "error":
+            error = outcome["error"]
+            if not outcome["steps"]:  # rejected before anything ran
+                execution_log.extend(logged[i + error["index"]])
+                execution_log.append(f"  Result: {error['message']}")
+            order = resume_order(end - i, outcome.get("completed_indices", []), error["index"])
+            plan[i:end] = [plan[i + k] for k in order]
+            return i + order.index(error["index"]), error["message"]
+        return end, None
+
+    async def show_progress(self, progress, total, message):
+        print(f"  [{int(progress)}/{int(total or 0)}] {message}")
+
+    async def call_tool_abortable(self, name: str, arguments: dict):
+        """
+        call_tool with live progress that Ctrl-C aborts: the server gets an MCP
+        cancellation for the request (a running Pick Object stops before its
+        next controller step) and ToolAborted is raised instead of the client
+        exiting.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def call():
+            try:
+                return await self.session.call_tool(name, arguments, progress_callback=self.show_progress)
+            except asyncio.CancelledError:
+                # ClientSession only stops waiting for the reply: cancel the request on the server too
+                request_id = sent_request_id.get()
+                if request_id is not None:
+                    await self.session.send_notification(types.ClientNotification(types.CancelledNotification(
+                        params=types.CancelledNotificationParams(requestId=request_id, reason="cancelled by the client"),
+                    )))
+                raise
+
+        task = asyncio.ensure_future(call())
+        try:
+            # only while this call runs; the handler runs in the loop, not in a signal context
+            loop.add_signal_handler(signal.SIGINT, task.cancel)
+            scoped = True
+        except (NotImplementedError, RuntimeError):
+            scoped = False  # no loop signal handlers (Windows): Ctrl-C stops the client as before
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if not task.cancelled() or asyncio.current_task().cancelling():
+                raise  # not the operator's abort
+            print(f"  Aborted {name}")
+            raise ToolAborted(f"{name} aborted by the operator")
+        finally:
+            if scoped:
+                loop.remove_signal_handler(signal.SIGINT)
+
     async def get_final_analysis(self, user_input: str, execution_summary: str):
         """Get final analysis from LLM about the execution results"""
-        url = f"{OLLAMA_SERVER}/api/chat"
         prompt = f"""
         User asked: "{user_input}"
         The robot executed this plan: {execution_summary}
         Based on the executed results, provide a concise final response to the user about what was accomplished and what was found.
+        Answer in plain text, not with a plan.
         Example: 
         Final analysis: The action 'wave' was executed successfully, and the user's request to wave was completed.
         """
-        payload = {
-            "model": MODEL_NAME,
-            "messages": [{"role": "user", "content": prompt}],
-            "stream": False,
-        }
         try:
-            response = requests.post(url, json=payload, timeout=30)
-            result = response.json()
+            # after the planner's system prompt: keeps its evaluated prefix cached for the next command
+            result = await self.planner.analyze(prompt, timeout=30)
             content = result.get("message", {}).get("content", "No analysis available")
             filtered_analysis = re.sub(
                 r"<think>.*?</think>", "", content, flags=re.DOTALL
@@ -462,6 +795,87 @@ class MCPClient:
         except Exception as e:
             return f"Analysis unavailable: {str(e)}"
 
+    async def plan_and_execute(self, user_input: str):
+        """Plan with Ollama and execute; when streaming, steps run as soon as the planner emits them"""
+        if self.use_rule_planner:
+            plan_data = rule_planner.plan(user_input)
+            if plan_data is not None:
+                print("Using rule-based plan...")
+                print(plan_data)
+                return await self.execute_plan(plan_data, user_input)
+
+        if self.plan_cache is not None and not self.bypass_plan_cache:
+            plan_data = self.plan_cache.get(user_input, MODEL_NAME, self.system_prompt)
+            if plan_data is not None:
+                plan_data["planner"] = "plan_cache"
+                print("Using cached plan...")
+                print(plan_data)
+                return await self.execute_plan(plan_data, user_input)
+
+        if self.plan_memory is not None and not self.bypass_plan_cache:
+            try:
+                plan_data = await self.plan_memory.lookup(user_input, self.system_prompt)
+            except Exception as e:
+                print(f"Plan memory lookup failed: {e}")
+                plan_data = None
+            if plan_data is not None:
+                plan_data["planner"] = "plan_memory"
+                print(f"Using remembered plan for '{plan_data['matched_command']}' (similarity {plan_data['similarity']})...")
+                print(plan_data)
+                return await self.execute_plan(plan_data, user_input)
+
+        await self.load_robot_state()
+
+        if STREAM_PLAN:
+            step_queue = asyncio.Queue()
+            planner_task = asyncio.create_task(self.stream_ollama_plan(user_input, step_queue))
+            print("Executing plan as it streams...")
+            try:
+                execution_result = await self.execute_plan({"response": "", "plan": [], "planner": MODEL_NAME}, user_input, step_queue, planner_task)
+            finally:
+                planner_task.cancel()
+            if planner_task.done() and not planner_task.cancelled():
+                await self.remember_plan(user_input, planner_task.result())
+            return execution_result
+
+        print("Getting execution plan from Ollama...")
+        plan_data = await self.get_ollama_plan(user_input)
+        plan_data["planner"] = MODEL_NAME
+        await self.remember_plan(user_input, plan_data)
+        
+        
+        print(plan_data)
+        # verify_compliance(plan_data, list_of_all_actions, ) 
+
+        
+        # continue
+
+        print("Executing plan...")
+        return await self.execute_plan(plan_data, user_input)
+
+    async def load_robot_state(self):
+        """Put the robot's current state in front of the next planner command (robot://state)"""
+        self.planner.context = None
+        if not self.state_resource:
+            return
+        try:
+            result = await self.session.read_resource(STATE_URI)
+            self.planner.context = describe_state(json.loads(result.contents[0].text)) or None
+        except Exception as e:
+            print(f"Robot state read failed: {e}")
+
+    async def remember_plan(self, user_input: str, plan_data: dict):
+        """Remember a planner result for this command and its paraphrases (only stored if it validates)"""
+        if self.plan_cache is not None:
+            self.plan_cache.put(user_input, MODEL_NAME, self.system_prompt, plan_data, self.allowed_actions,
+                                self.allowed_tools)
+        if self.plan_memory is not None:
+            try:
+                await self.plan_memory.add(user_input, plan_data, self.system_prompt, self.allowed_actions,
+                                           self.allowed_tools)
+            except Exception as e:
+                print(f"Plan memory update failed: {e}")
+
     async def interactive_chat(self):
         """Main interactive chat loop"""
         print("\n" + "=" * 40)
@@ -485,20 +899,8 @@ class MCPClient:
 
                 print(f"\nProcessing: '{user_input}'")
 
-                # Step 1: get plan from Ollama
-                print("Getting execution plan from Ollama...")
-                plan_data = self.get_ollama_plan(user_input)
-                
-                
-                print(plan_data)
-                # verify_compliance(plan_data, list_of_all_actions, ) 
-
-                
-                # continue
-
-                # Step 2: execute the plan 
-                print("Executing plan...")
-                execution_result = await self.execute_plan(plan_data, user_input)
+                # Step 1 & 2: get plan from Ollama and execute it
+                execution_result = await self.plan_and_execute(user_input)
 
                 # Step 3: display results
                 print(f"\nExecution Results:")
@@ -507,6 +909,8 @@ class MCPClient:
             except KeyboardInterrupt:
                 print("\nSession interrupted")
                 break
+            except ToolAborted as e:
+                print(f"\n{e}; the rest of the plan was not run")
             except Exception as e:
                 print(f"Error: {str(e)}")
     
@@ -522,33 +926,7 @@ async def automated_chat(self, task_category = "task_a"):
         print("Type 'quit' to exit")
         print("=" * 40)
 
-        task = {
-            "task_a":[
-                "Wave.",
-                "Move right.",
-                "Move left.",
-                "Move forward one step.",    
-            ],
-            "task_b": [
-                "Move 3 steps forward and move right.",
-                "Move left twice.",
-                "Move forward 2 steps, move right 2 steps, then wave.",
-                "Move backward one step, then move forward one step.",
-            ],
-            "task_c": [
-                "Grab the pen.",
-                "Pick up the bottle.",
-                "Pick up the cup.",
-                "Fetch the red block.",
-            ],
-            "task_d": [  
-                "Grab the pen, then move right.",
-                "Grab the bottle, move forward one step, then put it down.",
-                "Pick up the cup, move left twice, then put it down.",
-                "Grab the red block, wave, then put it down.",
-            ]
-        }
-        task_a = task[task_category]
+        task_a = TASK_PROMPTS[task_category]
         task_count = 0 
         total_prompts = len(task_a) * 6 
         while True and (task_count != total_prompts):
@@ -563,20 +941,8 @@ async def automated_chat(self, task_category = "task_a"):
 
                 print(f"\nProcessing: '{user_input}'")
 
-                # Step 1: get plan from Ollama
-                print("Getting execution plan from Ollama...")
-                plan_data = self.get_ollama_plan(user_input)
-                
-                
-                print(plan_data)
-                # verify_compliance(plan_data, list_of_all_actions, ) 
-
-                
-                # continue
-
-                # Step 2: execute the plan 
-                print("Executing plan...")
-                execution_result = await self.execute_plan(plan_data, user_input)
+                # Step 1 & 2: get plan from Ollama and execute it
+                execution_result = await self.plan_and_execute(user_input)
 
                 # Step 3: display results
                 print(f"\nExecution Results:")
@@ -585,12 +951,30 @@ async def automated_chat(self, task_category = "task_a"):
             except KeyboardInterrupt:
                 print("\nSession interrupted")
                 break
+            except ToolAborted as e:
+                print(f"\n{e}; the rest of the plan was not run")
             except Exception as e:
                 print(f"Error: {str(e)}")
 
 async def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-plan-cache", action="store_true", help="always plan fresh (evaluation runs)")
+    parser.add_argument("--no-rule-planner", action="store_true", help="send every command to the LLM planner")
+    parser.add_argument("--legacy-prompt", action="store_true", help="plan with the hand-written SYS_PROMPT")
+    parser.add_argument("--server-url", default=MCP_SERVER_URL,
+                        help="streamable HTTP url of a running server, e.g. http://127.0.0.1:8765/mcp")
+    parser.add_argument("--in-process", action="store_true", help="run the server in this process (memory streams)")
+    args = parser.parse_args()
+
     print("Starting MCP Client...")
-    client = MCPClient()
+    client = MCPClient(
+        bypass_plan_cache=args.no_plan_cache,
+        use_rule_planner=not args.no_rule_planner,
+        use_generated_prompt=not args.legacy_prompt,
+        server_url=args.server_url,
+        in_process=args.in_process,
+    )
     await client.run()
     print("Session completed")
 
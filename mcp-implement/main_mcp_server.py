@@ -1,73 +1,184 @@
+import argparse
+import anyio
 import asyncio
+import contextlib
+import contextvars
 import json
-import requests
+import sys
+import threading
+import httpx
+import jsonschema
 import time
 from typing import Any, Sequence
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Tool, TextContent
+from mcp.types import Tool, TextContent, Resource
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 import base64
 from datetime import datetime
 import cv2
 import time
 from controller import pick_object 
+import ollama_client
+from action_timing import ActionTimer
+from action_log import TimingRecorder
+from test_tools import MAX_ACTION_TIMES
+import plan_scheduler
+import robot_rpc
+import robot_state
+from robot_state import state as known_state
 
 # Configuration
 ROBOT_BASE_URL = "http://lab-erza.local:9030"
 VISION_API_URL = "http://127.0.0.0:8000/dino_api"
+OLLAMA_SERVER = "http://127.0.0.1:11434"
+VLM_MODEL_NAME = "qwen3-vl:2b"
+VLM_KEEP_ALIVE = -1  # keep the VLM loaded next to the planner model
+CAMERA_URL = "http://lab-erza:8080/"
+# --transport http: one long-running server for many clients at http://HTTP_HOST:HTTP_PORT/mcp
+HTTP_HOST = "127.0.0.1"
+HTTP_PORT = 8765
 
 mcp = Server("robot-control-mcp-server")
 
-def navigate_and_pick_object(object_description: str): 
+# one async http client for the vision service (closed in close_connections)
+http_client = httpx.AsyncClient(timeout=10)
+
+def vision_client() -> httpx.AsyncClient:
+    """The vision service client, reopened after close_connections (serve_in_process runs more than once)."""
+    global http_client
+    if http_client.is_closed:
+        http_client = httpx.AsyncClient(timeout=10)
+    return http_client
+
+# pooled json-rpc client for the robot, shared with the controller, with a circuit breaker
+robot = robot_rpc.get_client(ROBOT_BASE_URL)
+# one command at a time per part of the robot; camera/vlm tools and list_tools run alongside them
+robot_locks = {"body": asyncio.Lock(), "head": asyncio.Lock()}
+# how long each command keeps the robot busy (action_durations.json or firmware status)
+action_timer = ActionTimer()
+# every robot rpc with its response and settle time (logs/robot_rpc.jsonl)
+rpc_timing = TimingRecorder("server")
+# async report(step, total, message) for tools with steps of their own (Pick Object); set per request
+step_progress: contextvars.ContextVar = contextvars.ContextVar("step_progress", default=None)
+
+# resources each tool holds while it runs (plan_scheduler); also listed in the tools' _meta
+TOOL_RESOURCES = {
+    "Propagate Action": ["body", "camera"],  # walking and turning move the camera
+    "Control Servo": ["head", "camera"],
+    "Capture Image": ["camera"],
+    "Summarize Scene": ["camera", "vlm"],  # the camera only until the frame is grabbed
+    "Pick Object": ["body", "head", "camera"],
+}
+# arm-only actions: the camera stays still while they play
+CAMERA_STILL_ACTIONS = {"wave"}
+
+def step_resources(step: dict) -> list:
+    resources = TOOL_RESOURCES.get(step.get("tool"), list(plan_scheduler.RESOURCES))
+    if step.get("tool") == "Propagate Action" and (step.get("params") or {}).get("Action") in CAMERA_STILL_ACTIONS:
+        return ["body"]
+    return resources
+
+# status polls may be retried, actions are sent at most once (robot_rpc)
+def poll_robot(payload: dict):
+    return robot.asend(payload, idempotent=True)
+
+async def navigate_and_pick_object(object_description: str): 
     """navigate to the object and pick the object up"""
-    
+    loop = asyncio.get_running_loop()
+    report = step_progress.get()
+    # set when the request is cancelled: the controller stops before its next step
+    stop = threading.Event()
+
+    def on_step(info):
+        # called from the controller thread
+        if report is not None and not stop.is_set():
+            message = (f"Pick Object step {info['step']}: action {info['action']}, head {info['head']}, "
+                       f"{info['elapsed']} s, features {json.dumps(info['features'])}")
+            asyncio.run_coroutine_threadsafe(report(info["step"], info["max_steps"], message), loop)
+
+    async def pick():
+        async with robot_locks["body"], robot_locks["head"]:
+            if stop.is_set():
+                return []
+            # the blocking pick_object loop runs in a worker thread so the server stays responsive
+            return await asyncio.to_thread(pick_object, object_description, on_step=on_step, stop=stop)
+
+    # a task of its own: a cancelled request returns once the controller thread has finished its
+    # current step and stopped, and the robot stays locked until then
+    task = asyncio.create_task(pick())
     try: 
-        action_list = pick_object(object_description)
+        action_list = await asyncio.shield(task)
         return{
             "status": "success",
             "actions": action_list
         }
 
+    except asyncio.CancelledError:
+        stop.set()
+        # MCP cancels through an anyio cancel scope, which would cancel a plain await again at once
+        with anyio.CancelScope(shield=True), contextlib.suppress(Exception):
+            await task
+        raise
     except Exception as e : 
         return {"status": "error", "error": str(e)}    
 
-def propagate_action(action: str, times: int = 1):
+async def propagate_action(action: str, times: int = 1):
     """Execute predefined robot actions"""
-    url = ROBOT_BASE_URL
-    data = {
-        "jsonrpc": "2.0",
-        "method": "RunAction",
-        "params": [action, times],
-        "id": 1
-    }
+    params = [action, times]
     try: 
-        print(f"Sending to {data} to {url}")
-        response = requests.post(url, json=data, timeout=10)
-        print(f"Robot response status: {response.status_code}")
-        print(f"Robot response text: {response.text}")
-        time.sleep(3)
-        return {"status": "success", "response": response.text}
+        async with robot_locks["body"]:
+            # e.g. stand while standing: nothing to send (robot_state)
+            reason = known_state.redundant_action(action)
+            if reason is not None:
+                known_state.skip()
+                return {"status": "skipped", "reason": reason}
+            print(f"Sending RunAction {params} to {ROBOT_BASE_URL}", file=sys.stderr)
+            sent = time.monotonic()
+            try:
+                result = await robot.acall("RunAction", params)
+            except robot_rpc.RobotUnavailable:
+                raise  # never sent
+            except Exception:
+                known_state.forget_posture()
+                raise
+            known_state.after_action(action)
+            received = time.monotonic()
+            print(f"Robot response: {result}", file=sys.stderr)
+            settle = await action_timer.wait_async(action, times, sent, poll_robot)
+            rpc_timing.record("RunAction", params, sent, received, settle, action_timer.last_wait)
+        return {"status": "success", "response": json.dumps(result)}
     except Exception as e: 
-        print(f"Robot request failed: {e}")
+        print(f"Robot request failed: {e}", file=sys.stderr)
         return {"status": "error", "error": str(e)}
 
-def control_servo(servo_position: int):
+async def control_servo(servo_position: int):
     """Control servo position"""
-    url = ROBOT_BASE_URL
-    data = {
-        "jsonrpc": "2.0",
-        "method": "SetPWMServo",
-        "params": [1000, 2, 1, int(servo_position)],
-        "id": 1
-    }
     try: 
-        response = requests.post(url, json=data)
-        time.sleep(2.5)
-        return {"status": "success", "response": response.text}
+        async with robot_locks["head"]:
+            # shorter moves for short distances, none to where the head already is (robot_state)
+            move_ms = known_state.servo_move_ms(servo_position)
+            if move_ms is None:
+                known_state.skip()
+                return {"status": "skipped", "reason": f"head is already at {servo_position}"}
+            params = [move_ms, 2, 1, int(servo_position)]
+            sent = time.monotonic()
+            try:
+                result = await robot.acall("SetPWMServo", params)
+            except robot_rpc.RobotUnavailable:
+                raise
+            except Exception:
+                known_state.after_servo(None)
+                raise
+            known_state.after_servo(servo_position)
+            received = time.monotonic()
+            await asyncio.sleep(action_timer.remaining(action_timer.servo_seconds(move_ms), sent))
+            rpc_timing.record("SetPWMServo", params, sent, received, time.monotonic() - received, "servo")
+        return {"status": "success", "response": json.dumps(result)}
     except Exception as e: 
         return {"status": "error", "error": str(e)}
 
-def capture_image(request: str, boundary_colors: str = ""):
+async def capture_image(request: str, boundary_colors: str = ""):
     """Capture image"""
     url = VISION_API_URL
     params = {
@@ -75,80 +186,88 @@ def capture_image(request: str, boundary_colors: str = ""):
         "boundaryColors": boundary_colors
     }
     try: 
-        response = requests.post(url, params=params)
-        time.sleep(2.5)
+        response = await vision_client().post(url, params=params)
         return {"status": "success", "response": response.text}
     except Exception as e: 
         return {"status": "error", "error": str(e)}
 
-def summarize_scene():
+def grab_camera_jpeg(camera_url: str = CAMERA_URL):
+    """Blocking camera read, save and jpeg encode; runs in a worker thread"""
+    camera = cv2.VideoCapture(camera_url)
+    image = None
+    for attempt in range(3):    # retry 3 times with timeout
+        success, image = camera.read()
+        if success:
+            break
+        time.sleep(0.5)
+    
+    camera.release()
+    if not success or image is None:
+        return None
+    
+    timestamp = datetime.now().strftime("%Y_%m_%d-%H_%M") # save the image
+    cv2.imwrite(f"robot_view_{timestamp}.jpg", image)
+    #print(f"[VLM] Saved robot view to: robot_view_{timestamp}.jpg")
+    
+    _, buffer = cv2.imencode('.jpg', image)
+    return buffer
+
+async def summarize_scene():
     """VLM integration for scene description"""
     try:
-        print("[VLM] Capturing image from robot camera...")
-        camera_url = "http://lab-erza:8080/"
-        camera = cv2.VideoCapture(camera_url)
-        for attempt in range(3):    # retry 3 times with timeout
-            success, image = camera.read()
-            if success:
-                break
-            time.sleep(0.5)
-        
-        camera.release()
-        if not success or image is None:
+        print("[VLM] Capturing image from robot camera...", file=sys.stderr)
+        buffer = await asyncio.to_thread(grab_camera_jpeg)
+        plan_scheduler.release("camera")  # a plan's next head move or walk doesn't wait for the VLM
+        if buffer is None:
             return {"status": "error", "error": "Failed to capture image from robot's camera"}
         
-        timestamp = datetime.now().strftime("%Y_%m_%d-%H_%M") # save the image
-        cv2.imwrite(f"robot_view_{timestamp}.jpg", image)
-        #print(f"[VLM] Saved robot view to: robot_view_{timestamp}.jpg")
-        
-        _, buffer = cv2.imencode('.jpg', image)
         image_base64 = base64.b64encode(buffer).decode('utf-8')
         
-        OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
-        data = {
-            "model": "qwen3-vl:2b",
-            "prompt": """As a robot looking through my camera, describe what I see in ONE concise sentence.
+        vlm_prompt = """As a robot looking through my camera, describe what I see in ONE concise sentence.
             For each object you identify, you MUST provide:
             1. The color of the object(e.g, red, blue, green, yellow, black, white)
             2. The name/type of the object (e.g, ball, box, cube, cup, container, block, toy, bottle)
             3. Its approximate position (left, center, right, foreground, background). 
             Format your response ONLY in this manner:
-            "I see a [color] [object name] on the [position], a [color] [object name] on the [position], etc." and keep it factual.""",
-            
-            "images": [image_base64],
-            "stream": False
-            # "options": {
-            #     "temperature": 0.1, "num_predict": 100
-            # }
-        }
-        
-        print(f"[VLM] Sending to {data['model']} via Ollama...")
-        response = requests.post(OLLAMA_URL, json=data, timeout=30)
+            "I see a [color] [object name] on the [position], a [color] [object name] on the [position], etc." and keep it factual."""
         
-        if response.status_code == 200:
-            result = response.json()
-            description = result.get("response", "").strip()
-            
-            if description:           # only use the response if it isn't empty
-                print(f"[VLM] Response: {description}")
-                return {"status": "success", "summary": description}
-            else:                     # description if the VLM returns empty
-                print("[VLM] Empty response from VLM")
-                return {"status": "success", "summary": "I'm looking at the scene but don't see any specific objects to describe"}
-        
-        else:
-            error_msg = f"VLM failed: {response.status_code} - {response.text[:200]}"
-            print(f"[VLM] {error_msg}")
+        print(f"[VLM] Sending to {VLM_MODEL_NAME} via Ollama...", file=sys.stderr)
+        try:
+            result = await ollama_client.get_client(OLLAMA_SERVER).generate(
+                VLM_MODEL_NAME,
+                vlm_prompt,
+                images=[image_base64],
+                timeout=30,
+                keep_alive=VLM_KEEP_ALIVE,
+                # options={"temperature": 0.1, "num_predict": 100},
+            )
+        except ollama_client.OllamaError as e:
+            error_msg = f"VLM failed: {e.status_code} - {e.text[:200]}"
+            print(f"[VLM] {error_msg}", file=sys.stderr)
             return {"status": "error", "error": error_msg}
+
+        description = result.get("response", "").strip()
+        print(
+            f"[VLM] prompt_eval_count={result.get('prompt_eval_count', 0)} "
+            f"prompt_eval_ms={result.get('prompt_eval_duration', 0) / 1e6:.1f}",
+            file=sys.stderr,
+        )
+        
+        if description:           # only use the response if it isn't empty
+            print(f"[VLM] Response: {description}", file=sys.stderr)
+            return {"status": "success", "summary": description}
+        else:                     # description if the VLM returns empty
+            print("[VLM] Empty response from VLM", file=sys.stderr)
+            return {"status": "success", "summary": "I'm looking at the scene but don't see any specific objects to describe"}
     
     except json.JSONDecodeError as e:
         error_msg = f"Invalid response from Ollama: {str(e)}"
-        print(f"[VLM] {error_msg}")
+        print(f"[VLM] {error_msg}", file=sys.stderr)
         return {"status": "error", "error": error_msg}
     
     except Exception as e:
         error_msg = f"VLM summarization error: {str(e)}"
-        print(f"[VLM] {error_msg}")
+        print(f"[VLM] {error_msg}", file=sys.stderr)
         return {"status": "error", "error": error_msg}
         
     
@@ -157,6 +276,7 @@ async def list_tools() -> list[Tool]:
     return [
         Tool(
             name="Propagate Action",
+            _meta={"resources": TOOL_RESOURCES["Propagate Action"]},
             description="Execute predefined robot actions",
             inputSchema={
                 "type": "object",
@@ -175,6 +295,10 @@ async def list_tools() -> list[Tool]:
                             "stand_up_front", "put_down", "wave", "wing_chun", "catch_ball", "catch_ball_up",
                             "catch_ball_go", "catch_ball_left_move", "catch_ball_right_move", "move_up"
                         ]
+                    },
+                    "Times": {
+                        "type": "integer", "minimum": 1, "maximum": MAX_ACTION_TIMES,
+                        "description": "repeat the action this many times, default 1"
                     }
                 },
                 "required": ["Action"]
@@ -182,6 +306,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="Control Servo",
+            _meta={"resources": TOOL_RESOURCES["Control Servo"]},
             description="Control servo position (1000-2000, default 1500 for straight ahead)",
             inputSchema={
                 "type": "object",
@@ -193,6 +318,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="Capture Image",
+            _meta={"resources": TOOL_RESOURCES["Capture Image"]},
             description="Capture image for visual analysis with object detection",
             inputSchema={
                 "type": "object",
@@ -205,8 +331,9 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="Summarize Scene",
+            _meta={"resources": TOOL_RESOURCES["Summarize Scene"]},
             description=(
-                "Call the vision system and get a short natural-language description of what the robot's camera currently sees."
+                "Call the vision system and get a short natural-language description of what the robot's camera currently sees. "
                 "Use this before planning complex tasks that depend on the scene"
             ),
             inputSchema={
@@ -218,6 +345,7 @@ async def list_tools() -> list[Tool]:
         # RL add 
         Tool(
             name="Pick Object",
+            _meta={"resources": TOOL_RESOURCES["Pick Object"]},
             description=(
                 "call the robot action controller to navigate to the object and pick it up"
             ),
@@ -228,71 +356,197 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["object_description"]
             }
+        ),
+        # executor tool for the client, not for the planner (see tool_catalog.EXECUTOR_TOOLS)
+        Tool(
+            name="Execute Plan",
+            description=(
+                "Run a validated list of the tools above in the server, reporting progress per step; "
+                "no step starts after the first failing one, completed_indices lists the steps that ran"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "Plan": {
+                        "type": "array",
+                        "minItems": 1,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "step": {"type": "integer"},
+                                "tool": {"type": "string"},
+                                "params": {"type": "object"}
+                            },
+                            "required": ["tool"]
+                        }
+                    }
+                },
+                "required": ["Plan"]
+            }
         )
     ]
 
-@mcp.call_tool()
-async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
-    try:
-        if name == "Propagate Action":
-            action = arguments.get("Action")
-            result = propagate_action(action)
-            if result["status"] == "success":
-                return [TextContent(type="text", text=f"Action '{action}' executed successfully")]
-            else:
-                return [TextContent(type="text", text=f"Action failed: {result['error']}")]
-        
-        elif name == "Control Servo":
-            servo_position = arguments.get("Servo Position")
-            result = control_servo(servo_position)
-            if result["status"] == "success":
-                return [TextContent(type="text", text=f"Servo set to position {servo_position} successfully")]
-            else:
-                return [TextContent(type="text", text=f"Servo control failed: {result['error']}")]
-        
-        elif name == "Capture Image":
-            request = arguments.get("Request")
-            boundary_colors = arguments.get("BoundaryColors", "")
-            result = capture_image(request, boundary_colors)
-            if result["status"] == "success":
-                return [TextContent(type="text", text=f"Image captured and processed for: {request}")]
-            else:
-                return [TextContent(type="text", text=f"Image capture failed: {result['error']}")]
-        
-        elif name == "Summarize Scene":
-            result = summarize_scene()
-            if result["status"] == "success":
-                summary = result.get("summary", "")
-                return [TextContent(
-                    type="text",
-                    text=f"Scene summary: {summary}"
-                )]
-            else:
-                return [TextContent(
-                    type="text",
-                    text=f"Scene summarization failed: {result['error']}"
-                )]
-                
-        elif name == "Pick Object":
-            object_description = arguments.get("object_description")
-            result = navigate_and_pick_object(object_description)
-            if result["status"] == "success":
-                return [TextContent(type="text", text=f"navigated upto {object_description} using the sequence {result['actions']}")]
-            else:
-                return [TextContent(type="text", text=f"Image capture failed: {result['error']}")]
+async def run_tool(name: str, arguments: Any) -> tuple[bool, str]:
+    """Run one robot tool; (succeeded, result text for the planner)"""
+    if name == "Propagate Action":
+        action = arguments.get("Action")
+        times = int(arguments.get("Times", 1))
+        result = await propagate_action(action, times)
+        if result["status"] == "skipped":
+            return True, f"Action '{action}' skipped: {result['reason']}"
+        if result["status"] == "success":
+            repeated = f" {times} times" if times > 1 else ""
+            return True, f"Action '{action}' executed{repeated} successfully"
+        else:
+            return False, f"Action failed: {result['error']}"
+    
+    elif name == "Control Servo":
+        servo_position = arguments.get("Servo Position")
+        result = await control_servo(servo_position)
+        if result["status"] == "skipped":
+            return True, f"Servo move skipped: {result['reason']}"
+        if result["status"] == "success":
+            return True, f"Servo set to position {servo_position} successfully"
+        else:
+            return False, f"Servo control failed: {result['error']}"
+    
+    elif name == "Capture Image":
+        request = arguments.get("Request")
+        boundary_colors = arguments.get("BoundaryColors", "")
+        result = await capture_image(request, boundary_colors)
+        if result["status"] == "success":
+            return True, f"Image captured and processed for: {request}"
+        else:
+            return False, f"Image capture failed: {result['error']}"
+    
+    elif name == "Summarize Scene":
+        result = await summarize_scene()
+        if result["status"] == "success":
+            summary = result.get("summary", "")
+            return True, f"Scene summary: {summary}"
+        else:
+            return False, f"Scene summarization failed: {result['error']}"
+            
+    elif name == "Pick Object":
+        object_description = arguments.get("object_description")
+        result = await navigate_and_pick_object(object_description)
+        if result["status"] == "success":
+            return True, f"navigated upto {object_description} using the sequence {result['actions']}"
+        else:
+            return False, f"Image capture failed: {result['error']}"
+
+    else:
+        return False, f"Unknown tool: {name}"
 
+async def execute_plan(plan: list):
+    """
+    Run a step list in the server, steps that don't share a resource
+    concurrently, with a progress notification per finished step; no step
+    starts after the first failure. Steps run out of plan order, so
+    ``completed_indices`` (not a prefix of the plan) says which ones ran.
+    """
+    tools = {tool.name: tool for tool in await list_tools() if tool.name != "Execute Plan"}
+    # check every step before the robot moves at all
+    for index, step in enumerate(plan):
+        tool = tools.get(step.get("tool"))
+        params = step.get("params") or {}
+        error = None
+        if tool is None:
+            error = f"Unknown tool: {step.get('tool')}"
         else:
-            return [TextContent(type="text", text=f"Unknown tool: {name}")]
+            try:
+                jsonschema.validate(instance=params, schema=tool.inputSchema)
+            except jsonschema.ValidationError as e:
+                error = f"Input validation error: {e.message}"
+        if error is not None:
+            return {"status": "error", "completed": 0, "completed_indices": [], "steps": [],
+                    "error": {"index": index, "step": step.get("step", index + 1), "tool": step.get("tool"), "message": error}}
+
+    context = mcp.request_context
+    progress_token = context.meta.progressToken if context.meta else None
+    done = 0
+
+    async def send_progress(progress, message):
+        if progress_token is not None:
+            await context.session.send_progress_notification(
+                progress_token, progress, len(plan), message, related_request_id=context.request_id,
+            )
+
+    async def report(step, total, message):
+        # a fraction of the step it belongs to, so progress keeps increasing
+        await send_progress(done + step / (total + 1), message)
+
+    step_progress.set(report)
+
+    async def run_step(step):
+        return await run_tool(step["tool"], step.get("params") or {})
+
+    async def on_done(record):
+        nonlocal done
+        done += 1
+        await send_progress(done, f"Step {record['step']}: {record['result']}")
+
+    # steps that don't share a resource run concurrently (plan_scheduler)
+    steps = await plan_scheduler.run_plan(plan, step_resources, run_step, on_done)
+    completed = plan_scheduler.completed(steps)
+    failed = [s for s in steps if s["started"] is not None and not s["ok"]]
+    if failed:
+        error = failed[0]
+        return {"status": "error", "completed": len(completed), "completed_indices": completed, "steps": steps,
+                "error": {"index": error["index"], "step": error["step"], "tool": error["tool"], "message": error["result"]}}
+    return {"status": "success", "completed": len(completed), "completed_indices": completed, "steps": steps}
+
+async def refresh_state():
+    """Overwrite the tracked state with the robot's own report, where the firmware has one."""
+    if robot_state.STATE_STATUS_METHOD is None:
+        return
+    try:
+        known_state.update_from_status(await robot.acall(robot_state.STATE_STATUS_METHOD, idempotent=True))
+    except Exception as e:
+        print(f"Robot state refresh failed: {e}", file=sys.stderr)
+
+@mcp.list_resources()
+async def list_resources() -> list[Resource]:
+    return [
+        Resource(
+            uri=robot_state.STATE_URI,
+            name="Robot state",
+            description="Head servo position, posture and whether the robot holds an object (null: unknown)",
+            mimeType="application/json"
+        )
+    ]
+
+@mcp.read_resource()
+async def read_resource(uri) -> list[ReadResourceContents]:
+    if str(uri) != robot_state.STATE_URI:
+        raise ValueError(f"Unknown resource: {uri}")
+    await refresh_state()
+    return [ReadResourceContents(content=json.dumps(known_state.snapshot()), mime_type="application/json")]
+
+@mcp.call_tool()
+async def call_tool(name: str, arguments: Any) -> Sequence[TextContent] | tuple[Sequence[TextContent], dict]:
+    try:
+        context = mcp.request_context
+        if context.meta and context.meta.progressToken is not None:
+            async def report(step, total, message):
+                await context.session.send_progress_notification(
+                    context.meta.progressToken, step, total, message, related_request_id=context.request_id,
+                )
+            step_progress.set(report)
+        if name == "Execute Plan":
+            result = await execute_plan(arguments.get("Plan", []))
+            lines = [f"Step {s['step']}: {s['tool']} -> {s['result']}" for s in result["steps"]]
+            if result["status"] == "error":
+                lines.append(f"Plan failed at step {result['error']['step']}: {result['error']['message']}")
+            return [TextContent(type="text", text="\n".join(lines))], result
+        _, text = await run_tool(name, arguments)
+        return [TextContent(type="text", text=text)]
     
     except Exception as e:
-        print(f"DEBUG: Call_tool error: {e}")
+        print(f"DEBUG: Call_tool error: {e}", file=sys.stderr)
         return [TextContent(type="text", text=f"Tool execution error: {str(e)}")]
 
-async def main():
-    print("Robot MCP Server Starting...")
-    print(f"Robot URL: {ROBOT_BASE_URL}")
-    print(f"Vision API URL: {VISION_API_URL}")
-    
+async def serve_stdio():
     async with stdio_server() as (read_stream, write_stream):
         await mcp.run(
             read_stream,
@@ -300,5 +554,85 @@ async def main():
             mcp.create_initialization_options()
         )
 
+async def serve_http(host: str, port: int):
+    """
+    Streamable HTTP transport: the server stays warm, and every client
+    session (one per connecting client) shares its robot, vision and Ollama
+    connections and the robot locks.
+    """
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+    session_manager = StreamableHTTPSessionManager(app=mcp)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with session_manager.run():
+            yield
+
+    app = Starlette(routes=[Mount("/mcp", app=session_manager.handle_request)], lifespan=lifespan)
+    print(f"Serving MCP over streamable HTTP at http://{host}:{port}/mcp", file=sys.stderr)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    await server.serve()
+
+@contextlib.asynccontextmanager
+async def serve_in_process():
+    """
+    In-process transport: the server runs as a task in the caller's event
+    loop and exchanges the same MCP messages with the client over memory
+    streams, without JSON encoding, pipes or a second process. Yields the
+    client's (read_stream, write_stream).
+
+        async with serve_in_process() as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session: ...
+    """
+    from mcp.shared.memory import create_client_server_memory_streams
+
+    try:
+        async with create_client_server_memory_streams() as (client_streams, (read_stream, write_stream)):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(lambda: mcp.run(read_stream, write_stream, mcp.create_initialization_options()))
+                try:
+                    yield client_streams
+                finally:
+                    tg.cancel_scope.cancel()
+    finally:
+        await close_connections()
+
+async def close_connections():
+    """Close the pooled connections; the clients reopen on next use, so the server can be served again."""
+    # stderr: stdout carries the MCP protocol
+    print(f"Ollama connection stats: {ollama_client.all_stats()}", file=sys.stderr)
+    print(f"Robot rpc stats: {robot_rpc.all_stats()}", file=sys.stderr)
+    await ollama_client.aclose_all()
+    await robot_rpc.aclose_all()
+    await http_client.aclose()
+
+async def main():
+    parser = argparse.ArgumentParser(description="robot control MCP server")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio",
+                        help="stdio: spawned by one client; http: long-running, for many clients")
+    parser.add_argument("--host", default=HTTP_HOST)
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    args = parser.parse_args()
+
+    # all logging on stderr: with stdio, stdout carries the MCP protocol
+    print("Robot MCP Server Starting...", file=sys.stderr)
+    print(f"Robot URL: {ROBOT_BASE_URL}", file=sys.stderr)
+    print(f"Vision API URL: {VISION_API_URL}", file=sys.stderr)
+    warning = action_timer.uncalibrated_warning()
+    if warning:
+        print(f"WARNING: {warning}", file=sys.stderr)
+    
+    try:
+        if args.transport == "http":
+            await serve_http(args.host, args.port)
+        else:
+            await serve_stdio()
+    finally:
+        await close_connections()
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
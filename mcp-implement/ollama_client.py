@@ -0,0 +1,152 @@
+"""
+Shared async client for the Ollama HTTP API.
+
+One pooled ``httpx.AsyncClient`` per Ollama server keeps connections alive
+across planner, analysis and VLM calls instead of opening a new TCP
+connection per ``requests.post``, and never blocks the event loop while a
+model is generating.
+
+    client = get_client("http://127.0.0.1:11434")
+    result = await client.chat(model, messages, format="json", timeout=30)
+    async for chunk in client.chat_stream(model, messages):
+        ...
+    print(client.stats())
+"""
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+DEFAULT_TIMEOUT = 30
+CONNECT_TIMEOUT = 5
+MAX_CONNECTIONS = 8
+KEEPALIVE_EXPIRY = 300  # seconds an idle connection stays in the pool
+
+
+class OllamaError(Exception):
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Ollama returned {status_code}: {text[:200]}")
+        self.status_code = status_code
+        self.text = text
+
+
+class OllamaClient:
+    def __init__(self, base_url: str, max_connections: int = MAX_CONNECTIONS,
+                 keepalive_expiry: float = KEEPALIVE_EXPIRY, timeout: float = DEFAULT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.metrics = {
+            "requests": 0,
+            "errors": 0,
+            "connections_opened": 0,
+            "request_seconds": 0.0,
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # (re)opened on first use: aclose() leaves the OllamaClient usable
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits,
+                                             timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT))
+        return self._client
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        # httpcore reports a tcp connect only when the pool has no idle connection to reuse
+        if event_name == "connection.connect_tcp.complete":
+            self.metrics["connections_opened"] += 1
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(timeout if timeout is not None else self.timeout, connect=CONNECT_TIMEOUT)
+
+    async def post(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Non-streaming request; returns the decoded json body."""
+        payload = dict(payload, stream=False)
+        self.metrics["requests"] += 1
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(
+                path, json=payload, timeout=self._timeout(timeout), extensions={"trace": self._trace}
+            )
+            if response.status_code != 200:
+                raise OllamaError(response.status_code, response.text)
+            return response.json()
+        except Exception:
+            self.metrics["errors"] += 1
+            raise
+        finally:
+            self.metrics["request_seconds"] += time.perf_counter() - start
+
+    async def stream(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming request; yields each json line Ollama sends until ``done``."""
+        payload = dict(payload, stream=True)
+        self.metrics["requests"] += 1
+        start = time.perf_counter()
+        try:
+            async with self.client.stream(
+                "POST", path, json=payload, timeout=self._timeout(timeout), extensions={"trace": self._trace}
+            ) as response:
+                if response.status_code != 200:
+                    text = (await response.aread()).decode("utf-8", "replace")
+                    raise OllamaError(response.status_code, text)
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+        except Exception:
+            self.metrics["errors"] += 1
+            raise
+        finally:
+            self.metrics["request_seconds"] += time.perf_counter() - start
+
+    async def chat(self, model: str, messages: List[Dict[str, Any]], timeout: Optional[float] = None, **options) -> Dict[str, Any]:
+        return await self.post("/api/chat", {"model": model, "messages": messages, **options}, timeout)
+
+    def chat_stream(self, model: str, messages: List[Dict[str, Any]], timeout: Optional[float] = None, **options) -> AsyncIterator[Dict[str, Any]]:
+        return self.stream("/api/chat", {"model": model, "messages": messages, **options}, timeout)
+
+    async def generate(self, model: str, prompt: str, timeout: Optional[float] = None, **options) -> Dict[str, Any]:
+        return await self.post("/api/generate", {"model": model, "prompt": prompt, **options}, timeout)
+
+    def generate_stream(self, model: str, prompt: str, timeout: Optional[float] = None, **options) -> AsyncIterator[Dict[str, Any]]:
+        return self.stream("/api/generate", {"model": model, "prompt": prompt, **options}, timeout)
+
+    async def embed(self, model: str, texts: List[str], timeout: Optional[float] = None, **options) -> Dict[str, Any]:
+        return await self.post("/api/embed", {"model": model, "input": texts, **options}, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.metrics)
+        stats["connections_reused"] = max(0, stats["requests"] - stats["connections_opened"])
+        stats["request_seconds"] = round(stats["request_seconds"], 3)
+        return stats
+
+    async def aclose(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+
+_clients: Dict[str, OllamaClient] = {}
+
+
+def get_client(base_url: str) -> OllamaClient:
+    """The shared client for an Ollama server (created on first use)."""
+    base_url = base_url.rstrip("/")
+    if base_url not in _clients:
+        _clients[base_url] = OllamaClient(base_url)
+    return _clients[base_url]
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    return {url: client.stats() for url, client in _clients.items()}
+
+
+async def aclose_all():
+    """Close the pooled connections; the clients stay registered and reconnect on next use."""
+    for client in list(_clients.values()):
+        await client.aclose()
@@ -0,0 +1,119 @@
+"""
+Persistent cache of validated plans for repeated commands.
+
+Plans are keyed by the normalized user input, the planner model and a hash of
+the system prompt, so changing either the model or the prompt never serves a
+stale plan. Only plans that pass ``validate_plan`` are stored. Entries live in
+a local SQLite file and are evicted least-recently-used once the entry or
+byte limit is reached.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from test_tools import ALLOWED_TOOLS, validate_plan
+
+DEFAULT_PATH = "plan_cache.sqlite"
+MAX_ENTRIES = 1000
+MAX_BYTES = 16 * 1024 * 1024
+
+
+def normalize_command(text: str) -> str:
+    """'  Move LEFT twice! ' -> 'move left twice'"""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def prompt_hash(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class PlanCache:
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS plans (
+                key TEXT PRIMARY KEY,
+                command TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                plan_json TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def key(user_input: str, model: str, system_prompt: str) -> str:
+        raw = "\x1f".join([normalize_command(user_input), model, prompt_hash(system_prompt)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, user_input: str, model: str, system_prompt: str) -> Optional[Dict[str, Any]]:
+        key = self.key(user_input, model, system_prompt)
+        row = self.db.execute("SELECT plan_json FROM plans WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute("UPDATE plans SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return json.loads(row[0])
+
+    def put(self, user_input: str, model: str, system_prompt: str, plan_data: Dict[str, Any], allowed_actions: List[str],
+            allowed_tools: Dict[str, Dict[str, List[str]]] = ALLOWED_TOOLS) -> bool:
+        """Store plan_data if it is a compliant plan for these tools and actions; returns whether it was stored."""
+        if not isinstance(plan_data, dict) or not validate_plan(plan_data, allowed_actions, allowed_tools)["plan_compliant"]:
+            return False
+        plan_json = json.dumps({"response": plan_data.get("response", ""), "plan": plan_data["plan"]})
+        now = time.time()
+        self.db.execute(
+            """INSERT OR REPLACE INTO plans (key, command, model, prompt_hash, plan_json, size, created, last_used, hits)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+            (self.key(user_input, model, system_prompt), normalize_command(user_input), model,
+             prompt_hash(system_prompt), plan_json, len(plan_json), now, now),
+        )
+        self.evict()
+        self.db.commit()
+        return True
+
+    def evict(self):
+        """Drop least recently used entries until both limits hold."""
+        count, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        for key, entry_size in self.db.execute("SELECT key, size FROM plans ORDER BY last_used").fetchall():
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM plans WHERE key = ?", (key,))
+            count -= 1
+            size -= entry_size
+
+    def invalidate(self, user_input: str, model: str, system_prompt: str):
+        self.db.execute("DELETE FROM plans WHERE key = ?", (self.key(user_input, model, system_prompt),))
+        self.db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        count, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": count,
+            "bytes": size,
+        }
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,277 @@
+"""
+Semantic plan memory: reuse a validated plan for a paraphrased command.
+
+Each validated plan is stored with an embedding of its command template (the
+normalized command with repetition counts removed) in a memory-mapped NumPy
+matrix next to a JSONL file of entries. A new command whose template is
+similar enough to a stored one reuses that plan, re-tiled to the new
+repetition count, without calling the planner:
+
+    "move forward 2 steps"  ->  stored unit [go_forward_one_step] x 2
+    "walk forward three steps"  ->  [go_forward_one_step] x 3
+
+Plans that give the count as ``Times`` are expanded to one step per
+repetition first and merged again afterwards (plan_optimizer):
+
+    "walk left twice"  ->  stored [left_move {"Times": 2}]
+    "go left three times"  ->  [left_move {"Times": 3}]
+
+Matches are also guarded on direction words, on words the stored command
+never mentioned, and on the string parameters of the stored plan (e.g. the
+object description), so "move left" never reuses "move right" and "grab the
+cup" never reuses "grab the pen".
+"""
+import json
+import os
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import ollama_client
+from plan_optimizer import ACTION_TOOL, merge_repeated_actions
+from plan_cache import normalize_command, prompt_hash
+from test_tools import ALLOWED_TOOLS, validate_plan
+
+DEFAULT_DIR = "plan_memory"
+EMBED_MODEL = "nomic-embed-text"
+SIMILARITY_THRESHOLD = 0.85
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+                "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+COUNT_RE = re.compile(
+    r"\b(?:(twice)|(thrice)|(once)|(\d+|" + "|".join(NUMBER_WORDS) + r")\s*(?:times?|steps?))\b"
+)
+DIRECTION_WORDS = {"left": "left", "right": "right", "forward": "forward", "forwards": "forward",
+                   "back": "back", "backward": "back", "backwards": "back", "up": "up", "down": "down"}
+# words a paraphrase may add without changing the plan; any other new word
+# (an object, another action) must already be in the stored command
+FILLER_WORDS = {
+    "a", "an", "the", "and", "then", "after", "that", "it", "please", "robot", "you", "can",
+    "move", "go", "walk", "step", "steps", "take", "do", "make", "grab", "pick", "fetch", "get",
+    "bring", "me", "one", "to", "your", "now",
+}
+
+
+def parse_counts(command: str) -> Tuple[str, List[int]]:
+    """Split a normalized command into (template without counts, repetition counts)."""
+    counts = []
+
+    def repl(m):
+        if m.group(1):
+            counts.append(2)
+        elif m.group(2):
+            counts.append(3)
+        elif m.group(3):
+            counts.append(1)
+        else:
+            n = m.group(4)
+            counts.append(int(n) if n.isdigit() else NUMBER_WORDS[n])
+        return " "
+
+    template = " ".join(COUNT_RE.sub(repl, command).split())
+    return template, counts
+
+
+def _expand(plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """plan with every action step that has ``Times`` repeated as that many single steps."""
+    expanded = []
+    for step in plan:
+        params = step.get("params") or {}
+        times = params.get("Times")
+        if step.get("tool") == ACTION_TOOL and isinstance(times, int) and not isinstance(times, bool) and times > 1:
+            single = {k: v for k, v in params.items() if k != "Times"}
+            expanded.extend(dict(step, params=dict(single)) for _ in range(times))
+        else:
+            expanded.append(step)
+    return expanded
+
+
+def _uses_times(plan: List[Dict[str, Any]]) -> bool:
+    return any("Times" in (step.get("params") or {}) for step in plan)
+
+
+def _unit_plan(plan: List[Dict[str, Any]], count: int) -> Optional[List[Dict[str, Any]]]:
+    """The block that repeated count times gives plan, or None if plan is not periodic."""
+    if count <= 1:
+        return plan
+    if len(plan) % count:
+        return None
+    size = len(plan) // count
+    block = [(s.get("tool"), s.get("params", {})) for s in plan[:size]]
+    for k in range(1, count):
+        if [(s.get("tool"), s.get("params", {})) for s in plan[k * size:(k + 1) * size]] != block:
+            return None
+    return plan[:size]
+
+
+def _string_params(plan: List[Dict[str, Any]]) -> List[str]:
+    values = []
+    for step in plan:
+        for key, value in (step.get("params") or {}).items():
+            if isinstance(value, str) and key != "Action":
+                values.append(value)
+    return values
+
+
+def _directions(words) -> set:
+    return {DIRECTION_WORDS[w] for w in words if w in DIRECTION_WORDS}
+
+
+class HashingEmbedder:
+    """Local embedding with no model: hashed word and character-trigram counts."""
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f" {text} "
+            features = text.split() + [padded[i:i + 3] for i in range(len(padded) - 2)]
+            for f in features:
+                out[row, zlib.crc32(f.encode("utf-8")) % self.dim] += 1.0
+        return out
+
+
+class OllamaEmbedder:
+    """Embeddings from Ollama's /api/embed endpoint."""
+    def __init__(self, base_url: str, model: str = EMBED_MODEL):
+        self.base_url = base_url
+        self.model = model
+        self.name = model.replace(":", "_").replace("/", "_")
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        result = await ollama_client.get_client(self.base_url).embed(self.model, texts, timeout=10)
+        return np.asarray(result["embeddings"], dtype=np.float32)
+
+
+class PlanMemory:
+    def __init__(self, embedder, directory: str = DEFAULT_DIR, threshold: float = SIMILARITY_THRESHOLD):
+        self.embedder = embedder
+        self.threshold = threshold
+        # one index per embedder: vectors of different models are not comparable
+        self.directory = os.path.join(directory, embedder.name)
+        self.vectors_path = os.path.join(self.directory, "vectors.npy")
+        self.entries_path = os.path.join(self.directory, "entries.jsonl")
+        self.entries: List[Dict[str, Any]] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.entries_path) and os.path.exists(self.vectors_path):
+            with open(self.entries_path, "r", encoding="utf-8") as f:
+                self.entries = [json.loads(line) for line in f if line.strip()]
+            self.vectors = np.load(self.vectors_path, mmap_mode="r")
+            # entries written after the last vectors save are dropped
+            self.entries = self.entries[:len(self.vectors)]
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = await self.embedder.embed(texts)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+    def _adjust(self, entry: Dict[str, Any], counts: List[int]) -> Optional[List[Dict[str, Any]]]:
+        """The stored plan re-tiled for the new repetition counts (None if it can't be)."""
+        if counts == entry["counts"]:
+            return entry["plan"]
+        if len(counts) > 1 or len(entry["counts"]) > 1:
+            return None
+        stored = entry["plan"]
+        unit = _unit_plan(_expand(stored), entry["counts"][0]) if entry["counts"] else stored
+        if unit is None:
+            return None
+        plan = unit * (counts[0] if counts else 1)
+        if _uses_times(stored):
+            plan = [{"tool": s["tool"], "params": s["params"]} for s in merge_repeated_actions(plan)]
+        return plan
+
+    def _guard(self, entry: Dict[str, Any], template: str) -> bool:
+        words = set(template.split())
+        stored = set(entry["template"].split())
+        if _directions(words) != _directions(stored):
+            return False
+        if not words - DIRECTION_WORDS.keys() - FILLER_WORDS <= stored:
+            return False
+        return all(set(normalize_command(v).split()) <= words for v in _string_params(entry["plan"]))
+
+    async def lookup(self, user_input: str, system_prompt: str) -> Optional[Dict[str, Any]]:
+        """A reusable plan for user_input, or None. Adds ``similarity`` and ``matched_command``."""
+        start = time.perf_counter()
+        try:
+            if not self.entries:
+                self.misses += 1
+                return None
+            command = normalize_command(user_input)
+            template, counts = parse_counts(command)
+            query = (await self._embed([template]))[0]
+            similarity = np.asarray(self.vectors) @ query
+            p_hash = prompt_hash(system_prompt)
+            for index in np.argsort(similarity)[::-1]:
+                if similarity[index] < self.threshold:
+                    break
+                entry = self.entries[index]
+                if entry["prompt_hash"] != p_hash or not self._guard(entry, template):
+                    continue
+                plan = self._adjust(entry, counts)
+                if plan is None:
+                    continue
+                self.hits += 1
+                steps = [dict(step, step=i + 1) for i, step in enumerate(plan)]
+                return {
+                    "response": entry["response"],
+                    "plan": steps,
+                    "similarity": round(float(similarity[index]), 4),
+                    "matched_command": entry["command"],
+                }
+            self.misses += 1
+            return None
+        finally:
+            self.lookup_seconds += time.perf_counter() - start
+
+    async def add(self, user_input: str, plan_data: Dict[str, Any], system_prompt: str, allowed_actions: List[str],
+                  allowed_tools: Dict[str, Dict[str, List[str]]] = ALLOWED_TOOLS) -> bool:
+        """Remember a plan validated against these tools and actions; returns whether it was stored."""
+        if not isinstance(plan_data, dict) or not validate_plan(plan_data, allowed_actions, allowed_tools)["plan_compliant"]:
+            return False
+        command = normalize_command(user_input)
+        template, counts = parse_counts(command)
+        if any(e["command"] == command and e["prompt_hash"] == prompt_hash(system_prompt) for e in self.entries):
+            return False
+
+        plan = [{"tool": s["tool"], "params": s.get("params", {})} for s in plan_data["plan"]]
+        entry = {
+            "command": command,
+            "template": template,
+            "counts": counts,
+            "plan": plan,
+            "response": plan_data.get("response", ""),
+            "prompt_hash": prompt_hash(system_prompt),
+        }
+        vector = await self._embed([template])
+
+        os.makedirs(self.directory, exist_ok=True)
+        vectors = vector if self.vectors is None else np.vstack([np.asarray(self.vectors), vector])
+        tmp_path = self.vectors_path + ".tmp.npy"
+        np.save(tmp_path, vectors.astype(np.float32))
+        os.replace(tmp_path, self.vectors_path)
+        with open(self.entries_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.entries.append(entry)
+        self.vectors = np.load(self.vectors_path, mmap_mode="r")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "avg_lookup_ms": round(self.lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+        }
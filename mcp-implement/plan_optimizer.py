@@ -0,0 +1,79 @@
+"""
+Plan optimizer pass: merge repeated actions into one call.
+
+The planner spells out "wave three times" as three identical Propagate
+Action steps. The robot's ``RunAction`` takes a repetition count, so
+consecutive identical action steps are merged into one step with
+``Times`` (split again at ``MAX_ACTION_TIMES``): one MCP call, one RPC and
+one wait for the whole repetition instead of three.
+
+    merge_repeated_actions([wave, wave, wave, bow])
+    -> [{"step": 1, "tool": "Propagate Action", "params": {"Action": "wave", "Times": 3}}, bow]
+"""
+from typing import Any, Dict, List
+
+from test_tools import MAX_ACTION_TIMES
+
+ACTION_TOOL = "Propagate Action"
+
+
+def _times(step: Dict[str, Any]) -> int:
+    return step["params"].get("Times", 1)
+
+
+def _mergeable(step: Dict[str, Any]) -> bool:
+    """An action step with nothing but a valid Action and Times."""
+    params = step.get("params")
+    if step.get("tool") != ACTION_TOOL or not isinstance(params, dict) or set(params) - {"Action", "Times"}:
+        return False
+    if not isinstance(params.get("Action"), str):
+        return False  # left for validation and repair
+    times = params.get("Times", 1)
+    return isinstance(times, int) and not isinstance(times, bool) and 1 <= times <= MAX_ACTION_TIMES
+
+
+def merge_repeated_actions(plan: List[Dict[str, Any]], first_step: int = 1,
+                           max_times: int = MAX_ACTION_TIMES) -> List[Dict[str, Any]]:
+    """
+    A copy of ``plan`` with runs of identical action steps merged and the
+    steps renumbered from ``first_step``. Other steps are kept as they are.
+    """
+    merged: List[Dict[str, Any]] = []
+    for step in plan:
+        previous = merged[-1] if merged else None
+        if (previous is not None and _mergeable(step) and _mergeable(previous)
+                and previous["params"]["Action"] == step["params"]["Action"]):
+            total = _times(previous) + _times(step)
+            previous["params"]["Times"] = min(total, max_times)
+            if total <= max_times:
+                continue
+            step = dict(step, params={"Action": step["params"]["Action"], "Times": total - max_times})
+        merged.append(dict(step, params=dict(step["params"])) if isinstance(step.get("params"), dict) else dict(step))
+    for i, step in enumerate(merged):
+        step["step"] = first_step + i
+        if _mergeable(step) and step["params"].get("Times") == 1:
+            del step["params"]["Times"]
+    return merged
+
+
+def absorb_repeats(plan: List[Dict[str, Any]], i: int, exclude=(), max_times: int = MAX_ACTION_TIMES) -> int:
+    """
+    Merge the identical action steps right after ``plan[i]`` into it, in
+    place, for steps that arrive one by one (streamed plans, replans).
+    Indices in ``exclude`` (steps still to be repaired) are never absorbed.
+    Returns the number of steps removed.
+    """
+    step = plan[i]
+    if not _mergeable(step):
+        return 0
+    action, times = step["params"]["Action"], _times(step)
+    j = i + 1
+    while (j < len(plan) and j not in exclude and _mergeable(plan[j]) and plan[j]["params"]["Action"] == action
+           and times + _times(plan[j]) <= max_times):
+        times += _times(plan[j])
+        j += 1
+    if j == i + 1:
+        return 0
+    plan[i] = dict(step, params={"Action": action, "Times": times})
+    del plan[i + 1:j]
+    return j - i - 1
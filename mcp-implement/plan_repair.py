@@ -0,0 +1,267 @@
+"""
+Client-side repair of invalid plan steps before they are dispatched.
+
+A step that fails ``validate_step`` is mapped to the nearest valid step:
+known synonyms first ("Catch Ball" -> Propagate Action/catch_ball,
+"move_forward" -> go_forward), then the closest tool, param and action
+names by edit distance, compared word by word ("righth_move_30" ->
+right_move_30). A name is never repaired to one with other numbers or
+counts in it (left_move_40 is not left_move_10), nor when the runner-up is
+almost as close. Servo positions and repetition counts (``Times``, also
+given as "steps" / "count") are coerced to int and clamped to the valid
+range. Each repair comes with a confidence, and the caller only falls back
+to an LLM replan when it is below ``REPAIR_CONFIDENCE``; dropping a param
+or repetitions always does.
+
+    step, confidence, notes = repair_step(step, allowed_actions, allowed_tools)
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from test_tools import ALLOWED_TOOLS, MAX_ACTION_TIMES, validate_step
+
+REPAIR_CONFIDENCE = 0.75
+# the best match must be this much closer than the runner-up
+REPAIR_MARGIN = 0.1
+# confidence of a repair that loses information the plan asked for
+LOSSY_CONFIDENCE = 0.5
+SERVO_MIN, SERVO_MAX = 1000, 2000
+LOOK_UP_POSITION, LOOK_DOWN_POSITION = 1800, 1200
+
+ACTION_TOOL = "Propagate Action"
+SERVO_TOOL = "Control Servo"
+
+# tool names small models invent -> (tool, params)
+TOOL_SYNONYMS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "catch ball": (ACTION_TOOL, {"Action": "catch_ball"}),
+    "pick up": (ACTION_TOOL, {"Action": "catch_ball"}),
+    "grab": (ACTION_TOOL, {"Action": "catch_ball"}),
+    "put down": (ACTION_TOOL, {"Action": "put_down"}),
+    "move forward": (ACTION_TOOL, {"Action": "go_forward"}),
+    "walk forward": (ACTION_TOOL, {"Action": "go_forward"}),
+    "go forward": (ACTION_TOOL, {"Action": "go_forward"}),
+    "move backward": (ACTION_TOOL, {"Action": "back"}),
+    "move back": (ACTION_TOOL, {"Action": "back"}),
+    "move left": (ACTION_TOOL, {"Action": "left_move"}),
+    "turn left": (ACTION_TOOL, {"Action": "left_move"}),
+    "move right": (ACTION_TOOL, {"Action": "right_move"}),
+    "turn right": (ACTION_TOOL, {"Action": "right_move"}),
+    "wave": (ACTION_TOOL, {"Action": "wave"}),
+    "look up": (SERVO_TOOL, {"Servo Position": LOOK_UP_POSITION}),
+    "look down": (SERVO_TOOL, {"Servo Position": LOOK_DOWN_POSITION}),
+    "describe scene": ("Summarize Scene", {}),
+    "scene summary": ("Summarize Scene", {}),
+    "capture scene": ("Summarize Scene", {}),
+    "navigate to object": ("Pick Object", None),
+    "pick up object": ("Pick Object", None),
+    "catch object": ("Pick Object", None),
+    "grab object": ("Pick Object", None),
+}
+# param names small models use for Times
+COUNT_PARAMS = {"times", "time", "steps", "step", "count", "repeat", "repeats", "repetitions", "n", "number"}
+# words that make two names mean different amounts
+COUNT_WORDS = {"one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+               "once", "twice", "thrice", "half", "double", "small", "fast", "slow"}
+# action names small models invent -> allowed action
+ACTION_SYNONYMS = {
+    "move_forward": "go_forward",
+    "forward": "go_forward",
+    "walk_forward": "go_forward",
+    "move_backward": "back",
+    "move_back": "back",
+    "backward": "back",
+    "move_left": "left_move",
+    "turn_left": "left_move",
+    "left": "left_move",
+    "move_right": "right_move",
+    "turn_right": "right_move",
+    "right": "right_move",
+    "pick_up": "catch_ball",
+    "pickup": "catch_ball",
+    "grab": "catch_ball",
+    "grasp": "catch_ball",
+    "lift": "catch_ball_up",
+    "place": "put_down",
+    "drop": "put_down",
+    "put": "put_down",
+    "sit": "squat_down",
+    "kick": "right_kick",
+    "dance": "wing_chun",
+}
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _key(name: str) -> str:
+    """'MoveRight' / 'move_right' / 'Move-Right' -> 'move right'"""
+    name = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", str(name))
+    return " ".join(name.replace("_", " ").replace("-", " ").lower().split())
+
+
+def _tokens(name: str) -> List[str]:
+    """'left_move40' -> ['left', 'move', '40']"""
+    return re.findall(r"[a-z]+|\d+", _key(name))
+
+
+def _amounts(tokens: List[str]) -> List[str]:
+    return sorted(t for t in tokens if t.isdigit() or t in COUNT_WORDS)
+
+
+def _word_similarity(a: str, b: str) -> float:
+    return 1.0 - edit_distance(a, b) / max(len(a), len(b), 1)
+
+
+def similarity(name: str, candidate: str) -> float:
+    """
+    0-1, word by word: an edit distance over the words where replacing one
+    word by another costs their dissimilarity, normalized by the word count.
+    0 if the two differ in numbers or counts.
+    """
+    a, b = _tokens(name), _tokens(candidate)
+    if _amounts(a) != _amounts(b):
+        return 0.0
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, wa in enumerate(a, 1):
+        current = [float(i)]
+        for j, wb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + 1.0 - _word_similarity(wa, wb)))
+        previous = current
+    return 1.0 - previous[-1] / max(len(a), len(b), 1)
+
+
+def nearest(name: str, candidates: List[str]) -> Tuple[Optional[str], float]:
+    """
+    Closest candidate and its similarity; (None, 0.0) if no candidate has the
+    same numbers and counts, or if the runner-up is within ``REPAIR_MARGIN``.
+    """
+    scored = sorted(((similarity(name, c), c) for c in candidates), key=lambda sc: -sc[0])
+    if not scored or scored[0][0] <= 0.0:
+        return None, 0.0
+    if len(scored) > 1 and scored[0][0] - scored[1][0] < REPAIR_MARGIN:
+        return None, 0.0
+    return scored[0][1], scored[0][0]
+
+
+def _repair_action(action: Any, allowed_actions: List[str]) -> Tuple[Optional[str], float, str]:
+    if not isinstance(action, str):
+        return None, 0.0, f"Action {action!r} is not a string"
+    normalized = _key(action).replace(" ", "_")
+    if normalized in allowed_actions:
+        return normalized, 1.0, f"Action '{action}' -> '{normalized}'"
+    if normalized in ACTION_SYNONYMS and ACTION_SYNONYMS[normalized] in allowed_actions:
+        return ACTION_SYNONYMS[normalized], 0.95, f"Action '{action}' -> '{ACTION_SYNONYMS[normalized]}' (synonym)"
+    match, score = nearest(action, allowed_actions)
+    if match is None:
+        return None, 0.0, f"no single action close to '{action}'"
+    return match, score, f"Action '{action}' -> '{match}' (edit distance, {score:.2f})"
+
+
+def repair_step(step: Dict[str, Any], allowed_actions: List[str],
+                allowed_tools: Dict[str, Dict[str, List[str]]] = ALLOWED_TOOLS) -> Tuple[Dict[str, Any], float, List[str]]:
+    """
+    The nearest valid step, the confidence of the repair (1.0 if the step was
+    already valid, 0.0 if it can't be repaired) and what was changed.
+    """
+    ok, _ = validate_step(step, allowed_actions, allowed_tools)
+    if ok:
+        return step, 1.0, []
+
+    notes: List[str] = []
+    confidence = 1.0
+    tool = step.get("tool", "")
+    params = step.get("params") or {}
+    if not isinstance(params, dict):
+        return step, 0.0, [f"params {params!r} is not an object"]
+    params = dict(params)
+
+    # tool
+    if tool not in allowed_tools:
+        synonym = TOOL_SYNONYMS.get(_key(tool))
+        if synonym is not None:
+            tool, synonym_params = synonym
+            if synonym_params is not None:
+                # the rest ({"steps": 3}) is mapped or dropped with the other params below
+                params = dict(synonym_params, **{k: v for k, v in params.items() if k not in synonym_params})
+            confidence = min(confidence, 0.95)
+            notes.append(f"tool '{step.get('tool')}' -> '{tool}' (synonym)")
+        elif _key(tool).replace(" ", "_") in allowed_actions + list(ACTION_SYNONYMS):
+            # an action used as the tool name: {"tool": "wave"}
+            params = {"Action": tool}
+            notes.append(f"tool '{tool}' -> '{ACTION_TOOL}'")
+            tool = ACTION_TOOL
+            confidence = min(confidence, 0.9)
+        else:
+            match, score = nearest(tool, list(allowed_tools))
+            if match is None:
+                return step, 0.0, [f"no single tool close to '{tool}'"]
+            notes.append(f"tool '{tool}' -> '{match}' (edit distance, {score:.2f})")
+            tool, confidence = match, min(confidence, score)
+
+    # param names
+    required = allowed_tools[tool].get("required", [])
+    expected = required + allowed_tools[tool].get("optional", [])
+    unexpected = [name for name in params if name not in expected]
+    for name in unexpected:
+        value = params.pop(name)
+        if _key(name) in COUNT_PARAMS and "Times" in expected and "Times" not in params:
+            params["Times"] = value
+            notes.append(f"param '{name}' -> 'Times'")
+            confidence = min(confidence, 0.9)
+            continue
+        missing = [e for e in required if e not in params]
+        match, score = nearest(name, [e for e in expected if e not in params])
+        if len(unexpected) == 1 and len(missing) == 1 and score < REPAIR_CONFIDENCE:
+            # the only param given for the only one missing: {"object": "pen"} for Pick Object
+            match, score = missing[0], 0.8
+        if match is not None and score >= REPAIR_CONFIDENCE:
+            params[match] = value
+            notes.append(f"param '{name}' -> '{match}'")
+            confidence = min(confidence, score)
+        else:
+            notes.append(f"dropped param '{name}'")
+            confidence = min(confidence, LOSSY_CONFIDENCE)  # the plan asked for something we can't do: replan
+
+    # values
+    if tool == ACTION_TOOL and "Action" in params and params["Action"] not in allowed_actions:
+        action, score, note = _repair_action(params["Action"], allowed_actions)
+        if action is None:
+            return step, 0.0, notes + [note]
+        params["Action"] = action
+        notes.append(note)
+        confidence = min(confidence, score)
+    elif tool == SERVO_TOOL and "Servo Position" in params:
+        try:
+            position = int(round(float(params["Servo Position"])))
+        except (TypeError, ValueError):
+            return step, 0.0, notes + [f"Servo Position {params['Servo Position']!r} is not a number"]
+        clamped = max(SERVO_MIN, min(SERVO_MAX, position))
+        if clamped != params["Servo Position"]:
+            notes.append(f"Servo Position {params['Servo Position']!r} -> {clamped}")
+        params["Servo Position"] = clamped
+
+    if tool == ACTION_TOOL and "Times" in params:
+        try:
+            times = int(round(float(params["Times"])))
+        except (TypeError, ValueError):
+            return step, 0.0, notes + [f"Times {params['Times']!r} is not a number"]
+        clamped = max(1, min(MAX_ACTION_TIMES, times))
+        if clamped != params["Times"]:
+            notes.append(f"Times {params['Times']!r} -> {clamped}")
+        if clamped != times:
+            confidence = min(confidence, LOSSY_CONFIDENCE)  # fewer repetitions than asked for: replan instead
+        params["Times"] = clamped
+
+    repaired = {"step": step.get("step"), "tool": tool, "params": params}
+    ok, violations = validate_step(repaired, allowed_actions, allowed_tools)
+    if not ok:
+        return step, 0.0, notes + violations
+    return repaired, confidence, notes
@@ -0,0 +1,126 @@
+"""
+Run plan steps concurrently where they don't compete for the robot.
+
+Every step holds a set of resources (``body``, ``head``, ``camera``,
+``vlm``). A step waits only for the earlier steps it shares a resource
+with, so a head move can run next to a VLM call, and a detection can run
+next to an arm action, while two walking steps or a walk and a detection
+(walking moves the camera) keep their plan order.
+
+A tool can hand a resource back before it returns: Summarize Scene releases
+the camera once its frame is grabbed, so the next head move or walk doesn't
+wait for the VLM.
+
+    records = await run_plan(plan, step_resources, run_step, on_done)
+
+Because steps start out of plan order, steps after a failed one may already
+have completed when it fails. ``resume_order`` puts those first so a caller
+never runs them again:
+
+    order = resume_order(len(plan), completed(records), failed_index)
+    plan = [plan[i] for i in order]   # plan[:order.index(failed_index)] is done
+"""
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+RESOURCES = ("body", "head", "camera", "vlm")
+
+_current_step: contextvars.ContextVar = contextvars.ContextVar("current_step", default=None)
+
+
+def release(resource: str):
+    """Called by a tool that is done with ``resource`` before it returns; no-op outside run_plan."""
+    step = _current_step.get()
+    if step is not None:
+        step.release(resource)
+
+
+class StepRun:
+    def __init__(self, index: int, step: Dict[str, Any], resources: Iterable[str]):
+        self.index = index
+        self.step = step
+        self.resources = set(resources)
+        self.released = {r: asyncio.Event() for r in self.resources}
+
+    def release(self, resource: str):
+        if resource in self.released:
+            self.released[resource].set()
+
+    def release_all(self):
+        for event in self.released.values():
+            event.set()
+
+
+def dependencies(resources: List[Iterable[str]]) -> List[Dict[str, int]]:
+    """For every step, resource -> index of the previous step that holds it."""
+    last: Dict[str, int] = {}
+    deps = []
+    for index, held in enumerate(resources):
+        deps.append({r: last[r] for r in held if r in last})
+        for r in held:
+            last[r] = index
+    return deps
+
+
+async def run_plan(plan: List[Dict[str, Any]],
+                   resources_of: Callable[[Dict[str, Any]], Iterable[str]],
+                   run_step: Callable[[Dict[str, Any]], Awaitable[Tuple[bool, str]]],
+                   on_done: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> List[Dict[str, Any]]:
+    """
+    Run every step as soon as the steps it depends on released the shared
+    resources. After the first failure no new step starts (steps already
+    running finish, and later steps may have completed before it failed).
+    Returns one record per step in plan order, with
+    ``started`` / ``finished`` in seconds from the start of the plan
+    (``None`` for skipped steps).
+    """
+    runs = [StepRun(i, step, resources_of(step)) for i, step in enumerate(plan)]
+    deps = dependencies([run.resources for run in runs])
+    records: List[Optional[Dict[str, Any]]] = [None] * len(plan)
+    failed = asyncio.Event()
+    t0 = time.perf_counter()
+
+    async def run_one(run: StepRun):
+        try:
+            for resource, previous in deps[run.index].items():
+                await runs[previous].released[resource].wait()
+            record = {"index": run.index, "step": run.step.get("step", run.index + 1), "tool": run.step.get("tool"),
+                      "resources": sorted(run.resources), "ok": False, "started": None, "finished": None}
+            if failed.is_set():
+                record["result"] = "Skipped: an earlier step failed"
+            else:
+                _current_step.set(run)
+                record["started"] = round(time.perf_counter() - t0, 3)
+                try:
+                    record["ok"], record["result"] = await run_step(run.step)
+                except Exception as e:
+                    record["result"] = f"Tool execution error: {str(e)}"
+                record["finished"] = round(time.perf_counter() - t0, 3)
+                if not record["ok"]:
+                    failed.set()
+            records[run.index] = record
+        finally:
+            run.release_all()
+        if on_done is not None and record["started"] is not None:
+            await on_done(record)
+
+    await asyncio.gather(*(run_one(run) for run in runs))
+    return records
+
+
+def completed(records: List[Optional[Dict[str, Any]]]) -> List[int]:
+    """Indices of the steps that ran and succeeded."""
+    return [r["index"] for r in records if r is not None and r["ok"]]
+
+
+def resume_order(count: int, done: Iterable[int], failed: int) -> List[int]:
+    """
+    Plan order to continue from after the step at ``failed`` failed: the
+    completed steps (wherever they were in the plan), then the failed step,
+    then every step that did not complete, in plan order.
+    """
+    done = sorted(set(done) - {failed})
+    finished = set(done)
+    return done + [failed] + [i for i in range(count) if i != failed and i not in finished]
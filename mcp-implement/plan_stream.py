@@ -0,0 +1,110 @@
+"""
+Incremental parser for a plan JSON arriving token by token from Ollama.
+
+Each ``{"step", "tool", "params"}`` object inside the top-level ``plan``
+array is returned by ``feed()`` as soon as its closing brace arrives, so
+execution can start while the model is still generating later steps.
+
+    parser = PlanStreamParser()
+    async for chunk in client.chat_stream(...):
+        for step in parser.feed(chunk["message"]["content"]):
+            ...
+    plan_data = parser.result()
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+THINK_OPEN, THINK_CLOSE = "<think>", "</think>"
+
+
+class PlanStreamParser:
+    def __init__(self):
+        self.prefix = ""        # text before the json object starts (may hold <think> blocks)
+        self.text = ""          # the json object so far
+        self.pos = 0            # next index of self.text to scan
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.last_string: Optional[str] = None
+        self.key: Optional[str] = None   # current key of the top-level object
+        self.in_plan = False
+        self.step_start = 0
+        self.steps: List[Dict[str, Any]] = []
+        self.done = False
+
+    def _start(self, chunk: str):
+        """Skip <think> blocks and anything else before the first '{'."""
+        self.prefix += chunk
+        while THINK_OPEN in self.prefix:
+            start = self.prefix.index(THINK_OPEN)
+            end = self.prefix.find(THINK_CLOSE, start)
+            if end < 0:
+                return  # still thinking
+            self.prefix = self.prefix[:start] + self.prefix[end + len(THINK_CLOSE):]
+        if "{" in self.prefix:
+            self.text = self.prefix[self.prefix.index("{"):]
+            self.prefix = ""
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add streamed text; returns the plan steps completed by it."""
+        if self.done or not chunk:
+            return []
+        if not self.text:
+            self._start(chunk)
+        else:
+            self.text += chunk
+
+        completed = []
+        text = self.text
+        while self.pos < len(text) and not self.done:
+            i, c = self.pos, text[self.pos]
+            self.pos += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        self.last_string = json.loads(text[self.string_start:i + 1])
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c == ":" and len(self.stack) == 1:
+                self.key = self.last_string
+            elif c in "{[":
+                if c == "[" and len(self.stack) == 1 and self.key == "plan":
+                    self.in_plan = True
+                elif c == "{" and self.in_plan and len(self.stack) == 2:
+                    self.step_start = i
+                self.stack.append(c)
+            elif c in "}]":
+                if not self.stack:
+                    continue
+                self.stack.pop()
+                if c == "}" and self.in_plan and len(self.stack) == 2:
+                    try:
+                        step = json.loads(text[self.step_start:i + 1])
+                    except json.JSONDecodeError:
+                        # keep it so validation reports it instead of silently dropping a step
+                        step = {"step": len(self.steps) + 1, "tool": "", "params": {},
+                                "error": f"unparseable step: {text[self.step_start:i + 1]}"}
+                    self.steps.append(step)
+                    completed.append(step)
+                elif c == "]" and self.in_plan and len(self.stack) == 1:
+                    self.in_plan = False
+                elif not self.stack:
+                    self.done = True
+                    self.text = text[:i + 1]
+        return completed
+
+    def result(self) -> Dict[str, Any]:
+        """The whole plan once the stream has ended (falls back to the steps seen so far)."""
+        try:
+            return json.loads(self.text)
+        except json.JSONDecodeError:
+            return {"response": "", "plan": list(self.steps)}
@@ -0,0 +1,124 @@
+"""
+Planner conversation with Ollama that keeps the prompt prefix cacheable.
+
+Ollama reuses the evaluated tokens of a loaded model's previous prompt when
+the next prompt starts with the same tokens. The session therefore
+
+- sends the system prompt as the same, never rebuilt, first message,
+- replans by appending a short correction turn to the conversation of the
+  failed plan instead of a new prompt that embeds the system prompt again,
+- sends side calls to the same model (the final analysis) after the same
+  system message too, so they don't replace the cached prefix between commands,
+- pins the model in memory with ``keep_alive`` so it is not unloaded
+  between commands,
+- records ``prompt_eval_count`` / ``prompt_eval_duration`` of every call.
+
+    session = PlannerSession(OLLAMA_SERVER, MODEL_NAME, SYS_PROMPT)
+    result = await session.plan("move left twice", format="json")
+    result = await session.replan("move left twice", "Step 2 failed: ...", format="json")
+    print(session.stats())
+"""
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import ollama_client
+
+# -1 keeps the model loaded until Ollama restarts
+KEEP_ALIVE = -1
+
+
+class PlannerSession:
+    def __init__(self, base_url: str, model: str, system_prompt: str, keep_alive: Any = KEEP_ALIVE):
+        self.client = ollama_client.get_client(base_url)
+        self.model = model
+        self.keep_alive = keep_alive
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.messages: List[Dict[str, str]] = [self.system_message]
+        self.command: Optional[str] = None  # user input the conversation is about
+        self.context: Optional[str] = None  # e.g. the robot state, sent ahead of the next command
+        self.calls: List[Dict[str, Any]] = []
+
+    def record(self, kind: str, result: Dict[str, Any], seconds: float):
+        """Keep Ollama's prompt/eval counters of one call."""
+        self.calls.append({
+            "kind": kind,
+            "prompt_eval_count": result.get("prompt_eval_count", 0),
+            "prompt_eval_ms": round(result.get("prompt_eval_duration", 0) / 1e6, 3),
+            "eval_count": result.get("eval_count", 0),
+            "load_ms": round(result.get("load_duration", 0) / 1e6, 3),
+            "total_ms": round(seconds * 1000, 3),
+        })
+
+    async def chat(self, kind: str, messages: List[Dict[str, str]], timeout: Optional[float] = 30, **options) -> Dict[str, Any]:
+        """A recorded call outside of the planning conversation (e.g. the final analysis)."""
+        start = time.perf_counter()
+        result = await self.client.chat(self.model, messages, timeout=timeout, keep_alive=self.keep_alive, **options)
+        self.record(kind, result, time.perf_counter() - start)
+        return result
+
+    async def analyze(self, prompt: str, timeout: Optional[float] = 30, **options) -> Dict[str, Any]:
+        """A one-off question after the system prompt; the planning conversation is left as it is."""
+        return await self.chat("analysis", [self.system_message, {"role": "user", "content": prompt}], timeout, **options)
+
+    async def warm_up(self):
+        """Load the model and evaluate the system prompt once so the first command hits the cache."""
+        await self.chat("warmup", [self.system_message], options={"num_predict": 1})
+
+    def start(self, user_input: str):
+        self.command = user_input
+        content = f"{self.context}\n{user_input}" if self.context else user_input
+        self.messages = [self.system_message, {"role": "user", "content": content}]
+
+    async def _turn(self, kind: str, timeout: Optional[float], **options) -> Dict[str, Any]:
+        result = await self.chat(kind, self.messages, timeout, **options)
+        self.messages.append({"role": "assistant", "content": result.get("message", {}).get("content", "")})
+        return result
+
+    async def plan(self, user_input: str, timeout: Optional[float] = 30, **options) -> Dict[str, Any]:
+        """Start a new command: the conversation is reset to the system prompt plus this input."""
+        self.start(user_input)
+        return await self._turn("plan", timeout, **options)
+
+    async def plan_stream(self, user_input: str, timeout: Optional[float] = 30, **options) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming ``plan``; the final chunk carries the counters that get recorded."""
+        self.start(user_input)
+        content = []
+        start = time.perf_counter()
+        async for chunk in self.client.chat_stream(
+            self.model, self.messages, timeout=timeout, keep_alive=self.keep_alive, **options
+        ):
+            content.append(chunk.get("message", {}).get("content", ""))
+            if chunk.get("done"):
+                self.record("plan", chunk, time.perf_counter() - start)
+                if len(self.messages) == 2:  # not already superseded by a replan
+                    self.messages.append({"role": "assistant", "content": "".join(content)})
+            yield chunk
+
+    async def replan(self, user_input: str, correction: str, previous_plan: Optional[str] = None,
+                     timeout: Optional[float] = 30, **options) -> Dict[str, Any]:
+        """
+        Ask for a corrected plan by appending ``correction`` to the conversation
+        about ``user_input``. ``previous_plan`` stands in for the assistant turn
+        when the planner did not produce it in this conversation (a cached plan,
+        or a streamed plan cancelled mid-way).
+        """
+        if self.command != user_input:
+            self.start(user_input)
+        if self.messages[-1]["role"] != "assistant":
+            self.messages.append({"role": "assistant", "content": previous_plan or ""})
+        self.messages.append({"role": "user", "content": correction})
+        return await self._turn("replan", timeout, **options)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per kind of call: count and total/average prompt evaluation."""
+        stats: Dict[str, Dict[str, Any]] = {}
+        for call in self.calls:
+            s = stats.setdefault(call["kind"], {"calls": 0, "prompt_eval_count": 0, "prompt_eval_ms": 0.0, "total_ms": 0.0})
+            s["calls"] += 1
+            s["prompt_eval_count"] += call["prompt_eval_count"]
+            s["prompt_eval_ms"] = round(s["prompt_eval_ms"] + call["prompt_eval_ms"], 3)
+            s["total_ms"] = round(s["total_ms"] + call["total_ms"], 3)
+        for s in stats.values():
+            s["avg_prompt_eval_count"] = round(s["prompt_eval_count"] / s["calls"], 1)
+            s["avg_prompt_eval_ms"] = round(s["prompt_eval_ms"] / s["calls"], 3)
+        return stats
@@ -0,0 +1,344 @@
+"""
+Shared JSON-RPC client for the robot (Hiwonder TonyPi RPC server).
+
+One client per robot URL, used by the MCP server (async) and by the
+controller's pick_object loop (sync, in a worker thread):
+
+- pooled keep-alive connections instead of a new TCP connection per
+  ``requests.post``,
+- the robot's ``.local`` name is resolved once and cached for
+  ``DNS_TTL`` seconds (and again after a connection error),
+- JSON-RPC request ids and batch requests,
+- bounded connect/read timeouts; a request that never reached the robot is
+  retried with jittered backoff (anything else only if it is idempotent),
+- a circuit breaker: after ``FAILURE_THRESHOLD`` failed calls in a row
+  every call fails fast with ``RobotUnavailable`` for ``RESET_SECONDS``
+  instead of hanging a plan on timeouts; then exactly one trial call is let
+  through while every other caller (any thread or task) keeps failing fast
+  until the trial has returned.
+
+    robot = get_client("http://lab-erza.local:9030")
+    result = await robot.acall("RunAction", ["wave", 1])
+    results = robot.batch([("SetPWMServo", [1000, 2, 1, 1500]), ("RunAction", ["stand", 1])])
+    print(robot.stats())
+"""
+import asyncio
+import itertools
+import random
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+TIMEOUT = 5
+CONNECT_TIMEOUT = 2
+MAX_CONNECTIONS = 4
+KEEPALIVE_EXPIRY = 60  # seconds an idle connection stays in the pool
+DNS_TTL = 300
+RETRIES = 2
+BACKOFF_SECONDS = 0.2
+FAILURE_THRESHOLD = 3
+RESET_SECONDS = 10
+
+# the request never left the client: safe to retry any method
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, socket.gaierror)
+
+
+class RobotRPCError(Exception):
+    def __init__(self, method: str, error: Any):
+        message = error.get("message", error) if isinstance(error, dict) else error
+        super().__init__(f"Robot RPC {method} failed: {message}")
+        self.method = method
+        self.error = error
+
+
+class RobotUnavailable(RobotRPCError):
+    def __init__(self, base_url: str, reason: str):
+        super().__init__("*", f"{base_url} unreachable, {reason}")
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` failures -> half-open after ``reset_seconds``.
+
+    Half-open lets exactly one trial call through; it closes the breaker on
+    success and re-opens it on failure. A trial that ends without a verdict
+    (an error reply, a cancelled task) only frees the slot for the next caller.
+    """
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_seconds: float = RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """Seconds the breaker stays open; 0 when calls may go through."""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def acquire(self) -> Tuple[Optional[str], bool]:
+        """(why the call must fail fast or None, whether the call is the half-open trial)."""
+        with self.lock:
+            if self.opened_at is None:
+                return None, False
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                return f"failing fast for another {remaining:.1f} s", False
+            if self.trial:
+                return "failing fast until the trial call returns", False
+            self.trial = True
+            return None, True
+
+    def release(self):
+        """End the half-open trial; success() / failure() already gave the verdict, if any."""
+        with self.lock:
+            self.trial = False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()  # (re)open, also after a failed half-open trial
+
+
+class RobotRPC:
+    def __init__(self, base_url: str, timeout: float = TIMEOUT, retries: int = RETRIES,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        parts = urlsplit(self.base_url)
+        self.scheme, self.host, self.netloc = parts.scheme, parts.hostname, parts.netloc
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.path = parts.path or "/"
+        self.timeout = httpx.Timeout(timeout, connect=CONNECT_TIMEOUT)
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self.ids = itertools.count(1)
+        self._address: Optional[str] = None
+        self._resolved_at = 0.0
+        self._client: Optional[httpx.Client] = None
+        self._aclient: Optional[httpx.AsyncClient] = None
+        self.metrics = {"requests": 0, "errors": 0, "retries": 0, "fast_failures": 0,
+                        "resolutions": 0, "request_seconds": 0.0}
+
+    # name resolution
+    def _is_ip(self) -> bool:
+        try:
+            socket.inet_pton(socket.AF_INET6 if ":" in self.host else socket.AF_INET, self.host)
+            return True
+        except (OSError, TypeError):
+            return False
+
+    def _cached_url(self) -> Optional[str]:
+        if self._is_ip():
+            return self.base_url
+        if self._address is None or time.monotonic() >= self._resolved_at + DNS_TTL:
+            return None
+        address = f"[{self._address}]" if ":" in self._address else self._address
+        return f"{self.scheme}://{address}:{self.port}{self.path}"
+
+    def _resolve(self) -> str:
+        url = self._cached_url()
+        if url is None:
+            infos = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+            # prefer IPv4: mDNS names often also resolve to link-local IPv6 addresses
+            infos.sort(key=lambda info: info[0] != socket.AF_INET)
+            self._address = infos[0][4][0]
+            self._resolved_at = time.monotonic()
+            self.metrics["resolutions"] += 1
+            url = self._cached_url()
+        return url
+
+    # payloads
+    def payload(self, method: str, params: Sequence[Any] = ()) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "method": method, "params": list(params), "id": next(self.ids)}
+
+    def _check_open(self) -> bool:
+        """Fail fast while the breaker is open; True when this call is the half-open trial."""
+        reason, trial = self.breaker.acquire()
+        if reason is not None:
+            self.metrics["fast_failures"] += 1
+            raise RobotUnavailable(self.base_url, reason)
+        return trial
+
+    def _backoff(self, attempt: int) -> float:
+        return BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def _retryable(self, error: Exception, attempt: int, idempotent: bool) -> bool:
+        if attempt >= self.retries:
+            return False
+        if isinstance(error, NOT_SENT_ERRORS):
+            self._address = None  # the robot may have a new address
+            return True
+        return idempotent and isinstance(error, httpx.TransportError)
+
+    def _record(self, start: float, error: Optional[Exception]):
+        self.metrics["requests"] += 1
+        self.metrics["request_seconds"] += time.perf_counter() - start
+        if error is not None:
+            self.metrics["errors"] += 1
+
+    def _give_up(self, error: Exception):
+        # only an unreachable robot opens the breaker, not an error reply
+        if isinstance(error, (httpx.TransportError, OSError)):
+            self.breaker.failure()
+
+    @staticmethod
+    def _result(payload: Dict[str, Any], reply: Dict[str, Any]) -> Any:
+        if not isinstance(reply, dict):
+            raise RobotRPCError(payload["method"], f"unexpected reply {reply!r}")
+        if reply.get("error") is not None:
+            raise RobotRPCError(payload["method"], reply["error"])
+        return reply.get("result")
+
+    @staticmethod
+    def _results(payloads: List[Dict[str, Any]], replies: Any) -> List[Any]:
+        """Batch replies in request order; a failed call is returned as its RobotRPCError."""
+        by_id = {reply.get("id"): reply for reply in replies if isinstance(reply, dict)} if isinstance(replies, list) else {}
+        results = []
+        for payload in payloads:
+            try:
+                results.append(RobotRPC._result(payload, by_id.get(payload["id"])))
+            except RobotRPCError as e:
+                results.append(e)
+        return results
+
+    # sync (controller)
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(timeout=self.timeout, limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY))
+        return self._client
+
+    def send(self, payload: Union[Dict[str, Any], List[Dict[str, Any]]], idempotent: bool = False) -> Any:
+        """Post a JSON-RPC payload (or a batch) and return the decoded reply."""
+        trial = self._check_open()
+        try:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    response = self.client.post(self._resolve(), json=payload, headers={"Host": self.netloc})
+                    response.raise_for_status()
+                    reply = response.json()
+                except Exception as e:
+                    self._record(start, e)
+                    if not self._retryable(e, attempt, idempotent):
+                        self._give_up(e)
+                        raise
+                    self.metrics["retries"] += 1
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                self._record(start, None)
+                self.breaker.success()
+                return reply
+        finally:
+            if trial:
+                self.breaker.release()
+
+    def call(self, method: str, params: Sequence[Any] = (), idempotent: bool = False) -> Any:
+        payload = self.payload(method, params)
+        return self._result(payload, self.send(payload, idempotent))
+
+    def batch(self, calls: Sequence[Tuple[str, Sequence[Any]]], idempotent: bool = False) -> List[Any]:
+        """One request for several calls; results (or RobotRPCError) in call order."""
+        payloads = [self.payload(method, params) for method, params in calls]
+        return self._results(payloads, self.send(payloads, idempotent))
+
+    # async (MCP server)
+    @property
+    def aclient(self) -> httpx.AsyncClient:
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(timeout=self.timeout, limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY))
+        return self._aclient
+
+    async def asend(self, payload: Union[Dict[str, Any], List[Dict[str, Any]]], idempotent: bool = False) -> Any:
+        trial = self._check_open()
+        try:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    url = self._cached_url() or await asyncio.to_thread(self._resolve)
+                    response = await self.aclient.post(url, json=payload, headers={"Host": self.netloc})
+                    response.raise_for_status()
+                    reply = response.json()
+                except Exception as e:
+                    self._record(start, e)
+                    if not self._retryable(e, attempt, idempotent):
+                        self._give_up(e)
+                        raise
+                    self.metrics["retries"] += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                self._record(start, None)
+                self.breaker.success()
+                return reply
+        finally:
+            if trial:
+                self.breaker.release()
+
+    async def acall(self, method: str, params: Sequence[Any] = (), idempotent: bool = False) -> Any:
+        payload = self.payload(method, params)
+        return self._result(payload, await self.asend(payload, idempotent))
+
+    async def abatch(self, calls: Sequence[Tuple[str, Sequence[Any]]], idempotent: bool = False) -> List[Any]:
+        payloads = [self.payload(method, params) for method, params in calls]
+        return self._results(payloads, await self.asend(payloads, idempotent))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.metrics)
+        stats["request_seconds"] = round(stats["request_seconds"], 3)
+        stats["breaker_open_seconds"] = round(self.breaker.remaining(), 3)
+        return stats
+
+    async def aclose(self):
+        """Close the connection pools; the next call opens new ones."""
+        if self._aclient is not None:
+            aclient, self._aclient = self._aclient, None
+            await aclient.aclose()
+        if self._client is not None:
+            client, self._client = self._client, None
+            client.close()
+
+
+_clients: Dict[str, RobotRPC] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str) -> RobotRPC:
+    """The shared client for a robot (created on first use)."""
+    base_url = base_url.rstrip("/")
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = RobotRPC(base_url)
+        return _clients[base_url]
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    return {url: client.stats() for url, client in _clients.items()}
+
+
+async def aclose_all():
+    """Close the pooled connections; the clients stay registered (the server and controller hold them)."""
+    for client in list(_clients.values()):
+        await client.aclose()
@@ -0,0 +1,174 @@
+"""
+What the server knows about the robot, to skip commands that change nothing.
+
+Updated after every command the server or the controller sends (and from a
+robot status RPC where the firmware has one): the head servo position, the
+posture and whether the hands hold an object. ``None`` means unknown, and
+nothing is ever skipped on an unknown value. A value this process has not
+set or confirmed within ``STATE_TTL`` seconds counts as unknown too: the
+robot may have been moved by someone else or rebooted in the meantime.
+
+- ``Control Servo`` to the position the head already has is skipped, other
+  moves get a move time proportional to the distance instead of the full
+  second,
+- ``stand`` while standing, ``squat_down`` while squatting, ``put_down``
+  with empty hands and the like are skipped.
+
+The MCP server exposes ``snapshot()`` as the ``robot://state`` resource so
+the planner sees it without a tool call.
+
+    reason = state.redundant_action("stand")  # "robot is already standing" or None
+    state.after_action("stand")
+    move_ms = state.servo_move_ms(1500)       # None: already there
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from action_timing import SERVO_MOVE_MS
+
+STATE_URI = "robot://state"
+HEAD_RANGE = 1000  # 1000-2000: SERVO_MOVE_MS is the time for the full sweep
+MIN_SERVO_MOVE_MS = 200
+STATE_TTL = 60  # seconds a known value is trusted without a new command or status
+# JSON-RPC method returning {"head": int, "posture": str, "holding": bool}, on
+# firmware that has one (the stock TonyPi RPCServer does not)
+STATE_STATUS_METHOD: Optional[str] = None
+
+STANDING, SQUATTING = "standing", "squatting"
+# actions with a known end posture; after any other action the posture is unknown
+POSTURE_AFTER = {
+    "stand": STANDING,
+    "stand_slow": STANDING,
+    "squat_up": STANDING,
+    "stand_up_front": STANDING,
+    "stand_up_back": STANDING,
+    "squat_down": SQUATTING,
+}
+# action -> posture it is redundant in
+ONLY_CHANGES_POSTURE = {
+    "stand": STANDING,
+    "stand_slow": STANDING,
+    "squat_up": STANDING,
+    "squat_down": SQUATTING,
+}
+PICK_ACTIONS = {"catch_ball", "catch_ball_up"}
+DROP_ACTIONS = {"put_down"}
+
+
+class RobotState:
+    def __init__(self):
+        self.head: Optional[int] = None
+        self.posture: Optional[str] = None
+        self.holding: Optional[bool] = None
+        self.last_action: Optional[str] = None
+        self.updated: Optional[float] = None
+        self.seen: Dict[str, float] = {}  # field -> time.monotonic() it was last set
+        self.skipped = 0
+        self.lock = threading.Lock()  # the controller updates it from a worker thread
+
+    def _touch(self, *fields: str):
+        self.updated = time.time()
+        now = time.monotonic()
+        for field in fields:
+            self.seen[field] = now
+
+    def _known(self, field: str) -> Any:
+        """The field's value, or None when it is unknown or older than ``STATE_TTL``."""
+        seen = self.seen.get(field)
+        if seen is None or time.monotonic() - seen > STATE_TTL:
+            return None
+        return getattr(self, field)
+
+    def redundant_action(self, action: str) -> Optional[str]:
+        """Why ``RunAction(action)`` would change nothing, or None if it has to run."""
+        with self.lock:
+            posture = self._known("posture")
+            if action in ONLY_CHANGES_POSTURE and posture == ONLY_CHANGES_POSTURE[action]:
+                return f"robot is already {posture}"
+            if action in DROP_ACTIONS and self._known("holding") is False:
+                return "robot is not holding anything"
+            return None
+
+    def servo_move_ms(self, position: int) -> Optional[int]:
+        """Move time for the head to ``position``; None if it is already there."""
+        position = int(position)
+        with self.lock:
+            head = self._known("head")
+            if head is None:
+                return SERVO_MOVE_MS
+            if head == position:
+                return None
+            return max(MIN_SERVO_MOVE_MS, min(SERVO_MOVE_MS, abs(position - head) * SERVO_MOVE_MS // HEAD_RANGE))
+
+    def after_action(self, action: str):
+        with self.lock:
+            self.posture = POSTURE_AFTER.get(action)
+            fields = ["posture"]
+            if action in PICK_ACTIONS:
+                self.holding = True
+                fields.append("holding")
+            elif action in DROP_ACTIONS:
+                self.holding = False
+                fields.append("holding")
+            self.last_action = action
+            self._touch(*fields)
+
+    def after_servo(self, position: Optional[int]):
+        """``None`` when the command may or may not have reached the robot."""
+        with self.lock:
+            self.head = None if position is None else int(position)
+            self._touch("head")
+
+    def forget_posture(self):
+        """An action that may or may not have played: posture and hands are unknown."""
+        with self.lock:
+            self.posture = None
+            self.holding = None
+            self._touch("posture", "holding")
+
+    def skip(self):
+        with self.lock:
+            self.skipped += 1
+
+    def update_from_status(self, status: Dict[str, Any]):
+        """Overwrite with what the robot reports (``STATE_STATUS_METHOD``)."""
+        if not isinstance(status, dict):
+            return
+        with self.lock:
+            if isinstance(status.get("head"), int):
+                self.head = status["head"]
+                self._touch("head")
+            if status.get("posture") in (STANDING, SQUATTING):
+                self.posture = status["posture"]
+                self._touch("posture")
+            if isinstance(status.get("holding"), bool):
+                self.holding = status["holding"]
+                self._touch("holding")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "head": self._known("head"),
+                "posture": self._known("posture"),
+                "holding": self._known("holding"),
+                "last_action": self.last_action,
+                "updated": self.updated,
+                "skipped_commands": self.skipped,
+            }
+
+
+def describe(snapshot: Dict[str, Any]) -> str:
+    """One line for the planner; unknown fields are left out."""
+    parts = []
+    if snapshot.get("posture"):
+        parts.append(snapshot["posture"])
+    if snapshot.get("head") is not None:
+        parts.append(f"head servo at {snapshot['head']}")
+    if snapshot.get("holding") is not None:
+        parts.append("holding an object" if snapshot["holding"] else "hands empty")
+    return "Robot state: " + ", ".join(parts) + "." if parts else ""
+
+
+# shared by the MCP server and the controller (same process)
+state = RobotState()
@@ -0,0 +1,141 @@
+"""
+Deterministic planner for simple movement commands.
+
+Implements the "CRITICAL ACTION MAPPING RULES" and "REPETITION HANDLING"
+sections of SYS_PROMPT as a small grammar, so commands such as
+"move right twice" or "move forward 2 steps, then wave" are planned in
+microseconds instead of by the SLM:
+
+    plan("Move left twice.")
+    -> {"response": "I will move left twice.", "planner": "rules",
+        "plan": [{"step": 1, "tool": "Propagate Action", "params": {"Action": "left_move"}},
+                 {"step": 2, "tool": "Propagate Action", "params": {"Action": "left_move"}}]}
+
+Every clause of the command must parse, otherwise ``plan`` returns None and
+the command goes to the LLM planner. So do counts above ``MAX_ACTION_TIMES``
+("walk forward 100 steps"). Head moves are not repeated: "look up twice" is
+one Control Servo step.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from test_tools import MAX_ACTION_TIMES
+
+PLANNER_NAME = "rules"
+
+LOOK_UP_POSITION = 1800
+LOOK_DOWN_POSITION = 1200
+LOOK_AHEAD_POSITION = 1500
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+                "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+# at most 4 digits: longer numbers leave digits in the clause, which then goes to the LLM
+_NUMBER = r"(\d{1,4}|" + "|".join(NUMBER_WORDS) + r")"
+COUNT_PATTERNS = [
+    (re.compile(r"\btwice\b"), lambda m: 2),
+    (re.compile(r"\bthrice\b"), lambda m: 3),
+    (re.compile(r"\bonce\b"), lambda m: 1),
+    (re.compile(r"\b" + _NUMBER + r"\s+times?\b"), lambda m: _number(m.group(1))),
+    (re.compile(r"\b" + _NUMBER + r"\s+steps?\b"), lambda m: _number(m.group(1))),
+]
+CLAUSE_SPLIT = re.compile(r"[,;.!]|\band then\b|\bthen\b|\band\b|\bafter that\b")
+
+# words dropped around a clause: "please move left now" == "move left"
+FILLER_WORDS = {"please", "robot", "now", "do", "a", "the"}
+MOVE_VERBS = {"move", "go", "walk", "step", "take", "turn"}
+DIRECTIONS = {
+    "left": "left_move",
+    "right": "right_move",
+    "forward": "go_forward",
+    "forwards": "go_forward",
+    "backward": "back",
+    "backwards": "back",
+    "back": "back",
+}
+# counted in steps: "move forward 2 steps" -> two single steps
+STEP_ACTIONS = {"go_forward": "go_forward_one_step", "back": "back_one_step"}
+NAMED_ACTIONS = {
+    "wave": "wave",
+    "bow": "bow",
+    "squat": "squat",
+    "stand": "stand",
+    "stand up": "stand",
+    "sit ups": "sit_ups",
+    "put down": "put_down",
+    "put it down": "put_down",
+    "wing chun": "wing_chun",
+}
+LOOK = {"look up": LOOK_UP_POSITION, "look down": LOOK_DOWN_POSITION,
+        "look ahead": LOOK_AHEAD_POSITION, "look straight": LOOK_AHEAD_POSITION,
+        "look straight ahead": LOOK_AHEAD_POSITION, "look forward": LOOK_AHEAD_POSITION}
+
+
+def _number(text: str) -> int:
+    return int(text) if text.isdigit() else NUMBER_WORDS[text]
+
+
+def _count(clause: str) -> Tuple[str, Optional[int], bool]:
+    """(clause without its count, count or None if absent/ambiguous, whether counted in steps)"""
+    count, in_steps = None, False
+    for pattern, value in COUNT_PATTERNS:
+        m = pattern.search(clause)
+        if m is None:
+            continue
+        if count is not None or pattern.search(clause, m.end()):
+            return clause, None, False  # more than one count in a clause
+        count, in_steps = value(m), m.group(0).endswith(("step", "steps"))
+        clause = clause[:m.start()] + " " + clause[m.end():]
+    return " ".join(clause.split()), count, in_steps
+
+
+def _clause_steps(clause: str) -> Optional[List[Dict[str, Any]]]:
+    clause, count, in_steps = _count(clause)
+    if count == 0 or (count is not None and count > MAX_ACTION_TIMES):
+        return None
+    if (count is None and re.search(r"\d|" + "|".join(NUMBER_WORDS) + r"|times?\b", clause)):
+        return None
+    words = [w for w in clause.split() if w not in FILLER_WORDS]
+    phrase = " ".join(words)
+
+    if phrase in NAMED_ACTIONS:
+        step = {"tool": "Propagate Action", "params": {"Action": NAMED_ACTIONS[phrase]}}
+    elif phrase in LOOK:
+        # the head is already there after the first move
+        return [{"tool": "Control Servo", "params": {"Servo Position": LOOK[phrase]}}]
+    else:
+        if words and words[0] in MOVE_VERBS:
+            words = words[1:]
+        if len(words) != 1 or words[0] not in DIRECTIONS:
+            return None
+        action = DIRECTIONS[words[0]]
+        if in_steps:
+            action = STEP_ACTIONS.get(action, action)
+        step = {"tool": "Propagate Action", "params": {"Action": action}}
+    return [dict(step) for _ in range(count or 1)]
+
+
+def plan(user_input: str) -> Optional[Dict[str, Any]]:
+    """The plan for a simple movement command, or None if any part of it doesn't parse."""
+    text = re.sub(r"[^\w\s,;.!]", " ", user_input.lower())
+    clauses = [" ".join(c.split()) for c in CLAUSE_SPLIT.split(text)]
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return None
+
+    steps = []
+    for clause in clauses:
+        clause_steps = _clause_steps(clause)
+        if clause_steps is None:
+            return None
+        for step in clause_steps:
+            if step["tool"] == "Control Servo" and steps and steps[-1] == step:
+                continue  # "look up, then look up"
+            steps.append(step)
+    for i, step in enumerate(steps):
+        step["step"] = i + 1
+    said = [" ".join(w for w in c.split() if w not in ("please", "robot", "now")) for c in clauses]
+    return {
+        "response": f"I will {' then '.join(said)}.",
+        "plan": [{"step": s["step"], "tool": s["tool"], "params": s["params"]} for s in steps],
+        "planner": PLANNER_NAME,
+    }
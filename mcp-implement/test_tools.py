@@ -5,12 +5,13 @@ from datetime import datetime
 from typing import Any, Dict, List, Tuple
 
 ALLOWED_TOOLS = {
-    "Propagate Action": {"required": ["Action"]},
+    "Propagate Action": {"required": ["Action"], "optional": ["Times"]},
     "Control Servo": {"required": ["Servo Position"]},
     "Capture Image": {"required": ["Request"], "optional": ["BoundaryColors"]},
     "Summarize Scene": {"required": []},
     "Pick Object": {"required": ["object_description"]},
 }
+MAX_ACTION_TIMES = 10  # upper bound of Propagate Action's Times
 
 ERROR_KEYWORDS = ["error", "failed", "invalid", "not one of", "validation", "timeout"]
 
@@ -18,21 +19,21 @@ def is_error_text(s: str) -> bool:
     s = (s or "").lower()
     return any(k in s for k in ERROR_KEYWORDS)
 
-def validate_step(step: Dict[str, Any], allowed_actions: List[str]) -> Tuple[bool, List[str]]:
+def validate_step(step: Dict[str, Any], allowed_actions: List[str], allowed_tools: Dict[str, Dict[str, List[str]]] = ALLOWED_TOOLS) -> Tuple[bool, List[str]]:
     """Return (is_valid, violations)."""
     violations = []
     tool = step.get("tool", "")
     params = step.get("params", {})
 
     # tool name
-    if tool not in ALLOWED_TOOLS:
+    if tool not in allowed_tools:
         return False, [f"Unknown tool: {tool}"]
 
     if not isinstance(params, dict):
         return False, [f"Params must be dict for tool {tool}"]
 
-    req = ALLOWED_TOOLS[tool].get("required", [])
-    opt = ALLOWED_TOOLS[tool].get("optional", [])
+    req = allowed_tools[tool].get("required", [])
+    opt = allowed_tools[tool].get("optional", [])
 
     # required params present
     for k in req:
@@ -50,6 +51,10 @@ def validate_step(step: Dict[str, Any], allowed_actions: List[str]) -> Tuple[boo
         act = params.get("Action", None)
         if act not in allowed_actions:
             violations.append(f"Invalid Action '{act}'")
+        if "Times" in params:
+            times = params["Times"]
+            if not isinstance(times, int) or isinstance(times, bool) or not 1 <= times <= MAX_ACTION_TIMES:
+                violations.append(f"Times must be an int in [1,{MAX_ACTION_TIMES}]")
     elif tool == "Control Servo":
         pos = params.get("Servo Position", None)
         if not isinstance(pos, int):
@@ -74,7 +79,7 @@ def validate_step(step: Dict[str, Any], allowed_actions: List[str]) -> Tuple[boo
 
     return (len(violations) == 0), violations
 
-def validate_plan(plan_data: Dict[str, Any], allowed_actions: List[str]) -> Dict[str, Any]:
+def validate_plan(plan_data: Dict[str, Any], allowed_actions: List[str], allowed_tools: Dict[str, Dict[str, List[str]]] = ALLOWED_TOOLS) -> Dict[str, Any]:
     """Returns compliance metrics + violations."""
     metrics = {
         "parsed_ok": True,
@@ -91,7 +96,7 @@ def validate_plan(plan_data: Dict[str, Any], allowed_actions: List[str]) -> Dict
 
     metrics["num_steps"] = len(plan)
     for i, step in enumerate(plan):
-        ok, v = validate_step(step, allowed_actions)
+        ok, v = validate_step(step, allowed_actions, allowed_tools)
         if ok:
             metrics["num_compliant_steps"] += 1
         else:
@@ -123,6 +128,7 @@ def verify_compliance(plan_data, list_of_all_actions, log_file_name = "robot_tri
     trial = {
         "timestamp": datetime.now().isoformat(),
         "model": MODEL_NAME,
+        "planner": plan_data.get("planner", MODEL_NAME),
         "user_input": user_input,
         "json_valid": plan_data.get("_json_valid", True),
         "compliance": compliance,
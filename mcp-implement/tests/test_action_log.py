@@ -0,0 +1,61 @@
+import json
+import sqlite3
+
+import pytest
+
+from action_log import TimingRecorder, action_samples, fit_durations, read_log, table_update
+from action_timing import calibrate_from_action_groups
+
+SERVOS = ", ".join(f"Servo{i} INT" for i in range(1, 17))
+
+
+def d6a(path, frames):
+    """An action group file in the layout of TonyPi/ActionGroups: one row per frame, Time in ms."""
+    with sqlite3.connect(path) as db:
+        db.execute(f"CREATE TABLE ActionGroup([Index] INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, Time INT, {SERVOS})")
+        for time_ms, pulse in frames:
+            db.execute(f"INSERT INTO ActionGroup(Time, {', '.join(f'Servo{i}' for i in range(1, 17))}) "
+                       f"VALUES ({time_ms}, {', '.join([str(pulse)] * 16)})")
+
+
+def log(tmp_path, rows):
+    recorder = TimingRecorder("test", str(tmp_path / "rpc.jsonl"))
+    for action, times, rtt, settle, wait in rows:
+        recorder.record("RunAction", [action, times], 0.0, rtt, settle, wait)
+    return list(read_log(recorder.path))
+
+
+def test_only_status_waits_are_samples(tmp_path):
+    records = log(tmp_path, [
+        ("wave", 1, 0.05, 1.15, "status"),
+        ("wave", 2, 0.05, 2.35, "status"),
+        ("wave", 1, 0.05, 2.95, "default"),
+        ("go_forward", 1, 0.04, 0.9, "table"),
+    ])
+    samples = action_samples(records)
+    assert samples == {"wave": [pytest.approx(1.2), pytest.approx(1.2)]}
+    assert set(action_samples(records, {"status", "table"})) == {"wave", "go_forward"}
+
+
+def test_fit_percentiles():
+    fitted = fit_durations({"wave": [1.0, 1.1, 1.2, 1.3, 2.0], "bow": [1.0, 1.0]}, percentile=50)
+    assert list(fitted) == ["wave"]  # bow has fewer than MIN_SAMPLES
+    assert fitted["wave"]["n"] == 5
+    assert fitted["wave"]["seconds"] == pytest.approx(1.2)
+    assert fitted["wave"]["max"] == 2.0
+
+
+def test_stock_firmware_log_falls_back_to_the_action_groups(tmp_path):
+    d6a(tmp_path / "wave.d6a", [(300, 1500), (400, 1200), (500, 1500)])
+    d6a(tmp_path / "go_forward.d6a", [(200, 1500), (300, 1400), (300, 1600), (200, 1500)])
+    # no status method: every RunAction waited the table duration
+    records = log(tmp_path, [("wave", 1, 0.05, 1.3, "table")] * 5 + [("go_forward", 1, 0.04, 1.1, "table")] * 5)
+    fitted = fit_durations(action_samples(records))
+    assert fitted == {}
+    update = table_update(fitted, calibrate_from_action_groups(str(tmp_path)))
+    assert update == {"wave": pytest.approx(1.2), "go_forward": pytest.approx(1.0)}
+
+
+def test_measured_fits_override_the_action_groups():
+    fitted = fit_durations({"wave": [1.5, 1.5, 1.5]})
+    assert table_update(fitted, {"wave": 1.2, "bow": 2.0}) == {"wave": 1.5, "bow": 2.0}
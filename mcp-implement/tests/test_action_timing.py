@@ -0,0 +1,33 @@
+import sqlite3
+
+import pytest
+
+from action_timing import ActionTimer, calibrate_from_action_groups, load_durations, save_durations
+
+
+def action_group(path, frame_ms):
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE ActionGroup (Index_ INTEGER, Time INTEGER)")
+        db.executemany("INSERT INTO ActionGroup VALUES (?, ?)", enumerate(frame_ms))
+
+
+def test_calibrate_from_action_groups(tmp_path):
+    action_group(tmp_path / "wave.d6a", [300, 400, 500])
+    action_group(tmp_path / "bow.d6a", [1000])
+    durations = calibrate_from_action_groups(str(tmp_path))
+    assert durations == {"bow": 1.0, "wave": pytest.approx(1.2)}
+    table = tmp_path / "durations.json"
+    save_durations(durations, "test", str(table))
+    assert load_durations(str(table)) == {"bow": 1.0, "wave": 1.2}
+
+
+def test_expected_seconds():
+    timer = ActionTimer(durations={"wave": 1.2}, status_method=None, margin=0.1, default_seconds=3.0)
+    assert timer.expected_seconds("wave", 2) == pytest.approx(2.5)
+    assert timer.expected_seconds("bow") == 3.0
+
+
+def test_warns_without_table_or_status():
+    assert "every action waits 3 s" in ActionTimer(durations={}, status_method=None).uncalibrated_warning()
+    assert ActionTimer(durations={"wave": 1.2}, status_method=None).uncalibrated_warning() is None
+    assert ActionTimer(durations={}, status_method="GetActionStatus").uncalibrated_warning() is None
@@ -0,0 +1,83 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import controller
+import robot_rpc
+from vision_tools.detection_data import BoundingBox
+
+
+def frame(start, end):
+    box = BoundingBox(280, 340, 360, 440, 640, 480)
+    return controller.Frame(SimpleNamespace(box=box), start, end, True)
+
+
+def test_frame_captured_while_moving_is_detected_again(monkeypatch):
+    frames = []
+
+    def detect_frame(query, colors="red", url=None):
+        time.sleep(0.01)
+        now = time.monotonic()
+        frames.append(frame(now - 0.001, now))
+        return frames[-1]
+
+    monkeypatch.setattr(controller, "detect_frame", detect_frame)
+    prefetcher = controller.DetectionPrefetcher("cup")
+    try:
+        prefetcher.enabled = True
+        prefetcher.schedule(0.0)
+        prefetcher.pending.result()
+        prefetcher.motion.add(frames[0].start, frames[0].end)  # the robot still moved when it was read
+        assert prefetcher.next() is frames[1]
+        assert prefetcher.stats == {"detections": 2, "prefetched": 1, "stale": 1}
+
+        prefetcher.schedule(0.0)
+        assert prefetcher.next() is frames[2]
+        assert prefetcher.stats["stale"] == 1
+    finally:
+        prefetcher.close()
+
+
+def test_episodes_do_not_share_the_prefetch_worker():
+    first, second = controller.DetectionPrefetcher("cup"), controller.DetectionPrefetcher("pen")
+    assert first.executor is not second.executor and first.motion is not second.motion
+    first.close()
+    second.close()
+
+
+def test_prefetcher_is_closed_when_a_step_raises(monkeypatch):
+    prefetchers = []
+    release = threading.Event()
+
+    class RecordingPrefetcher(controller.DetectionPrefetcher):
+        def __init__(self, query):
+            super().__init__(query)
+            self.enabled = True
+            prefetchers.append(self)
+
+    def detect_frame(query, colors="red", url=None):
+        if prefetchers[0].stats["detections"]:
+            release.wait(5)  # the prefetch is still in flight when the step raises
+        now = time.monotonic()
+        return frame(now - 0.01, now)
+
+    def execute_response(response, motion=None):
+        raise robot_rpc.RobotUnavailable("http://robot", "test")
+
+    monkeypatch.setattr(controller, "DetectionPrefetcher", RecordingPrefetcher)
+    monkeypatch.setattr(controller, "detect_frame", detect_frame)
+    monkeypatch.setattr(controller, "execute_response", execute_response)
+    monkeypatch.setattr(controller, "ensure_vision_ready", lambda: None)
+    monkeypatch.setattr(controller, "control_servo", lambda *args, **kwargs: True)
+    with pytest.raises(robot_rpc.RobotUnavailable):
+        controller.pick_object("cup")
+    release.set()
+    prefetcher, = prefetchers
+    assert prefetcher.pending is None
+    assert prefetcher.executor._shutdown
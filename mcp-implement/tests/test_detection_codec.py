@@ -0,0 +1,77 @@
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from vision_tools import detection_codec as codec
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVICE_COPY = os.path.join(REPO, "ai_model_communication", "custom_data", "detection_codec.py")
+
+
+def detection(label, score, xmin, ymin, xmax, ymax):
+    return SimpleNamespace(label=label, score=score, box=SimpleNamespace(xmin=xmin, ymin=ymin, xmax=xmax, ymax=ymax))
+
+
+DETECTIONS = [
+    detection("red block", 0.875, 10, 20, 110, 220),
+    detection("cup", 0.5, 300, 40, 380, 160),
+    detection("red block", 0.75, 400, 300, 460, 380),
+]
+
+
+def test_service_copy_is_identical():
+    with open(codec.__file__, "rb") as ours, open(SERVICE_COPY, "rb") as theirs:
+        assert ours.read() == theirs.read()
+
+
+def assert_decoded(arrays):
+    assert len(arrays) == 3
+    assert (arrays.image_width, arrays.image_height) == (640, 480)
+    assert arrays.boxes.tolist() == [[10, 20, 110, 220], [300, 40, 380, 160], [400, 300, 460, 380]]
+    assert arrays.scores.tolist() == [0.875, 0.5, 0.75]
+    assert [arrays.labels[i] for i in arrays.label_ids] == ["red block", "cup", "red block"]
+
+
+@pytest.mark.parametrize("media_type", [codec.STRUCT_MEDIA_TYPE, codec.MSGPACK_MEDIA_TYPE])
+def test_binary_round_trip(media_type):
+    if media_type == codec.MSGPACK_MEDIA_TYPE and codec.msgpack is None:
+        pytest.skip("msgpack is not installed")
+    payload = codec.encode(DETECTIONS, 640, 480, media_type)
+    assert_decoded(codec.decode(payload, media_type))
+
+
+def test_json_matches_binary():
+    body = {"detections": codec.decode(codec.encode_struct(DETECTIONS, 640, 480), codec.STRUCT_MEDIA_TYPE).to_dicts(),
+            "image_width": 640, "image_height": 480}
+    assert_decoded(codec.decode(json.dumps(body).encode(), "application/json; charset=utf-8"))
+
+
+def test_empty_struct():
+    arrays = codec.decode(codec.encode_struct([], 640, 480), codec.STRUCT_MEDIA_TYPE)
+    assert len(arrays) == 0 and arrays.labels == []
+
+
+def test_bad_magic():
+    payload = bytearray(codec.encode_struct(DETECTIONS, 640, 480))
+    payload[:4] = b"XXXX"
+    with pytest.raises(ValueError):
+        codec.decode_struct(bytes(payload))
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, codec.JSON_MEDIA_TYPE),
+    ("*/*", codec.JSON_MEDIA_TYPE),
+    (codec.BINARY_ACCEPT, codec.STRUCT_MEDIA_TYPE),
+    (f"{codec.JSON_MEDIA_TYPE}, {codec.STRUCT_MEDIA_TYPE};q=0.4", codec.JSON_MEDIA_TYPE),
+    ("text/html", codec.JSON_MEDIA_TYPE),
+])
+def test_negotiate(accept, expected):
+    assert codec.negotiate(accept) == expected
+
+
+def test_records_are_views():
+    arrays = codec.decode(codec.encode_struct(DETECTIONS, 640, 480), codec.STRUCT_MEDIA_TYPE)
+    assert np.shares_memory(arrays.boxes, arrays.records)
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from vision_tools.detection_data import BoundingBox, BoxArray, DetectionResult
+
+
+def test_rows_are_plain_numbers():
+    # the per-step controller code reads these, numpy scalars made it slower than the old dataclass
+    box = BoxArray(np.array([[280, 340, 360, 440]], dtype=np.int32), 640, 480)[0]
+    assert all(type(v) is int for v in box.xyxy)
+    assert type(box.ncx) is float and type(box.n_area) is float
+
+
+def test_scalar_matches_batched():
+    boxes = BoxArray([[10, 20, 110, 220], [300, 40, 380, 160]], 640, 480)
+    for i, box in enumerate(boxes):
+        assert box.n_cxcy == pytest.approx(boxes.n_cxcy[i].tolist())
+        assert box.n_area == pytest.approx(boxes.n_area[i])
+        assert box.n_bottom == pytest.approx(boxes.n_bottom[i])
+        assert box == boxes[i]
+
+
+def test_set_image_size_reaches_the_array():
+    boxes = BoxArray([[0, 0, 64, 48]])
+    box = boxes[0]
+    box.set_image_size(640, 480)
+    assert (boxes.image_width, boxes.image_height) == (640, 480)
+    assert box.n_area == pytest.approx(0.01)
+
+
+def test_boxes_are_views_of_the_array():
+    boxes = BoxArray([[0, 0, 64, 48], [64, 48, 128, 96]])
+    first, second = list(boxes)
+    first.set_image_size(640, 480)
+    assert (second.image_width, second.image_height) == (640, 480)
+    assert second.n_bottom == pytest.approx(0.2)
+    boxes.xyxy = boxes.xyxy * 2
+    assert second.xyxy == [128, 96, 256, 192]
+
+
+def test_standalone_box():
+    box = BoundingBox(0, 0, 64, 48)
+    box.set_image_size(640, 480)
+    assert (box.xmin, box.ymax, box.image_width) == (0, 48, 640)
+    assert len(box.boxes) == 1 and box.boxes.xyxy.tolist() == [[0, 0, 64, 48]]
+
+
+def test_missing_image_size():
+    with pytest.raises(AssertionError):
+        BoundingBox(0, 0, 10, 10).n_area
+
+
+def test_from_arrays():
+    arrays = SimpleNamespace(boxes=np.array([[0, 0, 10, 10], [5, 5, 20, 20]]), scores=np.array([0.9, 0.4]),
+                             label_ids=np.array([0, 1]), labels=["a", "b"], image_width=100, image_height=100)
+    dets = DetectionResult.from_arrays(arrays)
+    assert [d.label for d in dets] == ["a", "b"]
+    assert dets[1].box.xyxy == [5, 5, 20, 20] and dets[1].box.boxes is dets[0].box.boxes
+
+
+def test_match():
+    a = BoxArray([[0, 0, 10, 10], [50, 50, 60, 60]])
+    b = BoxArray([[51, 51, 61, 61], [1, 0, 11, 10]])
+    assert sorted(a.match(b)) == [(0, 1), (1, 0)]
+
+
+def test_detection_equality():
+    def det(mask=None, score=0.9):
+        return DetectionResult(score, "cup", BoundingBox(0, 0, 10, 10, 100, 100), mask)
+
+    assert det() == det()
+    assert det() != det(score=0.5)
+    assert det(np.ones((2, 2))) == det(np.ones((2, 2)))
+    assert det(np.ones((2, 2))) != det(np.zeros((2, 2)))
+    assert det(np.ones((2, 2))) != det()
+    arrays = SimpleNamespace(boxes=np.array([[0, 0, 10, 10]]), scores=np.array([0.9]), label_ids=np.array([0]),
+                             labels=["cup"], image_width=100, image_height=100)
+    assert DetectionResult.from_arrays(arrays) == [det()]
@@ -0,0 +1,36 @@
+import asyncio
+import threading
+import time
+
+import anyio
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import main_mcp_server
+
+
+def test_cancelled_pick_returns_after_the_controller_stopped(monkeypatch):
+    stopped = threading.Event()
+
+    def pick_object(object_description, on_step=None, stop=None):
+        while not stop.is_set():
+            time.sleep(0.01)
+        time.sleep(0.3)  # the current step finishes
+        stopped.set()
+        return []
+
+    monkeypatch.setattr(main_mcp_server, "pick_object", pick_object)
+
+    async def run():
+        # the way the MCP server cancels a request
+        with anyio.CancelScope() as scope:
+            asyncio.get_running_loop().call_later(0.1, scope.cancel)
+            await main_mcp_server.navigate_and_pick_object("cup")
+        assert scope.cancelled_caught
+        assert stopped.is_set()
+        assert not main_mcp_server.robot_locks["body"].locked()
+
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ollama_client
+from ollama_client import OllamaClient, OllamaError
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        FakeOllama.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if payload["model"] == "missing":
+            body, status = b'{"error": "model not found"}', 404
+        elif payload["stream"]:
+            chunks = [{"message": {"content": "a"}, "done": False},
+                      {"message": {"content": "b"}, "done": True, "prompt_eval_count": 7}]
+            body, status = "".join(json.dumps(c) + "\n" for c in chunks).encode(), 200
+        else:
+            body, status = json.dumps({"message": {"content": "ok"}, "prompt_eval_count": 7, "done": True}).encode(), 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FakeOllama.connections = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_one_pooled_connection_across_calls(server):
+    async def run():
+        client = OllamaClient(server)
+        for _ in range(3):
+            assert (await client.chat("model", [{"role": "user", "content": "hi"}]))["prompt_eval_count"] == 7
+        chunks = [chunk async for chunk in client.chat_stream("model", [])]
+        assert chunks[-1]["done"]
+        with pytest.raises(OllamaError):
+            await client.generate("missing", "hi")
+        await client.aclose()
+        return client.stats()
+
+    stats = asyncio.run(run())
+    assert FakeOllama.connections == 1
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+    assert stats["errors"] == 1
+    assert stats["request_seconds"] > 0
+
+
+def test_shared_client_per_server(server):
+    assert ollama_client.get_client(server) is ollama_client.get_client(server + "/")
+    assert server in ollama_client.all_stats()
@@ -0,0 +1,47 @@
+from plan_cache import PlanCache, normalize_command
+
+ACTIONS = ["wave", "go_forward"]
+WAVE = {"response": "Waving", "plan": [{"step": 1, "tool": "Propagate Action", "params": {"Action": "wave"}}]}
+LOOK = {"response": "Looking", "plan": [{"step": 1, "tool": "Capture Image", "params": {"Request": "cup"}}]}
+ONLY_ACTIONS = {"Propagate Action": {"required": ["Action"], "optional": ["Times"]}}
+
+
+def cache(tmp_path, **kwargs):
+    return PlanCache(str(tmp_path / "plans.sqlite"), **kwargs)
+
+
+def test_normalize_command():
+    assert normalize_command("  Move LEFT twice! ") == "move left twice"
+
+
+def test_hit_for_the_same_command(tmp_path):
+    plans = cache(tmp_path)
+    assert plans.put("Wave!", "model", "prompt", WAVE, ACTIONS)
+    assert plans.get("  wave ", "model", "prompt") == WAVE
+    assert plans.get("wave", "other model", "prompt") is None
+    assert plans.get("wave", "model", "changed prompt") is None
+    assert plans.stats()["hits"] == 1
+
+
+def test_invalid_plans_are_not_stored(tmp_path):
+    plans = cache(tmp_path)
+    bad = {"plan": [{"step": 1, "tool": "Propagate Action", "params": {"Action": "fly"}}]}
+    assert not plans.put("fly", "model", "prompt", bad, ACTIONS)
+    assert plans.get("fly", "model", "prompt") is None
+
+
+def test_validated_against_the_session_tools(tmp_path):
+    # a server without Capture Image: its plans must never be cached
+    plans = cache(tmp_path)
+    assert not plans.put("look for the cup", "model", "prompt", LOOK, ACTIONS, ONLY_ACTIONS)
+    assert plans.put("wave", "model", "prompt", WAVE, ACTIONS, ONLY_ACTIONS)
+
+
+def test_lru_eviction(tmp_path):
+    plans = cache(tmp_path, max_entries=2)
+    plans.put("wave", "model", "prompt", WAVE, ACTIONS)
+    plans.put("look", "model", "prompt", LOOK, ACTIONS)
+    plans.get("wave", "model", "prompt")
+    plans.put("wave twice", "model", "prompt", WAVE, ACTIONS)
+    assert plans.get("look", "model", "prompt") is None
+    assert plans.get("wave", "model", "prompt") == WAVE
@@ -0,0 +1,60 @@
+import asyncio
+
+from plan_memory import HashingEmbedder, PlanMemory
+
+ACTIONS = ["go_forward_one_step", "left_move_20", "right_move_20"]
+ONLY_ACTIONS = {"Propagate Action": {"required": ["Action"], "optional": ["Times"]}}
+
+
+def plan(*steps):
+    return {"response": "ok", "plan": [{"step": i + 1, "tool": t, "params": p} for i, (t, p) in enumerate(steps)]}
+
+
+FORWARD_2 = plan(*[("Propagate Action", {"Action": "go_forward_one_step"})] * 2)
+
+
+def memory(tmp_path):
+    return PlanMemory(HashingEmbedder(), directory=str(tmp_path))
+
+
+def test_paraphrase_reuses_the_plan_with_the_new_count(tmp_path):
+    async def run():
+        plans = memory(tmp_path)
+        assert await plans.add("move forward 2 steps", FORWARD_2, "prompt", ACTIONS)
+        return await plans.lookup("move forward 3 steps", "prompt")
+
+    found = asyncio.run(run())
+    assert found is not None
+    assert [s["params"]["Action"] for s in found["plan"]] == ["go_forward_one_step"] * 3
+
+
+def test_other_direction_is_not_reused(tmp_path):
+    async def run():
+        plans = memory(tmp_path)
+        await plans.add("move left", plan(("Propagate Action", {"Action": "left_move_20"})), "prompt", ACTIONS)
+        return await plans.lookup("move right", "prompt")
+
+    assert asyncio.run(run()) is None
+
+
+def test_validated_against_the_session_tools(tmp_path):
+    async def run():
+        plans = memory(tmp_path)
+        look = plan(("Capture Image", {"Request": "cup"}))
+        return await plans.add("look for the cup", look, "prompt", ACTIONS, ONLY_ACTIONS)
+
+    assert asyncio.run(run()) is False
+
+
+def test_times_is_scaled_to_the_new_count(tmp_path):
+    async def run():
+        # the hashing embedder only scores "go left" 0.5 against "walk left"; a model embedding scores higher
+        plans = PlanMemory(HashingEmbedder(), directory=str(tmp_path), threshold=0.5)
+        left_2 = plan(("Propagate Action", {"Action": "left_move_20", "Times": 2}))
+        assert await plans.add("walk left twice", left_2, "prompt", ACTIONS)
+        return await plans.lookup("go left three times", "prompt"), await plans.lookup("walk left once", "prompt")
+
+    three, once = asyncio.run(run())
+    assert three is not None
+    assert [s["params"] for s in three["plan"]] == [{"Action": "left_move_20", "Times": 3}]
+    assert [s["params"] for s in once["plan"]] == [{"Action": "left_move_20"}]
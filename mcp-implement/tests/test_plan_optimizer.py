@@ -0,0 +1,52 @@
+from plan_optimizer import absorb_repeats, merge_repeated_actions
+from test_tools import MAX_ACTION_TIMES
+
+
+def action(name, times=None, step=0):
+    params = {"Action": name} if times is None else {"Action": name, "Times": times}
+    return {"step": step, "tool": "Propagate Action", "params": params}
+
+
+SERVO = {"step": 0, "tool": "Control Servo", "params": {"Servo Position": 1800}}
+
+
+def summary(plan):
+    return [(s["step"], s["params"].get("Action", s["tool"]), s["params"].get("Times", 1)) for s in plan]
+
+
+def test_runs_are_merged():
+    plan = [action("wave"), action("wave"), action("wave"), action("bow"), SERVO, action("bow")]
+    assert summary(merge_repeated_actions(plan)) == [(1, "wave", 3), (2, "bow", 1), (3, "Control Servo", 1), (4, "bow", 1)]
+
+
+def test_split_at_max_times():
+    plan = [action("go_forward", MAX_ACTION_TIMES - 2), action("go_forward", 5)]
+    assert summary(merge_repeated_actions(plan, first_step=4)) == [
+        (4, "go_forward", MAX_ACTION_TIMES), (5, "go_forward", 3)]
+
+
+def test_input_is_not_modified():
+    plan = [action("wave"), action("wave")]
+    merge_repeated_actions(plan)
+    assert plan == [action("wave"), action("wave")]
+
+
+def test_steps_with_other_params_are_kept():
+    odd = {"step": 0, "tool": "Propagate Action", "params": {"Action": "wave", "Speed": 2}}
+    assert len(merge_repeated_actions([action("wave"), odd, action("wave", True)])) == 3
+
+
+def test_absorb_repeats():
+    plan = [action("wave"), action("wave", 2), action("wave"), action("bow")]
+    assert absorb_repeats(plan, 0, exclude={2}) == 1
+    assert summary(plan) == [(0, "wave", 3), (0, "wave", 1), (0, "bow", 1)]
+    assert absorb_repeats(plan, 2) == 0
+
+
+def test_step_without_action_is_left_for_repair():
+    broken = {"step": 0, "tool": "Propagate Action", "params": {}}
+    assert summary(merge_repeated_actions([action("wave"), broken, action("wave")])) == [
+        (1, "wave", 1), (2, "Propagate Action", 1), (3, "wave", 1)]
+    plan = [action("wave"), dict(broken, params={"Action": None})]
+    assert absorb_repeats(plan, 0) == 0
+    assert absorb_repeats([broken, action("wave")], 0) == 0
@@ -0,0 +1,79 @@
+import pytest
+
+from plan_repair import REPAIR_CONFIDENCE, nearest, repair_step
+from test_tools import MAX_ACTION_TIMES
+
+ACTIONS = [
+    "back", "back_one_step", "bow", "go_forward", "go_forward_one_step", "go_forward_fast",
+    "left_move", "left_move_10", "left_move_20", "left_move_30", "left_move_fast",
+    "right_move", "right_move_10", "right_move_20", "right_move_30", "right_move_fast",
+    "squat", "squat_down", "squat_up", "stand", "put_down", "wave", "catch_ball", "catch_ball_up",
+]
+
+
+def repair(tool, params):
+    step, confidence, notes = repair_step({"step": 1, "tool": tool, "params": params}, ACTIONS)
+    return step, confidence >= REPAIR_CONFIDENCE, notes
+
+
+@pytest.mark.parametrize("action, expected", [
+    ("righth_move_30", "right_move_30"),
+    ("go_foward", "go_forward"),
+    ("Wave", "wave"),
+    ("move_forward", "go_forward"),
+    ("pick_up", "catch_ball"),
+])
+def test_repaired(action, expected):
+    step, confident, _ = repair("Propagate Action", {"Action": action})
+    assert confident and step["params"]["Action"] == expected
+
+
+@pytest.mark.parametrize("action", [
+    # other numbers or counts: a different action, not a typo
+    "left_move_40",
+    "right_move_100",
+    "right_move_50",
+    "go_forward_two_steps",
+    # a word more or a different word
+    "squat_up_down",
+    "sit_down",
+])
+def test_different_actions_are_replanned(action):
+    _, confident, _ = repair("Propagate Action", {"Action": action})
+    assert not confident
+
+
+def test_ambiguous_match_is_refused():
+    # as close to catch_ball as to catch_bell: no runner-up margin
+    assert nearest("catch_bull", ["catch_ball", "catch_bell"]) == (None, 0.0)
+    assert nearest("catch_bal", ["catch_ball", "wave"])[0] == "catch_ball"
+
+
+def test_count_param_becomes_times():
+    step, confident, _ = repair("Move Forward", {"steps": 3})
+    assert confident
+    assert step["tool"] == "Propagate Action" and step["params"] == {"Action": "go_forward", "Times": 3}
+
+
+def test_dropped_param_is_replanned():
+    step, confident, notes = repair("Propagate Action", {"Action": "wave", "speed": "fast"})
+    assert not confident and "dropped param 'speed'" in notes
+
+
+def test_clamped_times_is_replanned():
+    step, confident, _ = repair("Propagate Action", {"Action": "wave", "Times": MAX_ACTION_TIMES + 5})
+    assert not confident and step["params"]["Times"] == MAX_ACTION_TIMES
+    step, confident, _ = repair("Propagate Action", {"Action": "wave", "Times": "2"})
+    assert confident and step["params"]["Times"] == 2
+
+
+def test_tool_and_param_names():
+    step, confident, _ = repair("Capture Images", {"request": "cup"})
+    assert confident and step == {"step": 1, "tool": "Capture Image", "params": {"Request": "cup"}}
+    step, confident, _ = repair("Control Servo", {"Servo Position": "2500"})
+    assert confident and step["params"]["Servo Position"] == 2000
+
+
+def test_valid_step_is_untouched():
+    step = {"step": 1, "tool": "Propagate Action", "params": {"Action": "wave"}}
+    assert repair_step(step, ACTIONS) == (step, 1.0, [])
@@ -0,0 +1,64 @@
+import asyncio
+
+from plan_scheduler import completed, dependencies, release, resume_order, run_plan
+
+RESOURCES = {"walk": ["body", "camera"], "wave": ["body"], "look": ["head", "camera"],
+             "scene": ["camera", "vlm"], "fail_look": ["head", "camera"]}
+
+
+def step(name, seconds=0.0):
+    return {"tool": name, "seconds": seconds}
+
+
+def run(plan):
+    async def run_step(s):
+        await asyncio.sleep(s["seconds"])
+        if s["tool"] == "scene":
+            release("camera")
+            await asyncio.sleep(s["seconds"])
+        return not s["tool"].startswith("fail"), s["tool"]
+
+    return asyncio.run(run_plan(plan, lambda s: RESOURCES[s["tool"]], run_step))
+
+
+def test_dependencies():
+    assert dependencies([["body"], ["head"], ["body", "head"]]) == [{}, {}, {"body": 0, "head": 1}]
+
+
+def test_independent_steps_overlap():
+    records = run([step("wave", 0.05), step("look", 0.05)])
+    assert records[1]["started"] < records[0]["finished"]
+
+
+def test_shared_resources_keep_plan_order():
+    records = run([step("walk", 0.05), step("look", 0.01)])
+    assert records[1]["started"] >= records[0]["finished"]
+
+
+def test_released_resource():
+    # the walk only waits for the scene's camera, not for the VLM
+    records = run([step("scene", 0.05), step("walk", 0.01)])
+    assert records[1]["started"] < records[0]["finished"]
+
+
+def test_no_step_starts_after_a_failure():
+    records = run([step("fail_look", 0.02), step("walk", 0.01)])
+    assert not records[0]["ok"] and records[1]["started"] is None
+
+
+def test_later_step_completed_before_an_earlier_failure():
+    # the wave (body only) runs next to the failing head move and finishes first
+    plan = [step("fail_look", 0.05), step("wave", 0.01), step("walk", 0.01)]
+    records = run(plan)
+    assert completed(records) == [1]
+    assert records[2]["started"] is None
+    order = resume_order(len(plan), completed(records), 0)
+    # done first, so plan[:1] is what ran; resuming after the failed step never repeats the wave
+    assert order == [1, 0, 2]
+    assert order[order.index(0) + 1:] == [2]
+
+
+def test_resume_order():
+    assert resume_order(5, [0, 1], 2) == [0, 1, 2, 3, 4]
+    assert resume_order(5, [0, 3, 4], 1) == [0, 3, 4, 1, 2]
+    assert resume_order(3, [], 0) == [0, 1, 2]
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from plan_stream import PlanStreamParser
+
+PLAN = {
+    "response": "Waving, then looking up {twice}",
+    "plan": [
+        {"step": 1, "tool": "Propagate Action", "params": {"Action": "wave", "Note": "a \"quoted\" } brace"}},
+        {"step": 2, "tool": "Control Servo", "params": {"Servo Position": 1800}},
+    ],
+}
+
+
+def stream(parser, text, size):
+    """Steps in the order feed() completed them, with the chunk index each arrived in."""
+    seen = []
+    for n, i in enumerate(range(0, len(text), size)):
+        seen += [(n, step) for step in parser.feed(text[i:i + size])]
+    return seen
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, 10_000])
+def test_steps_as_they_complete(size):
+    text = json.dumps(PLAN)
+    parser = PlanStreamParser()
+    seen = stream(parser, text, size)
+    assert [step for _, step in seen] == PLAN["plan"]
+    assert parser.result() == PLAN
+
+
+def test_first_step_before_the_stream_ends():
+    text = json.dumps(PLAN)
+    seen = stream(PlanStreamParser(), text, 1)
+    first_done = text.index('}}', text.index('"wave"')) + 2
+    assert seen[0][0] == first_done - 1
+
+
+def test_think_block_and_preamble_are_skipped():
+    text = "<think>maybe {\"plan\": []}</think>Sure:\n" + json.dumps(PLAN) + "\ntrailing {text}"
+    parser = PlanStreamParser()
+    assert [step for _, step in stream(parser, text, 5)] == PLAN["plan"]
+    assert parser.result() == PLAN
+
+
+def test_unparseable_step_is_kept():
+    text = '{"plan": [{"step": 1, "tool": "Propagate Action", "params": {"Action": wave}}]}'
+    steps = PlanStreamParser().feed(text)
+    assert len(steps) == 1 and steps[0]["tool"] == "" and "unparseable" in steps[0]["error"]
+
+
+def test_truncated_stream_falls_back_to_seen_steps():
+    text = json.dumps(PLAN)
+    parser = PlanStreamParser()
+    parser.feed(text[:text.index('{"step": 2')])
+    assert parser.result() == {"response": "", "plan": PLAN["plan"][:1]}
@@ -0,0 +1,58 @@
+import asyncio
+
+from planner_session import PlannerSession
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    async def chat(self, model, messages, timeout=None, **options):
+        self.requests.append([dict(m) for m in messages])
+        return {"message": {"content": f"reply {len(self.requests)}"}, "prompt_eval_count": 10,
+                "prompt_eval_duration": 2_000_000}
+
+
+def session():
+    planner = PlannerSession("http://127.0.0.1:11434", "model", "SYSTEM")
+    planner.client = FakeClient()
+    return planner
+
+
+def test_replan_appends_only_the_correction():
+    planner = session()
+
+    async def run():
+        await planner.plan("move left twice", format="json")
+        await planner.replan("move left twice", "Step 2 failed", format="json")
+
+    asyncio.run(run())
+    first, second = planner.client.requests
+    assert first == [{"role": "system", "content": "SYSTEM"}, {"role": "user", "content": "move left twice"}]
+    assert second[:2] == first
+    assert second[2:] == [{"role": "assistant", "content": "reply 1"}, {"role": "user", "content": "Step 2 failed"}]
+
+
+def test_replan_of_a_cached_plan_stands_in_the_previous_plan():
+    planner = session()
+    asyncio.run(planner.replan("wave", "Step 1 failed", previous_plan='{"plan": []}'))
+    assert planner.client.requests[0][1:] == [
+        {"role": "user", "content": "wave"},
+        {"role": "assistant", "content": '{"plan": []}'},
+        {"role": "user", "content": "Step 1 failed"},
+    ]
+
+
+def test_analysis_keeps_the_system_prefix_and_the_conversation():
+    planner = session()
+
+    async def run():
+        await planner.plan("wave")
+        await planner.analyze("What happened?")
+
+    asyncio.run(run())
+    assert planner.client.requests[1] == [{"role": "system", "content": "SYSTEM"},
+                                          {"role": "user", "content": "What happened?"}]
+    assert len(planner.messages) == 3
+    assert planner.stats()["analysis"]["calls"] == 1
+    assert planner.stats()["plan"]["avg_prompt_eval_ms"] == 2.0
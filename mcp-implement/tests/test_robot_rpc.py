@@ -0,0 +1,133 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from robot_rpc import CircuitBreaker, RobotRPC, RobotRPCError, RobotUnavailable
+
+URL = "http://127.0.0.1:9030"
+
+
+def reply(request):
+    return httpx.Response(200, json={"jsonrpc": "2.0", "id": 1, "result": True})
+
+
+def refuse(request):
+    raise httpx.ConnectError("refused", request=request)
+
+
+def robot(handler, breaker):
+    rpc = RobotRPC(URL, retries=0, breaker=breaker)
+    rpc._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return rpc
+
+
+def half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.failure()
+    return breaker
+
+
+def test_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    rpc = robot(refuse, breaker)
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            rpc.call("RunAction", ["wave", 1])
+    with pytest.raises(RobotUnavailable):
+        rpc.call("RunAction", ["wave", 1])
+    assert rpc.stats()["fast_failures"] == 1
+
+
+def test_one_trial_at_a_time():
+    breaker = half_open()
+    assert breaker.acquire() == (None, True)
+    reason, trial = breaker.acquire()
+    assert "trial" in reason and not trial
+    breaker.success()
+    assert breaker.acquire() == (None, False)
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.failure()
+    breaker.opened_at -= 60
+    assert breaker.acquire() == (None, True)
+    breaker.failure()
+    reason, _ = breaker.acquire()
+    assert "failing fast for another" in reason
+
+
+def test_trial_without_verdict_frees_the_slot():
+    breaker = half_open()
+    rpc = robot(lambda request: httpx.Response(500), breaker)
+    with pytest.raises(httpx.HTTPStatusError):
+        rpc.call("RunAction", ["wave", 1])
+    assert breaker.acquire() == (None, True)
+
+
+def test_error_reply_closes_the_breaker():
+    breaker = half_open()
+    rpc = robot(lambda request: httpx.Response(200, json={"id": 1, "error": {"message": "no such action"}}), breaker)
+    with pytest.raises(RobotRPCError):
+        rpc.call("RunAction", ["fly", 1])
+    assert breaker.acquire() == (None, False)
+
+
+def test_other_threads_fail_fast_during_the_trial():
+    breaker = half_open()
+    started, finish = threading.Event(), threading.Event()
+
+    def slow(request):
+        started.set()
+        finish.wait(5)
+        return reply(request)
+
+    rpc = robot(slow, breaker)
+    trial = threading.Thread(target=rpc.call, args=("RunAction", ["wave", 1]))
+    trial.start()
+    assert started.wait(5)
+    with pytest.raises(RobotUnavailable):
+        rpc.call("RunAction", ["wave", 1])
+    finish.set()
+    trial.join(5)
+    assert rpc.call("RunAction", ["wave", 1]) is True
+    assert breaker.opened_at is None
+
+
+def test_other_tasks_fail_fast_during_the_trial():
+    async def run():
+        breaker = half_open()
+        finish = asyncio.Event()
+
+        async def slow(request):
+            await finish.wait()
+            return reply(request)
+
+        rpc = RobotRPC(URL, retries=0, breaker=breaker)
+        rpc._aclient = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+        trial = asyncio.create_task(rpc.acall("RunAction", ["wave", 1]))
+        await asyncio.sleep(0)
+        with pytest.raises(RobotUnavailable):
+            await rpc.acall("RunAction", ["wave", 1])
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        # a cancelled trial gives no verdict: the next caller becomes the trial
+        assert breaker.acquire() == (None, True)
+
+    asyncio.run(run())
+
+
+def test_closed_clients_reopen_on_next_use():
+    async def run():
+        rpc = RobotRPC(URL, retries=0)
+        rpc.aclient
+        rpc.client
+        await rpc.aclose()
+        assert rpc._aclient is None and rpc._client is None
+        assert not rpc.aclient.is_closed
+        await rpc.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import robot_state
+from action_timing import SERVO_MOVE_MS
+from robot_state import SQUATTING, STANDING, RobotState, describe
+
+
+def expire(state):
+    for field in state.seen:
+        state.seen[field] -= robot_state.STATE_TTL + 1
+
+
+def test_nothing_is_skipped_before_the_first_command():
+    state = RobotState()
+    assert state.redundant_action("stand") is None
+    assert state.redundant_action("put_down") is None
+    assert state.servo_move_ms(1500) == SERVO_MOVE_MS
+
+
+def test_stand_while_standing_is_skipped():
+    state = RobotState()
+    state.after_action("stand")
+    assert state.redundant_action("stand") == "robot is already standing"
+    assert state.redundant_action("squat_down") is None
+    state.after_action("squat_down")
+    assert state.redundant_action("squat_down") == "robot is already squatting"
+    assert state.redundant_action("stand") is None
+
+
+def test_only_known_actions_set_the_posture():
+    state = RobotState()
+    state.after_action("squat_down")
+    state.after_action("wave")
+    assert state.posture is None
+    assert state.redundant_action("stand") is None
+    state.after_action("stand_up_front")
+    assert state.posture == STANDING
+    state.after_action("sit_ups")
+    assert state.posture is None
+
+
+def test_stale_state_is_unknown():
+    state = RobotState()
+    state.after_action("stand")
+    state.after_servo(1500)
+    state.after_action("put_down")
+    expire(state)
+    assert state.redundant_action("stand_slow") is None
+    assert state.redundant_action("put_down") is None
+    assert state.servo_move_ms(1500) == SERVO_MOVE_MS
+    assert state.snapshot()["posture"] is None
+    assert describe(state.snapshot()) == ""
+
+
+def test_servo_move_time_follows_the_distance():
+    state = RobotState()
+    state.after_servo(1500)
+    assert state.servo_move_ms(1500) is None
+    assert state.servo_move_ms(2000) == max(robot_state.MIN_SERVO_MOVE_MS, SERVO_MOVE_MS // 2)
+    state.after_servo(None)
+    assert state.servo_move_ms(1500) == SERVO_MOVE_MS
+
+
+def test_failed_action_forgets_posture_and_hands():
+    state = RobotState()
+    state.after_action("catch_ball")
+    assert state.holding is True
+    state.forget_posture()
+    assert state.redundant_action("put_down") is None
+    assert state.snapshot()["holding"] is None
+
+
+def test_status_refreshes_the_state():
+    state = RobotState()
+    state.update_from_status({"head": 1200, "posture": SQUATTING, "holding": False})
+    assert state.servo_move_ms(1200) is None
+    assert state.redundant_action("squat_down") == "robot is already squatting"
+    assert describe(state.snapshot()) == "Robot state: squatting, head servo at 1200, hands empty."
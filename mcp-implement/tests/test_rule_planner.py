@@ -0,0 +1,54 @@
+import pytest
+
+import rule_planner
+from test_tools import MAX_ACTION_TIMES, validate_plan
+
+
+def actions(command):
+    plan = rule_planner.plan(command)
+    return None if plan is None else [s["params"].get("Action", s["params"].get("Servo Position")) for s in plan["plan"]]
+
+
+@pytest.mark.parametrize("command, expected", [
+    ("Move left twice.", ["left_move", "left_move"]),
+    ("please move right now", ["right_move"]),
+    ("move forward 2 steps, then wave", ["go_forward_one_step", "go_forward_one_step", "wave"]),
+    ("walk backwards three steps", ["back_one_step"] * 3),
+    ("go forward", ["go_forward"]),
+    ("stand up and bow", ["stand", "bow"]),
+    ("look down", [rule_planner.LOOK_DOWN_POSITION]),
+])
+def test_simple_commands(command, expected):
+    assert actions(command) == expected
+
+
+@pytest.mark.parametrize("command", [
+    "pick up the red block",
+    "move left twice 3 times",
+    "move left 0 times",
+    "move forward a few steps",
+    "dance",
+])
+def test_anything_else_goes_to_the_llm(command):
+    assert rule_planner.plan(command) is None
+
+
+def test_counts_are_capped():
+    assert actions(f"walk forward {MAX_ACTION_TIMES} steps") == ["go_forward_one_step"] * MAX_ACTION_TIMES
+    assert rule_planner.plan(f"walk forward {MAX_ACTION_TIMES + 1} steps") is None
+    assert rule_planner.plan("walk forward 100 steps") is None
+    assert rule_planner.plan("move left 1000000 times") is None
+    assert rule_planner.plan("move left " + "9" * 5000 + " times") is None
+
+
+def test_head_moves_are_not_repeated():
+    assert actions("look up twice") == [rule_planner.LOOK_UP_POSITION]
+    assert actions("look up, then look up") == [rule_planner.LOOK_UP_POSITION]
+    assert actions("look up, wave, look up") == [rule_planner.LOOK_UP_POSITION, "wave", rule_planner.LOOK_UP_POSITION]
+
+
+def test_plans_are_valid_and_numbered():
+    plan = rule_planner.plan("move forward 2 steps, then wave, then look ahead")
+    assert [s["step"] for s in plan["plan"]] == [1, 2, 3, 4]
+    used = [s["params"]["Action"] for s in plan["plan"] if "Action" in s["params"]]
+    assert validate_plan(plan, used)["plan_compliant"]
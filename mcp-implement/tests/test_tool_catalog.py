@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from test_tools import MAX_ACTION_TIMES
+from tool_catalog import EXECUTE_PLAN_TOOL, PLANNER_RULES, ToolCatalog
+
+TOOLS = [
+    SimpleNamespace(name="Propagate Action", description="Run a predefined action", inputSchema={
+        "type": "object",
+        "properties": {
+            "Action": {"type": "string", "enum": ["wave", "go_forward"]},
+            "Times": {"type": "integer", "minimum": 1, "maximum": MAX_ACTION_TIMES},
+        },
+        "required": ["Action"],
+    }),
+    SimpleNamespace(name="Control Servo", description="Move the head", inputSchema={
+        "type": "object",
+        "properties": {"Servo Position": {"type": "integer", "minimum": 1000, "maximum": 2000}},
+        "required": ["Servo Position"],
+    }),
+    SimpleNamespace(name=EXECUTE_PLAN_TOOL, description="Run a plan", inputSchema={"type": "object"}),
+]
+
+
+def test_catalog_from_the_tool_list():
+    catalog = ToolCatalog.from_mcp(TOOLS)
+    assert catalog.allowed_actions == ["wave", "go_forward"]
+    assert catalog.allowed_tools == {
+        "Propagate Action": {"required": ["Action"], "optional": ["Times"]},
+        "Control Servo": {"required": ["Servo Position"], "optional": []},
+    }
+    prompt = catalog.render_prompt()
+    assert EXECUTE_PLAN_TOOL not in prompt
+    assert "one of wave|go_forward" in prompt and "integer 1000-2000" in prompt
+
+
+def test_repetitions_use_times():
+    # the rules used to ask for N identical steps, contradicting the Times parameter
+    assert "identical steps" not in PLANNER_RULES
+    assert f'"Times": N (at most {MAX_ACTION_TIMES}' in PLANNER_RULES
+
+
+def test_validate_with_times():
+    catalog = ToolCatalog.from_mcp(TOOLS)
+    ok, _ = catalog.validate_step({"step": 1, "tool": "Propagate Action", "params": {"Action": "wave", "Times": 3}})
+    assert ok
+    ok, _ = catalog.validate_step({"step": 1, "tool": "Propagate Action", "params": {"Action": "fly"}})
+    assert not ok
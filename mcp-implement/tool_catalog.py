@@ -0,0 +1,142 @@
+"""
+Planner prompt and validators generated from the MCP server's tool list.
+
+The server's ``list_tools()`` is the single source of truth for tool names,
+parameters, the ``Action`` enum and the servo range; the client renders it
+into a compact system prompt at startup instead of carrying a hand-written
+copy of the catalog:
+
+    tools = (await session.list_tools()).tools
+    catalog = ToolCatalog.from_mcp(tools)
+    system_prompt = catalog.render_prompt()
+    ok, violations = catalog.validate_step(step)
+    result = await client.chat(model, messages, format=catalog.plan_schema())
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+from test_tools import MAX_ACTION_TIMES, validate_plan, validate_step
+
+ACTION_TOOL = "Propagate Action"
+EXECUTE_PLAN_TOOL = "Execute Plan"
+# tools the client's executor calls itself; the planner never sees them
+EXECUTOR_TOOLS = {EXECUTE_PLAN_TOOL}
+
+PROMPT_HEADER = """You are the planner of a bipedal humanoid robot with a camera head, legs and hands.
+Reply ONLY with JSON, no other text:
+{"response": "<short reply to the user>", "plan": [{"step": 1, "tool": "<tool>", "params": {<params>}}]}"""
+
+# planning knowledge that is not part of the tool schemas
+PLANNER_RULES = f"""Rules:
+- move/go/turn right -> right_move; left -> left_move; forward -> go_forward; backward -> back
+- pick up -> catch_ball; put down -> put_down; while holding an object use catch_ball_go / catch_ball_left_move / catch_ball_right_move
+- look up -> Control Servo above 1500; look down -> below 1500; 1500 looks straight ahead
+- "twice" / "N times" / "N steps" of an action -> ONE Propagate Action step with "Times": N (at most {MAX_ACTION_TIMES}; split larger counts)
+- to pick up, fetch or go to an object: Summarize Scene, then Pick Object with its color and name
+- Capture Image finds bounding boxes of specific objects; Summarize Scene describes the whole view
+- use only the tools, params and values listed; number steps from 1 in execution order"""
+
+
+def _render_param(name: str, schema: Dict[str, Any], required: bool) -> str:
+    key = json.dumps(name) + ("" if required else "?")
+    if "enum" in schema:
+        kind = "one of " + "|".join(str(v) for v in schema["enum"])
+    elif schema.get("type") == "integer" and "minimum" in schema and "maximum" in schema:
+        kind = f"integer {schema['minimum']}-{schema['maximum']}"
+    else:
+        kind = schema.get("type", "any")
+    if schema.get("description"):
+        kind += f" ({schema['description']})"
+    return f"{key}: {kind}"
+
+
+class ToolCatalog:
+    def __init__(self, tools: List[Dict[str, Any]]):
+        """tools: ``{"name", "description", "inputSchema"}`` per tool, as listed by the server."""
+        self.tools = tools
+
+    @classmethod
+    def from_mcp(cls, tools) -> "ToolCatalog":
+        return cls([
+            {"name": t.name, "description": t.description or "", "inputSchema": t.inputSchema or {}}
+            for t in tools if t.name not in EXECUTOR_TOOLS
+        ])
+
+    @property
+    def allowed_tools(self) -> Dict[str, Dict[str, List[str]]]:
+        """Required/optional params per tool, in the format of test_tools.ALLOWED_TOOLS."""
+        allowed = {}
+        for tool in self.tools:
+            schema = tool["inputSchema"]
+            required = list(schema.get("required", []))
+            optional = [p for p in schema.get("properties", {}) if p not in required]
+            allowed[tool["name"]] = {"required": required, "optional": optional}
+        return allowed
+
+    @property
+    def allowed_actions(self) -> List[str]:
+        for tool in self.tools:
+            if tool["name"] == ACTION_TOOL:
+                return list(tool["inputSchema"]["properties"]["Action"]["enum"])
+        return []
+
+    def render_tools(self) -> str:
+        lines = ["Tools (name {params}: description):"]
+        for tool in self.tools:
+            schema = tool["inputSchema"]
+            required = set(schema.get("required", []))
+            params = ", ".join(
+                _render_param(name, p, name in required) for name, p in schema.get("properties", {}).items()
+            )
+            description = " ".join(tool["description"].split())
+            lines.append(f"- {tool['name']} {{{params}}}: {description}")
+        return "\n".join(lines)
+
+    def render_prompt(self) -> str:
+        return "\n\n".join([PROMPT_HEADER, self.render_tools(), PLANNER_RULES]) + "\n"
+
+    def step_schema(self, tool: Dict[str, Any]) -> Dict[str, Any]:
+        params = dict(tool["inputSchema"])
+        params.setdefault("type", "object")
+        params["properties"] = {
+            name: dict(p, minLength=1) if p.get("type") == "string" and name in params.get("required", []) else p
+            for name, p in params.get("properties", {}).items()
+        }
+        params["additionalProperties"] = False
+        return {
+            "type": "object",
+            "properties": {
+                "step": {"type": "integer", "minimum": 1},
+                "tool": {"type": "string", "enum": [tool["name"]]},
+                "params": params,
+            },
+            "required": ["step", "tool", "params"],
+            "additionalProperties": False,
+        }
+
+    def plan_schema(self) -> Dict[str, Any]:
+        """
+        JSON Schema of a plan for Ollama's structured output (``format=``): one
+        ``oneOf`` branch per tool with that tool's exact params schema, so an
+        unknown tool, a wrong Action or an out-of-range servo position cannot
+        be decoded.
+        """
+        return {
+            "type": "object",
+            "properties": {
+                "response": {"type": "string"},
+                "plan": {
+                    "type": "array",
+                    "minItems": 1,
+                    "items": {"oneOf": [self.step_schema(tool) for tool in self.tools]},
+                },
+            },
+            "required": ["response", "plan"],
+            "additionalProperties": False,
+        }
+
+    def validate_step(self, step: Dict[str, Any]) -> Tuple[bool, List[str]]:
+        return validate_step(step, self.allowed_actions, self.allowed_tools)
+
+    def validate_plan(self, plan_data: Dict[str, Any]) -> Dict[str, Any]:
+        return validate_plan(plan_data, self.allowed_actions, self.allowed_tools)
@@ -1,89 +1,270 @@
-from dataclasses import dataclass 
-from typing import Any, List, Dict, Optional, Union, Tuple 
+from typing import Any, List, Dict, Optional, Union, Tuple
 
-import numpy as np 
+import numpy as np
 
-@dataclass 
-class BoundingBox:
-    xmin: int 
-    ymin: int 
-    xmax: int 
-    ymax: int 
 
-    image_width: int 
-    image_height: int 
+class BoxArray:
+    """
+    N bounding boxes of one frame as an (N, 4) xyxy array plus the image size.
+    All the geometry is computed for every box at once; indexing gives a
+    ``BoundingBox`` view that reads its row and the image size through the
+    array. ``rows`` keeps the same boxes as plain Python numbers, converted
+    once, for the per-step scalar code: assign a new ``xyxy`` instead of
+    editing it in place.
+    """
+    __slots__ = ("_xyxy", "rows", "image_width", "image_height")
+
+    def __init__(self, xyxy, image_width = None, image_height = None):
+        self.xyxy = xyxy
+        self.image_width = image_width
+        self.image_height = image_height
+
+    @classmethod
+    def from_rows(cls, rows: List[List[float]], image_width = None, image_height = None) -> 'BoxArray':
+        """Boxes from plain xyxy rows; the numpy array is only built when it is used."""
+        boxes = cls.__new__(cls)
+        boxes._xyxy = None
+        boxes.rows = rows
+        boxes.image_width = image_width
+        boxes.image_height = image_height
+        return boxes
+
+    @property
+    def xyxy(self) -> np.ndarray:
+        if self._xyxy is None:
+            self._xyxy = np.asarray(self.rows).reshape(-1, 4)
+        return self._xyxy
+
+    @xyxy.setter
+    def xyxy(self, xyxy):
+        xyxy = np.asarray(xyxy)
+        if xyxy.ndim != 2 or xyxy.shape[1] != 4:
+            xyxy = xyxy.reshape(-1, 4) if xyxy.size else np.zeros((0, 4))
+        self._xyxy = xyxy
+        self.rows = xyxy.tolist()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: int) -> 'BoundingBox':
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"box index {index} out of range for {len(self)} boxes")
+        return BoundingBox.view(self, index % len(self))
+
+    def __iter__(self):
+        return (BoundingBox.view(self, i) for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"BoxArray(n={len(self)}, image_size=({self.image_width}, {self.image_height}))"
 
-    def __init__(self, xmin, ymin, xmax, ymax, image_width = None, image_height = None):
-        self.xmin = xmin 
-        self.ymin = ymin 
-        self.xmax = xmax 
-        self.ymax = ymax 
-                
-        self.image_width = image_width 
-        self.image_height = image_height 
-
-    
-    # @property
     def set_image_size(self, image_width, image_height):
-        self.image_height = image_height 
         self.image_width = image_width
+        self.image_height = image_height
+
+    def _check_size(self):
+        assert self.image_height is not None, "image width and height not specified."
+
+    @property
+    def cxcy(self) -> np.ndarray:
+        return (self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2.0
+
+    @property
+    def n_cxcy(self) -> np.ndarray:
+        self._check_size()
+        return self.cxcy / (self.image_width, self.image_height)
+
+    @property
+    def w(self) -> np.ndarray:
+        return np.maximum(1, self.xyxy[:, 2] - self.xyxy[:, 0])
+
+    @property
+    def h(self) -> np.ndarray:
+        return np.maximum(1, self.xyxy[:, 3] - self.xyxy[:, 1])
+
+    @property
+    def area(self) -> np.ndarray:
+        return self.w * self.h
+
+    @property
+    def n_area(self) -> np.ndarray:
+        self._check_size()
+        return self.area / (self.image_width * self.image_height)
+
+    @property
+    def n_bottom(self) -> np.ndarray:
+        self._check_size()
+        return self.xyxy[:, 3] / self.image_height
+
+    def iou(self, other: 'BoxArray') -> np.ndarray:
+        """(N, M) intersection over union against another set of boxes."""
+        a = self.xyxy[:, None, :].astype(np.float64)
+        b = other.xyxy[None, :, :].astype(np.float64)
+        iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+        ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+        inter = iw * ih
+        union = self.area[:, None] + other.area[None, :] - inter
+        return inter / np.maximum(union, 1e-9)
+
+    def match(self, other: 'BoxArray', threshold: float = 0.3) -> List[Tuple[int, int]]:
+        """Greedy one-to-one matching by IoU; returns (self_index, other_index) pairs."""
+        if len(self) == 0 or len(other) == 0:
+            return []
+        iou = self.iou(other)
+        used_i, used_j = set(), set()
+        pairs = []
+        for flat in np.argsort(iou, axis=None)[::-1]:
+            i, j = (int(k) for k in np.unravel_index(flat, iou.shape))
+            if iou[i, j] < threshold:
+                break
+            if i not in used_i and j not in used_j:
+                pairs.append((i, j))
+                used_i.add(i)
+                used_j.add(j)
+        return pairs
+
+
+class BoundingBox:
+    """
+    One box of a ``BoxArray``, the scalar interface the per-step controller
+    code reads, with plain Python numbers. Coordinates and image size are read
+    through the array, so ``set_image_size`` on any box of a frame applies to
+    all of them. A box built on its own gets a one-row array.
+    """
+    __slots__ = ("boxes", "index")
+
+    def __init__(self, xmin, ymin, xmax, ymax, image_width = None, image_height = None):
+        self.boxes = BoxArray.from_rows([[xmin, ymin, xmax, ymax]], image_width, image_height)
+        self.index = 0
 
-        print(f"---------{type(self.image_height)}")
+    @classmethod
+    def view(cls, boxes: BoxArray, index: int) -> 'BoundingBox':
+        box = cls.__new__(cls)
+        box.boxes = boxes
+        box.index = index
+        return box
+
+    def __repr__(self) -> str:
+        xmin, ymin, xmax, ymax = self.xyxy
+        return (f"BoundingBox(xmin={xmin}, ymin={ymin}, xmax={xmax}, ymax={ymax}, "
+                f"image_width={self.image_width}, image_height={self.image_height})")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BoundingBox):
+            return NotImplemented
+        return (self.xyxy == other.xyxy and self.image_width == other.image_width
+                and self.image_height == other.image_height)
 
-    @property 
+    __hash__ = None
+
+    def set_image_size(self, image_width, image_height):
+        self.boxes.set_image_size(image_width, image_height)
+
+    @property
     def xyxy(self) -> List[float]:
-        return [self.xmin, self.ymin, self.xmax, self.ymax]
+        return list(self.boxes.rows[self.index])
+
+    @property
+    def xmin(self) -> float:
+        return self.boxes.rows[self.index][0]
+
+    @property
+    def ymin(self) -> float:
+        return self.boxes.rows[self.index][1]
+
+    @property
+    def xmax(self) -> float:
+        return self.boxes.rows[self.index][2]
+
+    @property
+    def ymax(self) -> float:
+        return self.boxes.rows[self.index][3]
+
+    @property
+    def image_width(self):
+        return self.boxes.image_width
+
+    @property
+    def image_height(self):
+        return self.boxes.image_height
 
     @property
     def cxcy(self) -> List[float]:
-        center = lambda x,y : x + (y-x)/2.0
-        return [center(self.xmin, self.xmax), center(self.ymin, self.ymax)]
-    
+        xmin, ymin, xmax, ymax = self.boxes.rows[self.index]
+        return [(xmin + xmax) / 2.0, (ymin + ymax) / 2.0]
+
     @property
     def n_cxcy(self) -> List[float]:
-        assert type(self.image_height) != type(None), "image width and height not specified."
-        cx, cy =  self.cxcy
-        return [cx/self.image_width, cy/self.image_height]
+        boxes = self.boxes
+        assert boxes.image_height is not None, "image width and height not specified."
+        xmin, ymin, xmax, ymax = boxes.rows[self.index]
+        return [(xmin + xmax) / 2.0 / boxes.image_width, (ymin + ymax) / 2.0 / boxes.image_height]
 
     @property
     def ncx(self) -> float:
-        ncx, ncy = self.n_cxcy 
-        return ncx
+        boxes = self.boxes
+        assert boxes.image_height is not None, "image width and height not specified."
+        row = boxes.rows[self.index]
+        return (row[0] + row[2]) / 2.0 / boxes.image_width
 
     @property
     def ncy(self) -> float:
-        ncx, ncy = self.n_cxcy 
-        return ncy
+        boxes = self.boxes
+        assert boxes.image_height is not None, "image width and height not specified."
+        row = boxes.rows[self.index]
+        return (row[1] + row[3]) / 2.0 / boxes.image_height
 
     @property
     def w(self) -> float:
-        return max(1, self.xmax - self.xmin)
+        row = self.boxes.rows[self.index]
+        return max(1, row[2] - row[0])
 
     @property
     def h(self) -> float:
-        return max(1, self.ymax - self.ymin)
+        row = self.boxes.rows[self.index]
+        return max(1, row[3] - row[1])
 
-    @property 
+    @property
     def area(self) -> float:
-        return (self.w * self.h )
+        xmin, ymin, xmax, ymax = self.boxes.rows[self.index]
+        return max(1, xmax - xmin) * max(1, ymax - ymin)
 
     @property
     def n_area(self) -> float:
-        assert type(self.image_height) != type(None), "image width and height not specified."
-        return self.area / (self.image_width * self.image_height) 
+        boxes = self.boxes
+        assert boxes.image_height is not None, "image width and height not specified."
+        xmin, ymin, xmax, ymax = boxes.rows[self.index]
+        return max(1, xmax - xmin) * max(1, ymax - ymin) / (boxes.image_width * boxes.image_height)
 
     @property
     def n_bottom(self) -> float:
-        assert type(self.image_height) != type(None), "image width and height not specified."
-        return self.ymax / self.image_height 
+        boxes = self.boxes
+        assert boxes.image_height is not None, "image width and height not specified."
+        return boxes.rows[self.index][3] / boxes.image_height
+
 
-@dataclass 
 class DetectionResult:
-    score: float
-    label: str
-    box: BoundingBox
-    mask: Optional[np.array] = None
-    
+    __slots__ = ("score", "label", "box", "mask")
+
+    def __init__(self, score: float, label: str, box: BoundingBox, mask: Optional[np.ndarray] = None):
+        self.score = score
+        self.label = label
+        self.box = box
+        self.mask = mask
+
+    def __repr__(self) -> str:
+        return f"DetectionResult(score={self.score}, label={self.label!r}, box={self.box!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DetectionResult):
+            return NotImplemented
+        if (self.mask is None) != (other.mask is None):
+            return False
+        if self.mask is not None and not np.array_equal(self.mask, other.mask):
+            return False
+        return (self.score, self.label, self.box) == (other.score, other.label, other.box)
+
+    __hash__ = None
+
     @classmethod
     def from_dict(cls, detection_dict: Dict) -> 'DetectionResult':
         return cls(score=detection_dict['score'],
@@ -92,7 +273,26 @@ class DetectionResult:
                                    ymin=detection_dict['box']['ymin'],
                                    xmax=detection_dict['box']['xmax'],
                                    ymax=detection_dict['box']['ymax']))
-        
+
+    @classmethod
+    def from_dicts(cls, detection_dicts: List[Dict], img_w=None, img_h=None) -> List['DetectionResult']:
+        """All detections of a frame, sharing one ``BoxArray``."""
+        boxes = BoxArray(
+            [[d['box']['xmin'], d['box']['ymin'], d['box']['xmax'], d['box']['ymax']] for d in detection_dicts],
+            image_width=img_w,
+            image_height=img_h,
+        )
+        return [cls(score=d['score'], label=d['label'], box=box) for d, box in zip(detection_dicts, boxes)]
+
+    @classmethod
+    def from_arrays(cls, arrays) -> List['DetectionResult']:
+        """Views over decoded /dino_api arrays (see ``detection_codec.DetectionArrays``)."""
+        boxes = BoxArray(arrays.boxes, arrays.image_width, arrays.image_height)
+        return [
+            cls(score=score, label=arrays.labels[label_id], box=box)
+            for score, label_id, box in zip(arrays.scores.tolist(), arrays.label_ids.tolist(), boxes)
+        ]
+
     @classmethod
     def from_json(cls, d: dict, img_w=None, img_h=None):
         box = BoundingBox(
@@ -107,4 +307,4 @@ class DetectionResult:
             score=d["score"],
             label=d["label"],
             box=box
-        )
\ No newline at end of file
+        )
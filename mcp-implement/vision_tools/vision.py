@@ -26,7 +26,7 @@ def detect(
     labels = [label if label.endswith(".") else label+"." for label in labels]
 
     results = object_detector(image,  candidate_labels=labels, threshold=threshold)
-    results = [DetectionResult.from_dict(result) for result in results]
+    results = DetectionResult.from_dicts(results, img_w=image.width, img_h=image.height)
 
     return results
 